@@ -0,0 +1,261 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from capvalis_first_algorithm import (simulate_session, create_candle_store, session_cache_key,
+                                      DEFAULT_PARAMS, BACKTEST_START, BACKTEST_END)
+from nse_calendar import trading_sessions
+from result_cache import ResultCache, MISS
+from ledger_store import write_ledger, append_ledger, open_ledger, DEFAULT_LEDGER_PATH
+from transaction_costs import DEFAULT_COST_MODEL
+from indicators import IndicatorLibrary
+
+# Fetch -> simulate -> sink, each stage on its own thread and connected by
+# bounded queues: downloads for upcoming sessions are in flight while the
+# current one is simulated and the previous ones are being written, and a
+# slow stage holds the others back instead of letting sessions pile up.
+
+# Marks the end of a stage's output
+DONE = object()
+
+# Sessions allowed to wait between stages
+QUEUE_SIZE = 16
+# Sessions whose download may be in flight ahead of the simulator
+PREFETCH_SESSIONS = 8
+# Sessions buffered by the ledger sink before each append
+FLUSH_SESSIONS = 20
+
+
+def put(q, item, stop):
+    # Blocking put that gives up once another stage has failed
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return DONE
+
+
+class LedgerSink:
+    # Streams simulated sessions into the columnar ledger in batches of
+    # `flush_sessions`, so trades never accumulate in memory. Daily metrics
+    # (one small dict per session) are kept for the report.
+
+    def __init__(self, base_path=DEFAULT_LEDGER_PATH, cost_model=DEFAULT_COST_MODEL,
+                 flush_sessions=FLUSH_SESSIONS):
+        self.base_path = base_path
+        self.cost_model = cost_model
+        self.flush_sessions = flush_sessions
+        self.pending = []
+        self.pending_sessions = 0
+        self.started = False
+        self.trade_count = 0
+        self.daily_metrics = []
+
+    def write(self, date_str, daily_trades, daily_metric):
+        self.pending.extend(daily_trades)
+        if daily_metric is not None:
+            self.daily_metrics.append(daily_metric)
+        self.pending_sessions += 1
+        if self.pending_sessions >= self.flush_sessions:
+            self.flush()
+
+    def flush(self):
+        # The first batch replaces any ledger left by an earlier run
+        if not self.started:
+            write_ledger(self.pending, self.base_path, self.cost_model)
+            self.started = True
+        elif self.pending:
+            append_ledger(self.pending, self.base_path, self.cost_model)
+        self.trade_count += len(self.pending)
+        self.pending = []
+        self.pending_sessions = 0
+
+    def close(self):
+        self.flush()
+
+
+def run_pipeline(sessions, candle_store, params, sinks, session_func=simulate_session,
+                 result_cache=None, prefetch=PREFETCH_SESSIONS, fetch_workers=4, queue_size=QUEUE_SIZE):
+    # Simulates `sessions` (in order) and hands every session's
+    # (date_str, daily_trades, daily_metric) to each sink's write(), then
+    # calls close() on the sinks. The sink stage runs on the calling thread.
+    interval_minutes = params['interval_minutes']
+    sessions_q = queue.Queue(maxsize=queue_size)
+    results_q = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def produce():
+        # Keeps up to `prefetch` downloads running on the fetch pool; bars
+        # are stored and aggregated on this thread only, as in prefetch()
+        pending = iter(str(session) for session in sessions)
+        window = deque()
+
+        def submit_next(pool):
+            date_str = next(pending, None)
+            if date_str is None:
+                return
+            future = None
+            if candle_store.fetcher is not None and not candle_store.has_session(date_str):
+                future = pool.submit(candle_store.fetch, date_str)
+            window.append((date_str, future))
+
+        with ThreadPoolExecutor(max_workers=fetch_workers) as pool:
+            for _ in range(prefetch):
+                submit_next(pool)
+            while window and not stop.is_set():
+                date_str, future = window.popleft()
+                submit_next(pool)
+
+                candles = fingerprint = None
+                bars = future.result() if future is not None else None
+                if future is None or (bars is not None and len(bars['minute'])):
+                    if bars is not None:
+                        candle_store.put_bars(date_str, bars)
+                    candles = candle_store.get_candles(date_str, interval_minutes)
+                    if candles and result_cache is not None:
+                        fingerprint = candle_store.fingerprint(date_str)
+                    candle_store.release(date_str)
+                if not put(sessions_q, (date_str, fingerprint, candles), stop):
+                    return
+
+    def simulate():
+        while True:
+            item = get(sessions_q, stop)
+            if item is DONE:
+                return
+            date_str, fingerprint, candles = item
+            result = None
+            if not candles:
+                # Skip if no data is available (holiday or non-trading day)
+                print(f"No data available for {date_str} - skipping")
+            else:
+                key = session_cache_key(date_str, fingerprint, params) if result_cache is not None else None
+                cached = result_cache.get(key) if key is not None else MISS
+                if cached is not MISS:
+                    result = cached
+                else:
+                    print(f"Processing date: {date_str}")
+                    try:
+                        result = session_func(date_str, candles, params)
+                    except Exception as e:
+                        # A session that fails is skipped (and not cached)
+                        print(f"Simulation failed for {date_str}: {e}")
+                    else:
+                        if key is not None:
+                            result_cache.put(key, result)
+            if not put(results_q, (date_str, result), stop):
+                return
+
+    def stage(target, output_q):
+        def run():
+            try:
+                target()
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                put(output_q, DONE, stop)
+        return threading.Thread(target=run, daemon=True)
+
+    threads = [stage(produce, sessions_q), stage(simulate, results_q)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            item = get(results_q, stop)
+            if item is DONE:
+                break
+            date_str, result = item
+            if result is None:
+                continue
+            daily_trades, daily_metric = result
+            for sink in sinks:
+                sink.write(date_str, daily_trades, daily_metric)
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+
+    for sink in sinks:
+        sink.close()
+    return sinks
+
+
+def filter_sessions(sessions, candle_store, filters, result_cache=None, fetch_workers=4,
+                    block_sessions=PREFETCH_SESSIONS):
+    # Sessions that pass the ORB filters. Missing sessions are downloaded
+    # `block_sessions` at a time on the fetch pool and fingerprinted, then
+    # released; after scoring every session is released again (building the
+    # indicators reloads them), so no session's bars outlive this call.
+    sessions = [str(session) for session in sessions]
+    for start in range(0, len(sessions), block_sessions):
+        block = sessions[start:start + block_sessions]
+        candle_store.prefetch(block, workers=fetch_workers)
+        for date_str in block:
+            if candle_store.has_session(date_str):
+                candle_store.fingerprint(date_str)
+            candle_store.release(date_str)
+
+    # Sessions without data would only be tried again and skipped
+    with_data = [date_str for date_str in sessions if candle_store.has_session(date_str)]
+    try:
+        allowed = IndicatorLibrary(candle_store, with_data, result_cache).allowed_sessions(filters)
+    finally:
+        for date_str in with_data:
+            candle_store.release(date_str)
+    return [date_str for date_str in sessions if date_str in allowed]
+
+
+def run_pipelined_backtest(interval_minutes=15, candle_store=None, params=None, use_result_cache=True,
+                           result_cache=None, start_date=None, end_date=None, fetch_workers=4,
+                           ledger_path=DEFAULT_LEDGER_PATH, cost_model=DEFAULT_COST_MODEL, extra_sinks=()):
+    # Streaming counterpart of capvalis_first_algorithm: returns the ledger
+    # as a memory-mapped array instead of trade dicts, plus daily metrics,
+    # risk per trade and max trades per day
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    params['interval_minutes'] = interval_minutes
+
+    if candle_store is None:
+        candle_store = create_candle_store()
+    if use_result_cache and result_cache is None:
+        result_cache = ResultCache()
+
+    start_date = start_date or BACKTEST_START
+    end_date = end_date or BACKTEST_END
+    sessions = trading_sessions(start_date, end_date)
+    print(f"\nStarting pipelined backtest from {start_date.strftime('%Y-%m-%d')} to "
+          f"{end_date.strftime('%Y-%m-%d')} ({len(sessions)} sessions)")
+
+    # Session filters need every session's history, so they are resolved up
+    # front and filtered sessions never enter the pipeline
+    if params['filters']:
+        sessions = filter_sessions(sessions, candle_store, params['filters'], result_cache, fetch_workers)
+
+    ledger_sink = LedgerSink(ledger_path, cost_model)
+    run_pipeline(sessions, candle_store, params, [ledger_sink] + list(extra_sinks),
+                 result_cache=result_cache if use_result_cache else None, fetch_workers=fetch_workers)
+
+    ledger, _ = open_ledger(ledger_path)
+    return ledger, ledger_sink.daily_metrics, params['risk_per_trade'], params['max_trades_per_day']
+
+
+if __name__ == "__main__":
+    ledger, daily_metrics, _, _ = run_pipelined_backtest()
+    print(f"Backtest completed: {len(ledger)} trades over {len(daily_metrics)} trading days")
@@ -0,0 +1,205 @@
+from SmartApi import SmartConnect
+import pyotp
+import os
+import json
+import time
+import base64
+import hashlib
+import threading
+import queue
+from contextlib import contextmanager
+from cryptography.fernet import Fernet, InvalidToken
+
+try:
+    import keyring
+except ImportError:
+    keyring = None
+
+# Encrypted JWT / refresh / feed tokens shared by every script on this machine
+TOKEN_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.capvalis', 'broker_session.bin')
+
+# Treat a token as expired this many seconds early
+EXPIRY_MARGIN_SECONDS = 300
+# Used when the JWT carries no exp claim
+DEFAULT_SESSION_SECONDS = 6 * 60 * 60
+
+# The token cache is encrypted with a key derived from a passphrase that
+# lives outside the code: this environment variable, or else the OS keyring
+# entry (KEYRING_SERVICE, username); see the README
+PASSPHRASE_ENV = 'CAPVALIS_TOKEN_PASSPHRASE'
+KEYRING_SERVICE = 'capvalis-broker-session'
+
+
+def cache_passphrase(username):
+    passphrase = os.environ.get(PASSPHRASE_ENV)
+    if not passphrase and keyring is not None:
+        passphrase = keyring.get_password(KEYRING_SERVICE, username)
+    if not passphrase:
+        where = f"the {PASSPHRASE_ENV} environment variable"
+        if keyring is not None:
+            where += f" or the '{KEYRING_SERVICE}' keyring entry for {username}"
+        raise RuntimeError(f"No passphrase for the broker token cache: set {where}")
+    return passphrase
+
+
+def derive_cache_key(passphrase, username):
+    raw = hashlib.pbkdf2_hmac('sha256', passphrase.encode('utf-8'),
+                              f"{KEYRING_SERVICE}:{username}".encode('utf-8'), 200_000)
+    return base64.urlsafe_b64encode(raw)
+
+
+def token_expiry(jwt_token, issued_at):
+    # Reads the exp claim from the JWT payload (no signature check needed here)
+    try:
+        payload = jwt_token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return float(claims['exp'])
+    except Exception:
+        return issued_at + DEFAULT_SESSION_SECONDS
+
+
+class BrokerSessionManager:
+    # Logs in once, keeps the tokens in an encrypted file until they expire
+    # and hands out pooled SmartConnect handles that share those tokens.
+    # Safe to use from several fetcher threads at once.
+
+    def __init__(self, api_key, username, pwd, totp_secret, cache_path=TOKEN_CACHE_PATH, pool_size=4):
+        self.api_key = api_key
+        self.username = username
+        self.pwd = pwd
+        self.totp_secret = totp_secret
+        self.cache_path = cache_path
+        self.pool_size = pool_size
+        # Created on first use, so runs that never need the broker work
+        # without a passphrase
+        self._fernet = None
+        self._lock = threading.Lock()
+        self._tokens = None
+        self._idle = queue.LifoQueue()
+        self._created = 0
+
+    def _is_valid(self, tokens):
+        return tokens is not None and tokens['expires_at'] - EXPIRY_MARGIN_SECONDS > time.time()
+
+    def _cipher(self):
+        if self._fernet is None:
+            self._fernet = Fernet(derive_cache_key(cache_passphrase(self.username), self.username))
+        return self._fernet
+
+    def _load_cached_tokens(self):
+        # A missing passphrase fails here, before any login is attempted
+        fernet = self._cipher()
+        try:
+            with open(self.cache_path, 'rb') as f:
+                tokens = json.loads(fernet.decrypt(f.read()))
+        except (OSError, InvalidToken, ValueError):
+            return None
+        if tokens.get('api_key') != self.api_key or tokens.get('username') != self.username:
+            return None
+        return tokens
+
+    def _save_tokens(self, tokens):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self._cipher().encrypt(json.dumps(tokens).encode('utf-8')))
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.cache_path)
+
+    def _login(self):
+        smartApi = SmartConnect(self.api_key)
+        totp = pyotp.TOTP(self.totp_secret).now()
+
+        # Authenticate the session
+        try:
+            data = smartApi.generateSession(self.username, self.pwd, totp)
+        except Exception as e:
+            print(f"Authentication failed: {e}")
+            raise e
+        if not isinstance(data, dict) or data.get('status') != True:
+            message = data.get('message') if isinstance(data, dict) else data
+            print(f"Authentication failed: {message}")
+            raise RuntimeError(f"Authentication failed: {message}")
+        print("Authentication successful!")
+
+        issued_at = time.time()
+        return {
+            'api_key': self.api_key,
+            'username': self.username,
+            'access_token': smartApi.access_token,
+            'refresh_token': smartApi.refresh_token,
+            'feed_token': smartApi.feed_token,
+            'issued_at': issued_at,
+            'expires_at': token_expiry(smartApi.access_token, issued_at),
+        }
+
+    def tokens(self):
+        # Memory first, then the encrypted cache, and a fresh login only if
+        # both are missing or expired
+        with self._lock:
+            if self._is_valid(self._tokens):
+                return self._tokens
+            tokens = self._load_cached_tokens()
+            if not self._is_valid(tokens):
+                tokens = self._login()
+                self._save_tokens(tokens)
+            self._tokens = tokens
+            return tokens
+
+    def invalidate(self):
+        # Call when the broker rejects a token before its expiry
+        with self._lock:
+            self._tokens = None
+            try:
+                os.remove(self.cache_path)
+            except OSError:
+                pass
+
+    def _new_client(self, tokens):
+        smartApi = SmartConnect(self.api_key, access_token=tokens['access_token'],
+                                refresh_token=tokens['refresh_token'], feed_token=tokens['feed_token'])
+        smartApi.setUserId(self.username)
+        return smartApi
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                return None
+        # Pool is at capacity; wait for another fetcher to hand one back
+        return self._idle.get()
+
+    @contextmanager
+    def client(self):
+        tokens = self.tokens()
+        smartApi = self._checkout()
+        if smartApi is None:
+            smartApi = self._new_client(tokens)
+        elif smartApi.access_token != tokens['access_token']:
+            # Tokens were renewed since this handle was last used
+            smartApi.setAccessToken(tokens['access_token'])
+            smartApi.setRefreshToken(tokens['refresh_token'])
+            smartApi.setFeedToken(tokens['feed_token'])
+        try:
+            yield smartApi
+        finally:
+            self._idle.put(smartApi)
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_session_manager(api_key, username, pwd, totp_secret, **kwargs):
+    # One manager per account per process, so every caller shares its pool
+    with _managers_lock:
+        manager = _managers.get((api_key, username))
+        if manager is None:
+            manager = BrokerSessionManager(api_key, username, pwd, totp_secret, **kwargs)
+            _managers[(api_key, username)] = manager
+        return manager
@@ -0,0 +1,330 @@
+import os
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# NSE session runs 09:15 to 15:30 IST, i.e. 375 one-minute bars
+SESSION_OPEN_MINUTE = 9 * 60 + 15
+SESSION_MINUTES = 375
+
+# Higher timeframes we build from the stored 1-minute bars
+SUPPORTED_INTERVALS = (1, 5, 10, 15, 30, 60)
+
+BAR_FIELDS = ('minute', 'open', 'high', 'low', 'close', 'volume')
+
+# Broker timestamps are IST (UTC+05:30)
+IST_OFFSET_SECONDS = 5 * 60 * 60 + 30 * 60
+
+# Candle rows handed to the strategy loop: the broker's six columns plus the
+# bar's minute-of-session offset, so time-of-day rules never re-read the
+# timestamp string
+CANDLE_MINUTE = 6
+
+
+def session_clock(minute):
+    # Minute-of-session offset -> 'HH:MM' wall clock time
+    total = SESSION_OPEN_MINUTE + int(minute)
+    return f"{total // 60:02d}:{total % 60:02d}"
+
+
+def format_timestamp(date_str, minute):
+    # Same shape as the broker's candle timestamps
+    return f"{date_str}T{session_clock(minute)}:00+05:30"
+
+
+def session_epochs(days, minutes):
+    # Unix epoch seconds (UTC) of bars from their session days and
+    # minute-of-session offsets
+    day_start = np.asarray(days, dtype='M8[D]').astype('M8[s]').astype(np.int64)
+    minutes = np.asarray(minutes, dtype=np.int64)
+    return day_start + (SESSION_OPEN_MINUTE + minutes) * 60 - IST_OFFSET_SECONDS
+
+
+def minute_times(days, minutes):
+    # IST wall-clock datetime64[s] from session days and minute offsets;
+    # a negative minute marks a missing time (NaT)
+    days = np.asarray(days, dtype='M8[D]').astype('M8[s]')
+    minutes = np.asarray(minutes, dtype=np.int64)
+    times = days + ((SESSION_OPEN_MINUTE + minutes) * 60).astype('m8[s]')
+    return np.where(minutes >= 0, times, np.datetime64('NaT', 's'))
+
+
+def empty_bars():
+    return {
+        'minute': np.empty(0, dtype=np.int16),
+        'open': np.empty(0, dtype=np.float64),
+        'high': np.empty(0, dtype=np.float64),
+        'low': np.empty(0, dtype=np.float64),
+        'close': np.empty(0, dtype=np.float64),
+        'volume': np.empty(0, dtype=np.int64),
+    }
+
+
+def candles_to_bars(candles):
+    # Broker candles are [timestamp, open, high, low, close, volume] rows
+    if not candles:
+        return empty_bars()
+
+    minute = np.array([int(c[0][11:13]) * 60 + int(c[0][14:16]) for c in candles], dtype=np.int32)
+    minute -= SESSION_OPEN_MINUTE
+    ohlcv = np.array([c[1:6] for c in candles], dtype=np.float64)
+
+    # Drop anything outside the regular session and keep bars in time order
+    keep = np.flatnonzero((minute >= 0) & (minute < SESSION_MINUTES))
+    keep = keep[np.argsort(minute[keep], kind='stable')]
+
+    return {
+        'minute': minute[keep].astype(np.int16),
+        'open': ohlcv[keep, 0],
+        'high': ohlcv[keep, 1],
+        'low': ohlcv[keep, 2],
+        'close': ohlcv[keep, 3],
+        'volume': ohlcv[keep, 4].astype(np.int64),
+    }
+
+
+def resample_bars(bars, interval_minutes):
+    # Aggregate 1-minute bars into interval buckets anchored at 09:15
+    if interval_minutes not in SUPPORTED_INTERVALS:
+        raise ValueError(f"Unsupported interval: {interval_minutes} minutes")
+    if interval_minutes == 1 or len(bars['minute']) == 0:
+        return bars
+
+    bucket = bars['minute'] // interval_minutes
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(bucket)] - 1
+
+    return {
+        'minute': (bucket[starts] * interval_minutes).astype(np.int16),
+        'open': bars['open'][starts],
+        'high': np.maximum.reduceat(bars['high'], starts),
+        'low': np.minimum.reduceat(bars['low'], starts),
+        'close': bars['close'][ends],
+        'volume': np.add.reduceat(bars['volume'], starts),
+    }
+
+
+def bars_to_candles(date_str, bars):
+    # Back to broker-style candle rows for the strategy loop, each carrying
+    # its minute-of-session offset at CANDLE_MINUTE
+    return [
+        [format_timestamp(date_str, m), o, h, l, c, v, m]
+        for m, o, h, l, c, v in zip(bars['minute'].tolist(), bars['open'].tolist(),
+                                    bars['high'].tolist(), bars['low'].tolist(),
+                                    bars['close'].tolist(), bars['volume'].tolist())
+    ]
+
+
+def fetch_one_minute_bars(smartApi, date_str, symboltoken="99926000", exchange="NSE"):
+    historicParam = {
+        "exchange": exchange,
+        "symboltoken": symboltoken,
+        "interval": "ONE_MINUTE",
+        "fromdate": f"{date_str} 09:15",
+        "todate": f"{date_str} 15:30"
+    }
+    data = smartApi.getCandleData(historicParam)
+
+    # No data means a holiday or non-trading day
+    if not isinstance(data, dict) or data.get('status') != True or not data.get('data'):
+        return None
+    return candles_to_bars(data['data'])
+
+
+class BarIndex:
+    # Bars of many sessions concatenated into flat arrays (day, minute,
+    # epoch and OHLCV) with a dense (session, minute) -> row table, so bars
+    # are addressed by integer lookups instead of timestamps
+
+    def __init__(self, sessions, session_bars, interval_minutes=1):
+        kept = [(np.datetime64(day, 'D'), bars) for day, bars in zip(sessions, session_bars)
+                if bars is not None and len(bars['minute'])]
+        self.interval_minutes = interval_minutes
+        self.days = np.array([day for day, _ in kept], dtype='M8[D]')
+        counts = np.array([len(bars['minute']) for _, bars in kept], dtype=np.int64)
+        self.starts = np.r_[0, np.cumsum(counts)[:-1]].astype(np.int64) if len(kept) else counts
+
+        for field in BAR_FIELDS:
+            setattr(self, field, np.concatenate([bars[field] for _, bars in kept]) if kept
+                    else empty_bars()[field])
+        self.session = np.repeat(np.arange(len(kept)), counts)
+        self.day = self.days[self.session] if len(kept) else np.empty(0, dtype='M8[D]')
+        self.epoch = session_epochs(self.day, self.minute)
+
+        # -1 where a session has no bar at that minute
+        slots = -(-SESSION_MINUTES // interval_minutes)
+        self.table = np.full((len(kept), slots), -1, dtype=np.int64)
+        self.table[self.session, self.minute.astype(np.int64) // interval_minutes] = np.arange(len(self.minute))
+
+    @classmethod
+    def from_store(cls, store, sessions, interval_minutes=1):
+        sessions = [str(session) for session in sessions]
+        return cls(sessions, [store.get_bars(s, interval_minutes) for s in sessions], interval_minutes)
+
+    def session_numbers(self, days):
+        # Position of each day among the indexed sessions, -1 if not indexed
+        days = np.atleast_1d(np.asarray(days, dtype='M8[D]'))
+        position = np.searchsorted(self.days, days)
+        found = position < len(self.days)
+        found[found] = self.days[position[found]] == days[found]
+        return np.where(found, position, -1)
+
+    def rows(self, days, minutes):
+        # Bar rows of (session day, minute-of-session) pairs, -1 if missing
+        sessions, slots = np.broadcast_arrays(self.session_numbers(days),
+                                              np.asarray(minutes, dtype=np.int64) // self.interval_minutes)
+        valid = (sessions >= 0) & (slots >= 0) & (slots < self.table.shape[1])
+        rows = np.full(sessions.shape, -1, dtype=np.int64)
+        rows[valid] = self.table[sessions[valid], slots[valid]]
+        return rows
+
+    def session_rows(self, day):
+        # Row range [start, end) of one session's bars
+        session = int(self.session_numbers([day])[0])
+        if session < 0:
+            return 0, 0
+        end = self.starts[session + 1] if session + 1 < len(self.starts) else len(self.minute)
+        return int(self.starts[session]), int(end)
+
+
+class CandleStore:
+    # Keeps 1-minute bars on disk (one .npz per session) and builds higher
+    # timeframes from them on demand. `fetcher(date_str)` is only called for
+    # sessions that are not on disk yet.
+
+    def __init__(self, cache_dir='candle_cache', symboltoken="99926000", fetcher=None, max_views=2048):
+        self.cache_dir = os.path.join(cache_dir, symboltoken)
+        self.symboltoken = symboltoken
+        self.fetcher = fetcher
+        self.max_views = max_views
+        # Recently used 1-minute bars and aggregated views, each an LRU of
+        # at most max_views entries
+        self._base = OrderedDict()
+        self._views = OrderedDict()
+        self._fingerprints = {}
+        # Sessions whose last download raised, as opposed to returning no
+        # data (a holiday); callers that must not skip a day check this
+        self.failed = set()
+
+    def path_for(self, date_str):
+        return os.path.join(self.cache_dir, f"{date_str}.npz")
+
+    def has_session(self, date_str):
+        return date_str in self._base or os.path.exists(self.path_for(date_str))
+
+    def put_bars(self, date_str, bars):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path_for(date_str)
+        tmp_path = path[:-4] + ".tmp.npz"
+        np.savez(tmp_path, **{field: bars[field] for field in BAR_FIELDS})
+        os.replace(tmp_path, path)
+        self.remember_base(date_str, bars)
+        self._fingerprints.pop(date_str, None)
+        # Any aggregated view of this session is now stale
+        for key in [k for k in self._views if k[0] == date_str]:
+            del self._views[key]
+
+    def get_base_bars(self, date_str):
+        bars = self._base.get(date_str)
+        if bars is not None:
+            self._base.move_to_end(date_str)
+            return bars
+
+        path = self.path_for(date_str)
+        if os.path.exists(path):
+            with np.load(path) as stored:
+                bars = {field: stored[field] for field in BAR_FIELDS}
+            self.remember_base(date_str, bars)
+            return bars
+
+        if self.fetcher is None:
+            return None
+        bars = self.fetch(date_str)
+        if bars is None or len(bars['minute']) == 0:
+            return None
+        self.put_bars(date_str, bars)
+        return bars
+
+    def remember_base(self, date_str, bars):
+        self._base[date_str] = bars
+        self._base.move_to_end(date_str)
+        if len(self._base) > self.max_views:
+            self._base.popitem(last=False)
+
+    def fetch(self, date_str):
+        # One download; a broker error is reported and treated as missing
+        # data, so one bad day never aborts a run
+        try:
+            bars = self.fetcher(date_str)
+        except Exception as e:
+            print(f"Fetching {date_str} failed: {type(e).__name__}: {e}")
+            self.failed.add(date_str)
+            return None
+        self.failed.discard(date_str)
+        return bars
+
+    def release(self, date_str):
+        # Drops a session's bars from memory (they stay on disk), so a long
+        # streamed run does not keep every session it has seen
+        self._base.pop(date_str, None)
+        for key in [k for k in self._views if k[0] == date_str]:
+            del self._views[key]
+
+    def fingerprint(self, date_str):
+        # Content hash of a session's 1-minute bars, None when there is no data
+        if date_str in self._fingerprints:
+            return self._fingerprints[date_str]
+        bars = self.get_base_bars(date_str)
+        if bars is None:
+            return None
+        digest = hashlib.sha1()
+        for field in BAR_FIELDS:
+            digest.update(np.ascontiguousarray(bars[field]).tobytes())
+        self._fingerprints[date_str] = digest.hexdigest()
+        return self._fingerprints[date_str]
+
+    def prefetch(self, sessions, workers=1):
+        # Download any of the given sessions that are not on disk yet.
+        # Pass a trading_sessions() array so holidays never reach the broker.
+        # With workers > 1 the downloads run on threads; bars are still
+        # written to the store from the calling thread.
+        missing = [str(session) for session in sessions if not self.has_session(str(session))]
+        if self.fetcher is None or not missing:
+            return []
+
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                downloaded = list(pool.map(self.fetch, missing))
+        else:
+            downloaded = [self.fetch(date_str) for date_str in missing]
+
+        fetched = []
+        for date_str, bars in zip(missing, downloaded):
+            if bars is not None and len(bars['minute']):
+                self.put_bars(date_str, bars)
+                fetched.append(date_str)
+        return fetched
+
+    def get_bars(self, date_str, interval_minutes=1):
+        key = (date_str, interval_minutes)
+        view = self._views.get(key)
+        if view is not None:
+            self._views.move_to_end(key)
+            return view
+
+        bars = self.get_base_bars(date_str)
+        if bars is None:
+            return None
+        view = resample_bars(bars, interval_minutes)
+
+        self._views[key] = view
+        if len(self._views) > self.max_views:
+            self._views.popitem(last=False)
+        return view
+
+    def get_candles(self, date_str, interval_minutes=1):
+        bars = self.get_bars(date_str, interval_minutes)
+        if bars is None:
+            return None
+        return bars_to_candles(date_str, bars)
@@ -1,264 +1,452 @@
-from SmartApi import SmartConnect
-import pyotp
 from datetime import datetime, timedelta
 import pandas as pd
 import os
+import hashlib
 import numpy as np
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
+from candle_aggregation import CandleStore, fetch_one_minute_bars, CANDLE_MINUTE
+from nse_calendar import trading_sessions
+from result_cache import ResultCache, MISS
+from parallel_backtest import simulate_sessions, reduce_session_results
+from broker_session import get_session_manager
+from ledger_store import write_ledger, DEFAULT_LEDGER_PATH
+from transaction_costs import DEFAULT_COST_MODEL
+from position_sizing import size_trades, daily_metrics_for
+from indicators import IndicatorLibrary
+from orb_kernel import simulate_session_bars, KERNEL_VERSION
+from checkpoint import RunCheckpoint
+from trade_excursions import write_excursions
 
+# Opening range covers the first 30 minutes of the session (09:15 - 09:45)
+OPENING_RANGE_MINUTES = 30
+# Minute-of-session offset of the 2:45 PM square-off
+MARKET_CLOSE_EXIT_MINUTE = 14 * 60 + 45 - (9 * 60 + 15)
 
-def capvalis_first_algorithm():
+# Default backtest window
+BACKTEST_START = datetime(2024, 1, 1)
+BACKTEST_END = datetime(2024, 12, 31)
+
+# Strategy Parameters
+DEFAULT_PARAMS = {
+    'interval_minutes': 15,
+    'max_trades_per_day': 2,
+    'risk_per_trade': 0.02,  # 2% risk per trade
+    'min_range_size': 20,
+    'position_size': 75,
+    # (low price, high price, stop loss points, target points)
+    'stop_target_bands': [
+        (5000, 10000, 15, 45),
+        (10001, 15000, 20, 60),
+        (15001, 20000, 30, 90),
+        (20001, 25000, 50, 150),
+        (25000, 30000, 60, 180),
+    ],
+    'default_stop_target': (50, 150),  # Default values if price is outside ranges
+    # Session filters on ATR, opening gap and range percentile, e.g.
+    # {'min_atr': 80, 'max_gap_pct': 1.0}; see indicators.DEFAULT_FILTERS
+    'filters': {},
+}
+
+# Modules whose code decides a backtest's results: this strategy and the
+# bar building, session pool, kernel, calendar, filters, ledger, costs and
+# sizing it runs on. Cached results are only reused while all of them are
+# unchanged.
+CODE_MODULES = [
+    'capvalis_first_algorithm.py',
+    'candle_aggregation.py',
+    'parallel_backtest.py',
+    'orb_kernel.py',
+    'nse_calendar.py',
+    'indicators.py',
+    'ledger_store.py',
+    'transaction_costs.py',
+    'position_sizing.py',
+]
+
+
+def code_version(modules=CODE_MODULES):
+    digest = hashlib.sha1()
+    for module in modules:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), module), 'rb') as source:
+            digest.update(module.encode())
+            digest.update(source.read())
+    return digest.hexdigest()
+
+
+CODE_VERSION = code_version()
+
+
+# Define stop loss and target points based on price ranges
+def get_stop_loss_target(price, params=DEFAULT_PARAMS):
+    for low, high, stop_loss_points, target_points in params['stop_target_bands']:
+        if low <= price <= high:
+            return stop_loss_points, target_points
+    return tuple(params['default_stop_target'])
+
+
+def simulate_session(date_str, candles, params=DEFAULT_PARAMS):
+    # Runs the opening range breakout for a single session. Returns the
+    # session's trades and its daily metrics (None when nothing was traded).
+    interval_minutes = params['interval_minutes']
+    MAX_TRADES_PER_DAY = params['max_trades_per_day']
+
+    # Number of bars that make up the opening range, and the minute offset of
+    # the bar that contains the 2:45 PM square-off, for the requested interval
+    range_bar_count = max(1, -(-OPENING_RANGE_MINUTES // interval_minutes))
+    exit_minute = MARKET_CLOSE_EXIT_MINUTE // interval_minutes * interval_minutes
+
+    trades_taken = 0
+    daily_trades = []
+
+    if len(candles) < range_bar_count:
+        return daily_trades, None
+
+    range_candles = candles[:range_bar_count]
+    range_high = max(c[2] for c in range_candles)
+    range_low = min(c[3] for c in range_candles)
+    range_size = range_high - range_low
+
+    # Validate range size
+    if range_size < params['min_range_size']:  # Minimum range size check
+        return daily_trades, None
+
+    # Bars after the opening range (09:45 onwards for 15-minute bars)
+    trade_candles = candles[range_bar_count:]
+
+    last_candle = None  # Store the last candle for 3:00 PM exit
+
+    for candle in trade_candles:
+        close_price = candle[4]
+        timestamp = candle[0]
+        minute = candle[CANDLE_MINUTE]
+        high_price = candle[2]
+        low_price = candle[3]
+        last_candle = candle  # Update last candle
+
+        if trades_taken < MAX_TRADES_PER_DAY:
+            # Check for BUY condition
+            if close_price > range_high and not any(t['action'] == 'BUY' for t in daily_trades):
+                # Get stop loss and target points based on price
+                stop_loss_points, target_points = get_stop_loss_target(close_price, params)
+                stop_loss = range_high - stop_loss_points
+                risk_amount = range_high - stop_loss
+                position_size = params['position_size']
+
+                trade = {
+                    'date': date_str,
+                    'time': timestamp,
+                    'entry_minute': minute,
+                    'action': 'BUY',
+                    'entry': range_high,  # Using range high as entry
+                    'stop_loss': stop_loss,
+                    'target': range_high + target_points,
+                    'range_high': range_high,
+                    'range_low': range_low,
+                    'position_size': position_size,
+                    'risk_points': risk_amount,
+                    'status': 'OPEN'
+                }
+                daily_trades.append(trade)
+                trades_taken += 1
+
+            # Check for SELL condition
+            elif close_price < range_low and not any(t['action'] == 'SELL' for t in daily_trades):
+                # Get stop loss and target points based on price
+                stop_loss_points, target_points = get_stop_loss_target(close_price, params)
+                stop_loss = range_low + stop_loss_points
+                risk_amount = stop_loss - range_low
+                position_size = params['position_size']
+
+                trade = {
+                    'date': date_str,
+                    'time': timestamp,
+                    'entry_minute': minute,
+                    'action': 'SELL',
+                    'entry': range_low,  # Using range low as entry
+                    'stop_loss': stop_loss,
+                    'target': range_low - target_points,
+                    'range_high': range_high,
+                    'range_low': range_low,
+                    'position_size': position_size,
+                    'risk_points': risk_amount,
+                    'status': 'OPEN'
+                }
+                daily_trades.append(trade)
+                trades_taken += 1
+
+        # Check for trade exit conditions
+        for trade in daily_trades:
+            if trade['status'] == 'OPEN':
+                if trade['action'] == 'BUY':
+                    # Calculate the 1:2 level (2/3 of the way to target)
+                    two_thirds_target = trade['entry'] + ((trade['target'] - trade['entry']) * 2/3)
+
+                    # If price reaches 1:2 level, update stop loss to entry price
+                    if high_price >= two_thirds_target and trade.get('trailing_stop_updated', False) == False:
+                        trade['stop_loss'] = trade['entry']  # Move stop loss to entry
+                        trade['trailing_stop_updated'] = True  # Mark that we've updated the trailing stop
+
+                    if high_price >= trade['target']:
+                        trade['exit_price'] = trade['target']
+                        trade['exit_time'] = timestamp
+                        trade['exit_minute'] = minute
+                        trade['status'] = 'TARGET_HIT'
+                        trade['pnl'] = (trade['exit_price'] - trade['entry']) * trade['position_size']
+                    elif low_price <= trade['stop_loss']:
+                        trade['exit_price'] = trade['stop_loss']
+                        trade['exit_time'] = timestamp
+                        trade['exit_minute'] = minute
+                        trade['status'] = 'STOP_LOSS_HIT'
+                        trade['pnl'] = (trade['exit_price'] - trade['entry']) * trade['position_size']
+                else:  # SELL trade
+                    # Calculate the 1:2 level (2/3 of the way to target)
+                    two_thirds_target = trade['entry'] - ((trade['entry'] - trade['target']) * 2/3)
+
+                    # If price reaches 1:2 level, update stop loss to entry price
+                    if low_price <= two_thirds_target and trade.get('trailing_stop_updated', False) == False:
+                        trade['stop_loss'] = trade['entry']  # Move stop loss to entry
+                        trade['trailing_stop_updated'] = True  # Mark that we've updated the trailing stop
+
+                    if low_price <= trade['target']:
+                        trade['exit_price'] = trade['target']
+                        trade['exit_time'] = timestamp
+                        trade['exit_minute'] = minute
+                        trade['status'] = 'TARGET_HIT'
+                        trade['pnl'] = (trade['entry'] - trade['exit_price']) * trade['position_size']
+                    elif high_price >= trade['stop_loss']:
+                        trade['exit_price'] = trade['stop_loss']
+                        trade['exit_time'] = timestamp
+                        trade['exit_minute'] = minute
+                        trade['status'] = 'STOP_LOSS_HIT'
+                        trade['pnl'] = (trade['entry'] - trade['exit_price']) * trade['position_size']
+
+        # Check if this is the 2:45 PM candle
+        if minute == exit_minute:
+            close_price = candle[4]
+            for trade in daily_trades:
+                if trade['status'] == 'OPEN':
+                    if trade['action'] == 'BUY':
+                        trade['exit_price'] = close_price
+                        trade['exit_time'] = timestamp
+                        trade['exit_minute'] = minute
+                        trade['status'] = 'MARKET_CLOSE'
+                        trade['pnl'] = (trade['exit_price'] - trade['entry']) * trade['position_size']
+                    else:  # SELL trade
+                        trade['exit_price'] = close_price
+                        trade['exit_time'] = timestamp
+                        trade['exit_minute'] = minute
+                        trade['status'] = 'MARKET_CLOSE'
+                        trade['pnl'] = (trade['entry'] - trade['exit_price']) * trade['position_size']
+
+    # Calculate daily metrics
+    if not daily_trades:
+        return daily_trades, None
+
+    daily_pnl = sum(trade.get('pnl', 0) for trade in daily_trades)
+    winning_trades = len([t for t in daily_trades if t.get('pnl', 0) > 0])
+    losing_trades = len([t for t in daily_trades if t.get('pnl', 0) < 0])
+
+    daily_metric = {
+        'date': date_str,
+        'total_trades': len(daily_trades),
+        'winning_trades': winning_trades,
+        'losing_trades': losing_trades,
+        'win_rate': winning_trades / len(daily_trades) if daily_trades else 0,
+        'daily_pnl': daily_pnl
+    }
+    return daily_trades, daily_metric
+
+
+# Session engines: 'loop' runs simulate_session over candle rows, 'kernel'
+# runs the same rules as an array kernel (numba-compiled when installed)
+ENGINES = ('loop', 'kernel')
+
+
+def engine_version(engine):
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}' - choose from {', '.join(ENGINES)}")
+    return CODE_VERSION if engine == 'loop' else [CODE_VERSION, KERNEL_VERSION]
+
+
+def session_cache_key(date_str, fingerprint, params, engine='loop'):
+    return ResultCache.make_key('session', engine_version(engine), params, date_str, fingerprint)
+
+
+def create_session_manager():
     # API Credentials
     api_key = 'sP2JGPi3'
     username = 'A61994896'
     pwd = '3298'
+    token = "FPELUPA7BHMESI3BPT34PAEPSY"
+
+    # Tokens are reused across runs until they expire, so most runs never log in
+    return get_session_manager(api_key, username, pwd, token)
+
+
+def create_candle_store():
+    session_manager = create_session_manager()
 
-    # Initialize SmartAPI
-    smartApi = SmartConnect(api_key)
+    def fetch(date_str):
+        # Only sessions missing from the local store reach the broker
+        with session_manager.client() as smartApi:
+            return fetch_one_minute_bars(smartApi, date_str)
 
+    # 1-minute bars are stored once; every higher timeframe is built from them
+    return CandleStore(fetcher=fetch)
+
+
+def capvalis_first_algorithm(interval_minutes=15, candle_store=None, params=None,
+                             use_result_cache=True, result_cache=None,
+                             start_date=None, end_date=None, workers=1, executor='process',
+                             ledger_path=DEFAULT_LEDGER_PATH, cost_model=DEFAULT_COST_MODEL, sizing=None,
+                             engine='loop', checkpoint_dir=None, checkpoint_every=20,
+                             excursions=False):
     # Strategy Parameters
-    MAX_TRADES_PER_DAY = 2
-    RISK_PER_TRADE = 0.02  # 2% risk per trade
-
-    # Define stop loss and target points based on price ranges
-    def get_stop_loss_target(price):
-        if 5000 <= price <= 10000:
-            return 15, 45
-        elif 10001 <= price <= 15000:
-            return 20, 60
-        elif 15001 <= price <= 20000:
-            return 30, 90
-        elif 20001 <= price <= 25000:
-            return 50, 150
-        elif 25000 <= price <= 30000:
-            return 60, 180
-        else:
-            return 50, 150  # Default values if price is outside ranges
-
-    try:
-        token = "FPELUPA7BHMESI3BPT34PAEPSY"
-        totp = pyotp.TOTP(token).now()
-    except Exception as e:
-        raise e
-
-    # Authenticate the session
-    try:
-        data = smartApi.generateSession(username, pwd, totp)
-        print("Authentication successful!")
-    except Exception as e:
-        print(f"Authentication failed: {e}")
-        raise e
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    params['interval_minutes'] = interval_minutes
+    MAX_TRADES_PER_DAY = params['max_trades_per_day']
+    RISK_PER_TRADE = params['risk_per_trade']
+    engine_version(engine)  # fails early on an unknown engine
+
+    # Sessions are simulated at the fixed params['position_size']; with a
+    # sizing config the quantities are worked out afterwards from each
+    # trade's stop distance and the equity at the start of its session
+    if sizing is not None:
+        sizing = dict({'risk_per_trade': RISK_PER_TRADE}, **sizing)
+        RISK_PER_TRADE = sizing['risk_per_trade']
+
+    def finish(trade_results, daily_metrics):
+        if sizing is not None:
+            trade_results = size_trades(trade_results, sizing, cost_model)
+            daily_metrics = daily_metrics_for(trade_results)
+        # Typed, memory-mappable ledger for the chart and metrics tools; costs
+        # are applied to the whole ledger here, after simulation, so changing
+        # the cost model never invalidates cached session results
+        if ledger_path:
+            ledger = write_ledger(trade_results, ledger_path, cost_model)
+            # MAE/MFE and time in trade, measured on the bars the strategy traded
+            if excursions:
+                write_excursions(ledger, candle_store, interval_minutes, ledger_path)
+        return trade_results, daily_metrics, RISK_PER_TRADE, MAX_TRADES_PER_DAY
+
+    if candle_store is None:
+        candle_store = create_candle_store()
+
+    # Results are memoized per session on (code version, parameters, data
+    # fingerprint) and per run on the full list of session fingerprints
+    if use_result_cache and result_cache is None:
+        result_cache = ResultCache()
 
     # Define date range for iteration
-    start_date = datetime(2024, 1, 1)
-    end_date = datetime(2024, 12, 31)
+    start_date = start_date or BACKTEST_START
+    end_date = end_date or BACKTEST_END
+
+    # Only real NSE sessions: weekends, exchange holidays and the muhurat
+    # hour are dropped up front instead of costing a broker round-trip
+    sessions = trading_sessions(start_date, end_date)
 
-    # Initialize lists to store trade results and performance metrics
-    trade_results = []
-    daily_metrics = []
+    print(f"\nStarting backtest from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')} ({len(sessions)} sessions)")
 
-    # Loop through each day in the specified date range
-    current_date = start_date
+    # Missing sessions are downloaded up front, on `workers` threads; a day
+    # whose download fails stays missing and is skipped like a holiday
+    candle_store.prefetch(sessions, workers or os.cpu_count() or 1)
+    fingerprints = [(date_str, candle_store.fingerprint(date_str) if candle_store.has_session(date_str) else None)
+                    for date_str in map(str, sessions)]
 
-    print(f"\nStarting backtest from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
+    # Volatility and gap filters drop whole sessions before they are simulated
+    allowed = None
+    if params['filters']:
+        allowed = IndicatorLibrary(candle_store, sessions, result_cache).allowed_sessions(params['filters'])
 
-    while current_date <= end_date:
-        # Skip weekends
-        if current_date.weekday() >= 5:
-            current_date += timedelta(days=1)
+    run_key = ResultCache.make_key('run', engine_version(engine), params, fingerprints)
+    if use_result_cache:
+        cached = result_cache.get(run_key)
+        if cached is not MISS:
+            print("Identical backtest found in result cache")
+            trade_results, daily_metrics = cached
+            return finish(trade_results, daily_metrics)
+
+    # An interrupted run of this same backtest left the sessions it finished
+    # in its checkpoint; those are not simulated again. The checkpoint is
+    # keyed on the session range rather than the data, so sessions that
+    # were missing last time (e.g. failed downloads) do not orphan it.
+    checkpoint = None
+    session_results = {}
+    if checkpoint_dir:
+        checkpoint_key = ResultCache.make_key('checkpoint', engine_version(engine), params,
+                                              str(sessions[0]) if len(sessions) else None,
+                                              str(sessions[-1]) if len(sessions) else None)
+        checkpoint = RunCheckpoint(checkpoint_key, checkpoint_dir)
+        session_results = checkpoint.load(dict(fingerprints))
+
+    # Resolve cached sessions first; everything else is simulated below
+    pending = []
+    for date_str, fingerprint in fingerprints:
+        # Skip if no data is available (holiday or non-trading day)
+        if fingerprint is None:
+            print(f"No data available for {date_str} - skipping")
+            continue
+        if allowed is not None and date_str not in allowed:
+            print(f"Filtered out {date_str}")
+            continue
+        if date_str in session_results:
             continue
-            
-        date_str = current_date.strftime("%Y-%m-%d")
-        print(f"Processing date: {date_str}")
-        
-        from_date = f"{date_str} 09:15"
-        to_date = f"{date_str} 09:45"
-
-        trades_taken = 0
-        daily_trades = []
-
-        try:
-            historicParam = {
-                "exchange": "NSE",
-                "symboltoken": "99926000",  # Nifty 50 token
-                "interval": "FIFTEEN_MINUTE",
-                "fromdate": from_date,
-                "todate": to_date
-            }
-
-            # Fetch the historical data
-            data = smartApi.getCandleData(historicParam)
-            
-            # Skip if no data is available (holiday or non-trading day)
-            if not isinstance(data, dict) or data.get('status') != True or not data.get('data'):
-                print(f"No data available for {date_str} - skipping")
-                current_date += timedelta(days=1)
-                continue
-                
-            candles = data['data']
-            if len(candles) < 2:
-                print(f"Insufficient data for {date_str} - skipping")
-                current_date += timedelta(days=1)
-                continue
 
-            range_high = max(candles[0][2], candles[1][2])
-            range_low = min(candles[0][3], candles[1][3])
-            range_size = range_high - range_low
-            
-            # Validate range size
-            if range_size < 20:  # Minimum range size check
-                current_date += timedelta(days=1)
+        if use_result_cache:
+            cached = result_cache.get(session_cache_key(date_str, fingerprint, params, engine))
+            if cached is not MISS:
+                session_results[date_str] = cached
                 continue
+        pending.append(date_str)
 
-            from_date = f"{date_str} 09:45"
-            to_date = f"{date_str} 15:30"
-            historicParam["fromdate"] = from_date
-            historicParam["todate"] = to_date
-            data = smartApi.getCandleData(historicParam)
-            
-            if isinstance(data, dict) and data.get('status') == True:
-                last_candle = None  # Store the last candle for 3:00 PM exit
-                
-                for candle in data['data']:
-                    close_price = candle[4]
-                    timestamp = candle[0]
-                    high_price = candle[2]
-                    low_price = candle[3]
-                    last_candle = candle  # Update last candle
-
-                    if trades_taken < MAX_TRADES_PER_DAY:
-                        # Check for BUY condition
-                        if close_price > range_high and not any(t['action'] == 'BUY' for t in daily_trades):
-                            # Get stop loss and target points based on price
-                            stop_loss_points, target_points = get_stop_loss_target(close_price)
-                            stop_loss = range_high - stop_loss_points
-                            risk_amount = range_high - stop_loss
-                            position_size = 75  # Fixed position size of 75
-                            
-                            trade = {
-                                'date': date_str,
-                                'time': timestamp,
-                                'action': 'BUY',
-                                'entry': range_high,  # Using range high as entry
-                                'stop_loss': stop_loss,
-                                'target': range_high + target_points,
-                                'range_high': range_high,
-                                'range_low': range_low,
-                                'position_size': position_size,
-                                'status': 'OPEN'
-                            }
-                            trade_results.append(trade)
-                            daily_trades.append(trade)
-                            trades_taken += 1
-                        
-                        # Check for SELL condition
-                        elif close_price < range_low and not any(t['action'] == 'SELL' for t in daily_trades):
-                            # Get stop loss and target points based on price
-                            stop_loss_points, target_points = get_stop_loss_target(close_price)
-                            stop_loss = range_low + stop_loss_points
-                            risk_amount = stop_loss - range_low
-                            position_size = 75  # Fixed position size of 75
-                            
-                            trade = {
-                                'date': date_str,
-                                'time': timestamp,
-                                'action': 'SELL',
-                                'entry': range_low,  # Using range low as entry
-                                'stop_loss': stop_loss,
-                                'target': range_low - target_points,
-                                'range_high': range_high,
-                                'range_low': range_low,
-                                'position_size': position_size,
-                                'status': 'OPEN'
-                            }
-                            trade_results.append(trade)
-                            daily_trades.append(trade)
-                            trades_taken += 1
-
-                    # Check for trade exit conditions
-                    for trade in daily_trades:
-                        if trade['status'] == 'OPEN':
-                            if trade['action'] == 'BUY':
-                                # Calculate the 1:2 level (2/3 of the way to target)
-                                two_thirds_target = trade['entry'] + ((trade['target'] - trade['entry']) * 2/3)
-                                
-                                # If price reaches 1:2 level, update stop loss to entry price
-                                if high_price >= two_thirds_target and trade.get('trailing_stop_updated', False) == False:
-                                    trade['stop_loss'] = trade['entry']  # Move stop loss to entry
-                                    trade['trailing_stop_updated'] = True  # Mark that we've updated the trailing stop
-                                
-                                if high_price >= trade['target']:
-                                    trade['exit_price'] = trade['target']
-                                    trade['exit_time'] = timestamp
-                                    trade['status'] = 'TARGET_HIT'
-                                    trade['pnl'] = (trade['exit_price'] - trade['entry']) * trade['position_size']
-                                elif low_price <= trade['stop_loss']:
-                                    trade['exit_price'] = trade['stop_loss']
-                                    trade['exit_time'] = timestamp
-                                    trade['status'] = 'STOP_LOSS_HIT'
-                                    trade['pnl'] = (trade['exit_price'] - trade['entry']) * trade['position_size']
-                            else:  # SELL trade
-                                # Calculate the 1:2 level (2/3 of the way to target)
-                                two_thirds_target = trade['entry'] - ((trade['entry'] - trade['target']) * 2/3)
-                                
-                                # If price reaches 1:2 level, update stop loss to entry price
-                                if low_price <= two_thirds_target and trade.get('trailing_stop_updated', False) == False:
-                                    trade['stop_loss'] = trade['entry']  # Move stop loss to entry
-                                    trade['trailing_stop_updated'] = True  # Mark that we've updated the trailing stop
-                                
-                                if low_price <= trade['target']:
-                                    trade['exit_price'] = trade['target']
-                                    trade['exit_time'] = timestamp
-                                    trade['status'] = 'TARGET_HIT'
-                                    trade['pnl'] = (trade['entry'] - trade['exit_price']) * trade['position_size']
-                                elif high_price >= trade['stop_loss']:
-                                    trade['exit_price'] = trade['stop_loss']
-                                    trade['exit_time'] = timestamp
-                                    trade['status'] = 'STOP_LOSS_HIT'
-                                    trade['pnl'] = (trade['entry'] - trade['exit_price']) * trade['position_size']
-                    
-                    # Check if this is the 2:45 PM candle
-                    if timestamp and '14:45' in timestamp:
-                        close_price = candle[4]
-                        for trade in daily_trades:
-                            if trade['status'] == 'OPEN':
-                                if trade['action'] == 'BUY':
-                                    trade['exit_price'] = close_price
-                                    trade['exit_time'] = timestamp
-                                    trade['status'] = 'MARKET_CLOSE'
-                                    trade['pnl'] = (trade['exit_price'] - trade['entry']) * trade['position_size']
-                                else:  # SELL trade
-                                    trade['exit_price'] = close_price
-                                    trade['exit_time'] = timestamp
-                                    trade['status'] = 'MARKET_CLOSE'
-                                    trade['pnl'] = (trade['entry'] - trade['exit_price']) * trade['position_size']
-
+    # Every session is independent, so they can be simulated on a pool and
+    # reduced back in session order; workers=1 runs them serially in-process.
+    # With a checkpoint they go in batches of `checkpoint_every` sessions and
+    # each batch is saved before the next one starts.
+    session_func = simulate_session_bars if engine == 'kernel' else simulate_session
+    batch_size = checkpoint_every if checkpoint else max(len(pending), 1)
+    # Sessions whose download failed are missing from this run, like
+    # sessions that fail to simulate
+    failed = [date_str for date_str, _ in fingerprints if date_str in candle_store.failed]
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        session_candles = []
+        for date_str in batch:
+            print(f"Processing date: {date_str}")
+            # Session bars at the requested interval, built from cached 1-minute
+            # data: candle rows for the loop, plain arrays for the kernel
+            if engine == 'kernel':
+                session_candles.append((date_str, candle_store.get_bars(date_str, interval_minutes)))
             else:
-                current_date += timedelta(days=1)
+                session_candles.append((date_str, candle_store.get_candles(date_str, interval_minutes)))
+
+        simulated = simulate_sessions(session_func, session_candles, params, workers=workers, executor=executor)
+        for date_str, result in zip(batch, simulated):
+            if result is None:
+                failed.append(date_str)
                 continue
-        except Exception as e:
-            current_date += timedelta(days=1)
-            continue
-        
-        # Calculate daily metrics
-        if daily_trades:
-            daily_pnl = sum(trade.get('pnl', 0) for trade in daily_trades)
-            winning_trades = len([t for t in daily_trades if t.get('pnl', 0) > 0])
-            losing_trades = len([t for t in daily_trades if t.get('pnl', 0) < 0])
-            
-            daily_metrics.append({
-                'date': date_str,
-                'total_trades': len(daily_trades),
-                'winning_trades': winning_trades,
-                'losing_trades': losing_trades,
-                'win_rate': winning_trades / len(daily_trades) if daily_trades else 0,
-                'daily_pnl': daily_pnl
-            })
-        
-        current_date += timedelta(days=1)
-    
-    return trade_results, daily_metrics, RISK_PER_TRADE, MAX_TRADES_PER_DAY
+            session_results[date_str] = result
+            if use_result_cache:
+                fingerprint = candle_store.fingerprint(date_str)
+                result_cache.put(session_cache_key(date_str, fingerprint, params, engine), result)
+        if checkpoint:
+            checkpoint.record(zip(batch, simulated), dict(fingerprints))
+
+    if failed:
+        print(f"{len(failed)} sessions failed and are missing from this run: {', '.join(failed)}")
+
+    trade_results, daily_metrics = reduce_session_results(
+        session_results.get(date_str) for date_str, _ in fingerprints)
 
+    # A run with failed sessions is incomplete: it is not cached, so the next
+    # run retries them instead of serving the gap
+    if use_result_cache and not failed:
+        result_cache.put(run_key, (trade_results, daily_metrics))
+    # The checkpoint is kept while sessions are missing, so resuming only
+    # simulates those
+    if checkpoint and not failed:
+        checkpoint.clear()
 
+    return finish(trade_results, daily_metrics)
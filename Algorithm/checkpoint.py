@@ -0,0 +1,98 @@
+import os
+import json
+import pickle
+import shutil
+
+# Progress of long runs on disk, so a run that dies (API error, expired
+# session, killed process) picks up where it stopped. Each checkpoint is an
+# append-only file of pickled batches plus a small JSON state holding the
+# byte size of the last complete batch; anything past that size is a torn
+# write and is cut off on load.
+
+CHECKPOINT_DIR = 'checkpoints'
+
+
+class CheckpointLog:
+
+    def __init__(self, path):
+        self.path = path
+        self.state_path = path + ".json"
+
+    def state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load(self):
+        # Every committed batch, in the order they were appended
+        state = self.state()
+        if state is None or not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r+b') as f:
+            f.truncate(state['size'])
+            batches = []
+            while f.tell() < state['size']:
+                batches.append(pickle.load(f))
+        return batches
+
+    def append(self, batch, **progress):
+        # The batch is on disk before the state that commits it
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'ab') as f:
+            pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+
+        state = self.state() or {'batches': 0}
+        state.update(progress, size=size, batches=state['batches'] + 1)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2, default=str)
+        os.replace(tmp_path, self.state_path)
+
+    def clear(self):
+        for path in (self.path, self.state_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class RunCheckpoint:
+    # Finished sessions of one backtest, keyed by what decides a session's
+    # result apart from its data: code version, engine, params and the
+    # session range (see capvalis_first_algorithm). Each session is stored
+    # with the fingerprint of the bars it ran on and is only reused while
+    # that still matches, so a retry that now has data for days that failed
+    # to download resumes from the same checkpoint.
+
+    def __init__(self, checkpoint_key, checkpoint_dir=CHECKPOINT_DIR):
+        self.directory = os.path.join(checkpoint_dir, f"run_{checkpoint_key[:24]}")
+        self.log = CheckpointLog(os.path.join(self.directory, 'sessions.pkl'))
+
+    def load(self, fingerprints):
+        # {date_str: (daily_trades, daily_metric)} of the sessions whose
+        # fingerprint is unchanged; fingerprints is {date_str: fingerprint}
+        session_results = {}
+        for batch in self.log.load():
+            for date_str, (fingerprint, result) in batch.items():
+                if fingerprints.get(date_str) == fingerprint:
+                    session_results[date_str] = result
+                else:
+                    session_results.pop(date_str, None)
+        if session_results:
+            print(f"Resuming from checkpoint: {len(session_results)} sessions already done")
+        return session_results
+
+    def record(self, session_results, fingerprints):
+        # Failed sessions (None) are left out, so a resume retries them
+        session_results = {date_str: (fingerprints[date_str], result)
+                           for date_str, result in session_results if result is not None}
+        if session_results:
+            self.log.append(session_results, last_session=max(session_results))
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
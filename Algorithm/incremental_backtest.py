@@ -0,0 +1,246 @@
+import os
+import io
+import csv
+import json
+from datetime import datetime, timedelta, timezone
+import numpy as np
+from capvalis_first_algorithm import (simulate_session, create_candle_store, DEFAULT_PARAMS,
+                                      CODE_VERSION, BACKTEST_START)
+from nse_calendar import trading_sessions, REGULAR_HOURS
+from candle_aggregation import IST_OFFSET_SECONDS
+from ledger_store import append_ledger, write_ledger, open_ledger
+from indicators import IndicatorLibrary
+
+STATE_FILE = 'state.json'
+TRADES_FILE = 'trades.jsonl'
+DAILY_METRICS_FILE = 'daily_metrics.jsonl'
+EXPORT_FILE = 'Capvalis Exclusive.csv'
+# Columnar ledger (Capvalis Exclusive.trades.npy / .monthly.npy)
+LEDGER_BASE = 'Capvalis Exclusive'
+
+# Same columns as the Trade Details sheet of the Excel report
+EXPORT_HEADERS = ['Date', 'Time', 'Action', 'Entry Price', 'Stop Loss', 'Target',
+                  'Range High', 'Range Low', 'Position Size', 'Exit Price',
+                  'Exit Time', 'Status', 'P&L']
+
+
+def trade_to_row(trade):
+    return [trade['date'], trade['time'], trade['action'], trade['entry'], trade['stop_loss'],
+            trade['target'], trade['range_high'], trade['range_low'], trade['position_size'],
+            trade.get('exit_price', ''), trade.get('exit_time', ''), trade['status'],
+            trade.get('pnl', 0)]
+
+
+def monthly_total_row(month_key, month_pnl):
+    return [f"Monthly Total ({month_key})"] + [''] * 11 + [month_pnl]
+
+
+def encode_rows(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+def new_state(start_date, params):
+    return {
+        'start_date': str(np.datetime64(start_date, 'D')),
+        'last_session': None,
+        'params': params,
+        'code_version': CODE_VERSION,
+        # Byte sizes of the stored files after the last completed update
+        'file_sizes': {},
+        'ledger_rows': 0,
+        # Month of the trailing 'Monthly Total' row in the export and where it starts
+        'export_month': None,
+        'export_month_pnl': 0,
+        'export_total_offset': None,
+    }
+
+
+def load_state(state_dir):
+    path = os.path.join(state_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state_dir, state):
+    path = os.path.join(state_dir, STATE_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def rollback_partial_writes(state_dir, state):
+    # Drop anything appended after the last saved state (e.g. a killed run)
+    for name, size in state['file_sizes'].items():
+        path = os.path.join(state_dir, name)
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            with open(path, 'r+b') as f:
+                f.truncate(size)
+
+    # The columnar ledger is rebuilt from the JSONL trades if it ran ahead
+    base_path = os.path.join(state_dir, LEDGER_BASE)
+    try:
+        ledger_rows = len(open_ledger(base_path)[0])
+    except OSError:
+        ledger_rows = 0
+    if ledger_rows != state['ledger_rows']:
+        trade_results, _ = load_ledger(state_dir)
+        write_ledger(trade_results, base_path)
+
+    # The trailing monthly total may have been overwritten in place
+    path = os.path.join(state_dir, EXPORT_FILE)
+    if state['export_total_offset'] is not None and os.path.exists(path):
+        with open(path, 'r+b') as f:
+            f.seek(state['export_total_offset'])
+            f.write(encode_rows([monthly_total_row(state['export_month'], state['export_month_pnl'])]))
+            f.truncate()
+
+
+def append_jsonl(path, records):
+    with open(path, 'ab') as f:
+        for record in records:
+            f.write((json.dumps(record) + "\n").encode('utf-8'))
+
+
+def append_export(path, state, trades):
+    # Appends trade rows to the CSV export and keeps exactly one trailing
+    # 'Monthly Total' row for the current month, rewriting only that row
+    with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+        if state['export_total_offset'] is None:
+            f.seek(0)
+            f.truncate()
+            f.write(encode_rows([EXPORT_HEADERS]))
+        else:
+            f.seek(state['export_total_offset'])
+
+        month_key = state['export_month']
+        month_pnl = state['export_month_pnl']
+        # If the month carries on, the old total row is overwritten below
+        if month_key is not None and trades and trades[0]['date'][:7] != month_key:
+            f.seek(0, os.SEEK_END)
+
+        rows = []
+        for trade in trades:
+            if trade['date'][:7] != month_key:
+                if month_key is not None and rows:
+                    rows.append(monthly_total_row(month_key, month_pnl))
+                month_key = trade['date'][:7]
+                month_pnl = 0
+            rows.append(trade_to_row(trade))
+            month_pnl += trade.get('pnl', 0)
+
+        if rows:
+            f.write(encode_rows(rows))
+            state['export_total_offset'] = f.tell()
+            f.write(encode_rows([monthly_total_row(month_key, month_pnl)]))
+            f.truncate()
+            state['export_month'] = month_key
+            state['export_month_pnl'] = month_pnl
+
+
+def last_completed_day(now=None):
+    # Latest day whose session has closed: today after 15:30 IST, otherwise
+    # yesterday. A running session's bars are partial and would be stored
+    # (and the day marked done) for good.
+    now = now or datetime.now(timezone.utc)
+    ist = now.astimezone(timezone.utc).replace(tzinfo=None) + timedelta(seconds=IST_OFFSET_SECONDS)
+    close_hour, close_minute = map(int, REGULAR_HOURS[1].split(':'))
+    if (ist.hour, ist.minute) >= (close_hour, close_minute):
+        return ist.date()
+    return ist.date() - timedelta(days=1)
+
+
+def run_incremental(state_dir='incremental_backtest', end_date=None, candle_store=None,
+                    params=None, start_date=None):
+    # Simulates only the sessions after the last processed one and appends
+    # them to the stored ledger, daily metrics and CSV export. end_date
+    # defaults to the last completed session.
+    os.makedirs(state_dir, exist_ok=True)
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+
+    state = load_state(state_dir)
+    if state is None:
+        state = new_state(start_date or BACKTEST_START, params)
+    elif state['params'] != json.loads(json.dumps(params)) or state['code_version'] != CODE_VERSION:
+        raise ValueError(f"Strategy parameters or code changed since {state_dir} was built - "
+                         f"use a new state directory or delete it to rebuild from scratch")
+    else:
+        rollback_partial_writes(state_dir, state)
+
+    if candle_store is None:
+        candle_store = create_candle_store()
+
+    first_day = np.datetime64(state['start_date'], 'D')
+    if state['last_session'] is not None:
+        first_day = np.datetime64(state['last_session'], 'D') + 1
+    sessions = trading_sessions(first_day, end_date or last_completed_day())
+
+    # Filters look back over earlier sessions, so the indicators cover the
+    # whole run, not just the new sessions
+    allowed = None
+    if params['filters'] and len(sessions):
+        history = trading_sessions(np.datetime64(state['start_date'], 'D'), sessions[-1])
+        allowed = IndicatorLibrary(candle_store, history).allowed_sessions(params['filters'])
+
+    new_trades = []
+    new_metrics = []
+    last_session = state['last_session']
+
+    for session in sessions:
+        date_str = str(session)
+        candles = candle_store.get_candles(date_str, params['interval_minutes'])
+        # A failed download stops the run here, so the cursor never passes
+        # it: that session and everything after it are retried next run.
+        # A session the broker has no data for is a holiday and is skipped.
+        if date_str in candle_store.failed:
+            print(f"Fetching {date_str} failed - stopping, it is retried next run")
+            break
+        if not candles:
+            print(f"No data available for {date_str} - skipping")
+            continue
+        last_session = date_str
+        if allowed is not None and date_str not in allowed:
+            print(f"Filtered out {date_str}")
+            continue
+
+        print(f"Processing date: {date_str}")
+        daily_trades, daily_metric = simulate_session(date_str, candles, params)
+        new_trades.extend(daily_trades)
+        if daily_metric is not None:
+            new_metrics.append(daily_metric)
+
+    append_jsonl(os.path.join(state_dir, TRADES_FILE), new_trades)
+    append_jsonl(os.path.join(state_dir, DAILY_METRICS_FILE), new_metrics)
+    append_export(os.path.join(state_dir, EXPORT_FILE), state, new_trades)
+    if new_trades or state['ledger_rows'] == 0:
+        append_ledger(new_trades, os.path.join(state_dir, LEDGER_BASE))
+    state['ledger_rows'] += len(new_trades)
+
+    state['last_session'] = last_session
+    state['file_sizes'] = {
+        name: os.path.getsize(os.path.join(state_dir, name))
+        for name in (TRADES_FILE, DAILY_METRICS_FILE, EXPORT_FILE)
+    }
+    save_state(state_dir, state)
+
+    print(f"Appended {len(new_trades)} trades, ledger now up to {last_session}")
+    return new_trades, new_metrics
+
+
+def load_ledger(state_dir='incremental_backtest'):
+    trade_results = []
+    daily_metrics = []
+    for name, records in ((TRADES_FILE, trade_results), (DAILY_METRICS_FILE, daily_metrics)):
+        path = os.path.join(state_dir, name)
+        if os.path.exists(path):
+            with open(path) as f:
+                records.extend(json.loads(line) for line in f if line.strip())
+    return trade_results, daily_metrics
+
+
+if __name__ == "__main__":
+    run_incremental()
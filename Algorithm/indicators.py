@@ -0,0 +1,213 @@
+import os
+import hashlib
+import numpy as np
+from candle_aggregation import BarIndex
+from result_cache import ResultCache, MISS
+
+# Session-level indicators for ORB filters, computed as whole arrays over
+# the candle store's 1-minute bars. Per-session values are aligned with
+# IndicatorLibrary.days and only use information available at the time the
+# ORB starts trading (prior sessions plus the opening range), so they can
+# gate a session without look-ahead.
+
+# Opening range used by the range indicators (as in the ORB script)
+OPENING_RANGE_MINUTES = 30
+
+# Thresholds are off (None) unless set in params['filters']
+DEFAULT_FILTERS = {
+    'atr_period': 14,
+    'min_atr': None,
+    'max_atr': None,
+    # Absolute opening gap against the prior close, in percent
+    'max_gap_pct': None,
+    'range_lookback': 60,
+    'min_range_percentile': None,
+    'max_range_percentile': None,
+}
+
+# Memoized results are only reused while this file is unchanged
+with open(os.path.abspath(__file__), 'rb') as _source:
+    INDICATORS_VERSION = hashlib.sha1(_source.read()).hexdigest()
+
+
+def shift(values, periods=1):
+    # Values of the previous session(s); NaN where there is none
+    shifted = np.full(len(values), np.nan)
+    if periods < len(values):
+        shifted[periods:] = values[:len(values) - periods]
+    return shifted
+
+
+def trailing_mean(values, period):
+    # Mean of the `period` values before each position (not including it),
+    # via prefix sums; NaN until that much history exists
+    values = np.asarray(values, dtype=np.float64)
+    sums = np.r_[0.0, np.cumsum(np.nan_to_num(values))]
+    counts = np.r_[0, np.cumsum(~np.isnan(values))]
+    index = np.arange(len(values))
+    start = np.maximum(index - period, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (sums[index] - sums[start]) / (counts[index] - counts[start])
+    return np.where(index >= period, mean, np.nan)
+
+
+def daily_ohlc(bars):
+    # Session open/high/low/close from a BarIndex with reduceat
+    starts = bars.starts
+    ends = np.r_[starts[1:], len(bars.minute)] - 1
+    if len(starts) == 0:
+        empty = np.empty(0)
+        return {'open': empty, 'high': empty, 'low': empty, 'close': empty}
+    return {
+        'open': bars.open[starts],
+        'high': np.maximum.reduceat(bars.high, starts),
+        'low': np.minimum.reduceat(bars.low, starts),
+        'close': bars.close[ends],
+    }
+
+
+def opening_range(bars, minutes=OPENING_RANGE_MINUTES):
+    # High, low and width of each session's first `minutes`
+    in_range = bars.minute < minutes
+    sessions = bars.session[in_range]
+    high = np.full(len(bars.days), -np.inf)
+    low = np.full(len(bars.days), np.inf)
+    np.maximum.at(high, sessions, bars.high[in_range])
+    np.minimum.at(low, sessions, bars.low[in_range])
+    has_range = np.isfinite(high)
+    high = np.where(has_range, high, np.nan)
+    low = np.where(has_range, low, np.nan)
+    return {'high': high, 'low': low, 'width': high - low}
+
+
+def prior_day(library):
+    ohlc = library.get('daily_ohlc')
+    return {field: shift(ohlc[field]) for field in ('high', 'low', 'close')}
+
+
+def true_range(library):
+    ohlc = library.get('daily_ohlc')
+    prev_close = shift(ohlc['close'])
+    ranges = np.vstack([ohlc['high'] - ohlc['low'],
+                        np.abs(ohlc['high'] - prev_close),
+                        np.abs(ohlc['low'] - prev_close)])
+    return np.nanmax(ranges, axis=0)
+
+
+def atr(library, period=14):
+    # Average true range of the `period` sessions before each session
+    return trailing_mean(library.get('true_range'), period)
+
+
+def gap(library):
+    # Opening gap against the prior session's close, in points and percent
+    ohlc = library.get('daily_ohlc')
+    prev_close = shift(ohlc['close'])
+    points = ohlc['open'] - prev_close
+    return {'points': points, 'pct': points / prev_close * 100}
+
+
+def range_percentile(library, lookback=60, minutes=OPENING_RANGE_MINUTES):
+    # Share (0-100) of the previous `lookback` sessions whose opening range
+    # was narrower than today's; NaN until `lookback` sessions exist
+    width = library.get('opening_range', minutes=minutes)['width']
+    percentile = np.full(len(width), np.nan)
+    if len(width) > lookback:
+        history = np.lib.stride_tricks.sliding_window_view(width[:-1], lookback)
+        percentile[lookback:] = (history < width[lookback:, None]).mean(axis=1) * 100
+    return percentile
+
+
+def vwap(library):
+    # Session VWAP at every bar (aligned with the BarIndex rows) from
+    # per-session running sums of typical price x volume. The Nifty index
+    # reports no volume; sessions without any fall back to equal weights.
+    bars = library.bars()
+    typical = (bars.high + bars.low + bars.close) / 3
+    session_volume = np.bincount(bars.session, weights=bars.volume, minlength=len(bars.days))
+    weights = np.where(session_volume[bars.session] > 0, bars.volume, 1).astype(np.float64)
+
+    def session_cumsum(values):
+        total = np.cumsum(values)
+        before = np.r_[0.0, total][bars.starts]
+        return total - before[bars.session]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return session_cumsum(typical * weights) / session_cumsum(weights)
+
+
+INDICATORS = {
+    'daily_ohlc': lambda library: daily_ohlc(library.bars()),
+    'opening_range': lambda library, minutes=OPENING_RANGE_MINUTES: opening_range(library.bars(), minutes),
+    'prior_day': prior_day,
+    'true_range': true_range,
+    'atr': atr,
+    'gap': gap,
+    'range_percentile': range_percentile,
+    'vwap': vwap,
+}
+
+
+class IndicatorLibrary:
+    # Computes indicators for a set of sessions on demand and memoizes them
+    # per (indicator, params, data version): in memory for this library and,
+    # with a result cache, on disk for later runs and sweeps. The data
+    # version is the content fingerprint of every session's bars.
+
+    def __init__(self, candle_store, sessions, result_cache=None):
+        self.candle_store = candle_store
+        fingerprints = [(str(session), candle_store.fingerprint(str(session))) for session in sessions]
+        fingerprints = [(session, fingerprint) for session, fingerprint in fingerprints if fingerprint is not None]
+        self.days = np.array([session for session, _ in fingerprints], dtype='M8[D]')
+        self.data_version = ResultCache.make_key('bars', fingerprints)
+        self.result_cache = result_cache
+        self._bars = None
+        self._memo = {}
+
+    def bars(self):
+        if self._bars is None:
+            self._bars = BarIndex.from_store(self.candle_store, self.days)
+        return self._bars
+
+    def get(self, name, **params):
+        if name not in INDICATORS:
+            raise ValueError(f"Unknown indicator '{name}' - choose from {', '.join(INDICATORS)}")
+        key = ResultCache.make_key('indicator', INDICATORS_VERSION, name, params, self.data_version)
+        value = self._memo.get(key, MISS)
+        if value is MISS and self.result_cache is not None:
+            value = self.result_cache.get(key)
+        if value is MISS:
+            value = INDICATORS[name](self, **params)
+            if self.result_cache is not None:
+                self.result_cache.put(key, value)
+        self._memo[key] = value
+        return value
+
+    def session_mask(self, filters):
+        # True for sessions that pass every threshold set in `filters`.
+        # Sessions without enough history for an indicator are not filtered.
+        filters = dict(DEFAULT_FILTERS, **filters)
+        keep = np.ones(len(self.days), dtype=bool)
+
+        def within(values, low, high):
+            values = np.asarray(values, dtype=np.float64)
+            unknown = np.isnan(values)
+            passed = np.ones(len(values), dtype=bool)
+            with np.errstate(invalid='ignore'):
+                if low is not None:
+                    passed &= values >= low
+                if high is not None:
+                    passed &= values <= high
+            return passed | unknown
+
+        if filters['min_atr'] is not None or filters['max_atr'] is not None:
+            keep &= within(self.get('atr', period=filters['atr_period']), filters['min_atr'], filters['max_atr'])
+        if filters['max_gap_pct'] is not None:
+            keep &= within(np.abs(self.get('gap')['pct']), None, filters['max_gap_pct'])
+        if filters['min_range_percentile'] is not None or filters['max_range_percentile'] is not None:
+            keep &= within(self.get('range_percentile', lookback=filters['range_lookback']),
+                           filters['min_range_percentile'], filters['max_range_percentile'])
+        return keep
+
+    def allowed_sessions(self, filters):
+        return set(np.datetime_as_string(self.days[self.session_mask(filters)], unit='D').tolist())
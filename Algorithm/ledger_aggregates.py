@@ -0,0 +1,157 @@
+import numpy as np
+
+# Ledger statistics that are built up chunk by chunk, so a memory-mapped
+# ledger of any length is summarised with bounded memory. Each chunk is
+# reduced to partial aggregates (sums, counts, Welford M2, extremes) that
+# are merged into the running state. Counts are integers and equity and its
+# peak are carried across chunks, so those are exact whatever the chunking;
+# the per-chunk sums (numpy's pairwise sums) are added up with Neumaier
+# compensation, so a ledger of one chunk gives numpy's sum exactly and a
+# longer one stays within a few ulps of it.
+
+# Rows read per chunk
+CHUNK_ROWS = 1 << 18
+
+
+def iter_chunks(trades, chunk_rows=CHUNK_ROWS):
+    for start in range(0, len(trades), chunk_rows):
+        yield trades[start:start + chunk_rows]
+
+
+def merge_welford(count, mean, m2, other_count, other_mean, other_m2):
+    # Chan et al. pairwise update of (count, mean, sum of squared deviations)
+    if other_count == 0:
+        return count, mean, m2
+    if count == 0:
+        return other_count, other_mean, other_m2
+    total = count + other_count
+    delta = other_mean - mean
+    return (total, mean + delta * other_count / total,
+            m2 + other_m2 + delta * delta * count * other_count / total)
+
+
+class CompensatedSum:
+    # Neumaier (improved Kahan) running sum of floats
+
+    def __init__(self):
+        self.total = 0.0
+        self.compensation = 0.0
+
+    def add(self, value):
+        value = float(value)
+        total = self.total + value
+        if abs(self.total) >= abs(value):
+            self.compensation += (self.total - total) + value
+        else:
+            self.compensation += (value - total) + self.total
+        self.total = total
+
+    @property
+    def value(self):
+        return self.total + self.compensation
+
+
+class LedgerAggregate:
+    # Running totals over the ledger's `field` column. The mean/variance
+    # are of field / scale, e.g. P&L as a return on capital.
+
+    SUMS = ('sum', 'gross_profit', 'gross_loss', 'costs', 'net_pnl', 'scaled_sum')
+
+    def __init__(self, field='pnl', scale=1.0):
+        self.field = field
+        self.scale = scale
+        self.count = 0
+        self.wins = 0
+        self.losses = 0
+        self.sums = {name: CompensatedSum() for name in self.SUMS}
+        # Chan/Welford state for the variance; its mean only serves the merge
+        self.welford_mean = 0.0
+        self.m2 = 0.0
+        self.first_date = None
+        self.last_date = None
+        # Equity curve state: last cumulative value and its running peak
+        self.equity = 0.0
+        self.peak = -np.inf
+        # Largest drawdown from the peak, in points and (as drawdown_pct) in
+        # percent of the peak; NaN until a drawdown percentage is defined
+        self.max_drawdown = 0.0
+        self.max_drawdown_pct = np.nan
+
+    def equity_chunk(self, values):
+        # Cumulative values and running peaks of one chunk, continuing the
+        # curve so far; a sequential cumsum, so the result does not depend
+        # on where the chunks are cut
+        cumulative = np.cumsum(np.r_[self.equity, values])[1:] if self.count else np.cumsum(values)
+        peaks = np.maximum.accumulate(np.r_[self.peak, cumulative])[1:]
+        return cumulative, peaks
+
+    sum = property(lambda self: self.sums['sum'].value)
+    gross_profit = property(lambda self: self.sums['gross_profit'].value)
+    gross_loss = property(lambda self: self.sums['gross_loss'].value)
+    costs = property(lambda self: self.sums['costs'].value)
+    net_pnl = property(lambda self: self.sums['net_pnl'].value)
+
+    @property
+    def mean(self):
+        # Mean of field / scale as numpy's mean takes it: the sum over the count
+        return self.sums['scaled_sum'].value / self.count if self.count else 0.0
+
+    def update_values(self, values, costs=None, net_pnl=None):
+        # Counts, sums and Welford moments of one chunk of `field` values
+        winners = values[values > 0]
+        losers = values[values < 0]
+        self.wins += len(winners)
+        self.losses += len(losers)
+        self.sums['sum'].add(values.sum())
+        self.sums['gross_profit'].add(winners.sum())
+        self.sums['gross_loss'].add(losers.sum())
+        if costs is not None:
+            self.sums['costs'].add(costs.sum())
+            self.sums['net_pnl'].add(net_pnl.sum())
+
+        scaled = values / self.scale
+        chunk_sum = scaled.sum()
+        self.sums['scaled_sum'].add(chunk_sum)
+        chunk_mean = chunk_sum / len(scaled)
+        deviations = scaled - chunk_mean
+        self.count, self.welford_mean, self.m2 = merge_welford(
+            self.count, self.welford_mean, self.m2, len(scaled), chunk_mean, np.sum(deviations * deviations))
+        return self
+
+    def update(self, chunk):
+        # Fields of a record array are strided; numpy sums those in buffered
+        # blocks, so they are copied out to sum like a contiguous column
+        values = np.ascontiguousarray(chunk[self.field], dtype=np.float64)
+        if not len(values):
+            return self
+
+        cumulative, peaks = self.equity_chunk(values)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            drawdown = (cumulative - peaks) / peaks * 100
+        if not np.isnan(drawdown).all():
+            self.max_drawdown_pct = np.nanmin(np.r_[self.max_drawdown_pct, drawdown])
+        self.max_drawdown = max(self.max_drawdown, float((peaks - cumulative).max()))
+        self.equity = cumulative[-1]
+        self.peak = peaks[-1]
+
+        if 'costs' in chunk.dtype.names:
+            self.update_values(values, np.ascontiguousarray(chunk['costs'], dtype=np.float64),
+                               np.ascontiguousarray(chunk['net_pnl'], dtype=np.float64))
+        else:
+            self.update_values(values)
+
+        dates = np.asarray(chunk['date'])
+        first, last = dates.min(), dates.max()
+        self.first_date = first if self.first_date is None else min(self.first_date, first)
+        self.last_date = last if self.last_date is None else max(self.last_date, last)
+        return self
+
+    @classmethod
+    def from_ledger(cls, trades, field='pnl', scale=1.0, chunk_rows=CHUNK_ROWS):
+        aggregate = cls(field, scale)
+        for chunk in iter_chunks(trades, chunk_rows):
+            aggregate.update(chunk)
+        return aggregate
+
+    def variance(self, ddof=1):
+        return self.m2 / (self.count - ddof) if self.count > ddof else np.nan
@@ -0,0 +1,287 @@
+import os
+import io
+import numpy as np
+import pandas as pd
+from rollup_index import RollupIndex
+from ledger_aggregates import iter_chunks
+from candle_aggregation import minute_times
+from transaction_costs import DEFAULT_COST_MODEL, apply_costs
+
+# Default ledger location, next to the legacy 'Capvalis Exclusive.csv'
+DEFAULT_LEDGER_PATH = 'Capvalis Exclusive'
+
+ACTION_CODES = {'BUY': 1, 'SELL': -1}
+STATUS_CODES = {'OPEN': 0, 'TARGET_HIT': 1, 'STOP_LOSS_HIT': 2, 'MARKET_CLOSE': 3}
+ACTION_NAMES = {code: name for name, code in ACTION_CODES.items()}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+# One row per trade. Times are IST wall-clock; exit fields are NaT/NaN
+# while a trade is still open. 'pnl' is gross; 'costs' holds charges and
+# slippage from the run's cost model and 'net_pnl' = pnl - costs.
+TRADE_DTYPE = np.dtype([
+    ('date', 'M8[D]'),
+    ('time', 'M8[s]'),
+    ('action', 'i1'),
+    ('entry', 'f8'),
+    ('stop_loss', 'f8'),
+    ('target', 'f8'),
+    ('range_high', 'f8'),
+    ('range_low', 'f8'),
+    ('position_size', 'i4'),
+    # Initial stop distance in index points (before any trailing)
+    ('risk_points', 'f8'),
+    ('exit_price', 'f8'),
+    ('exit_time', 'M8[s]'),
+    ('status', 'i1'),
+    ('pnl', 'f8'),
+    ('costs', 'f8'),
+    ('net_pnl', 'f8'),
+])
+
+# Monthly aggregates live in their own table instead of 'Monthly Total' rows
+MONTHLY_DTYPE = np.dtype([
+    ('month', 'M8[M]'),
+    ('total_trades', 'i8'),
+    ('winning_trades', 'i8'),
+    ('losing_trades', 'i8'),
+    ('pnl', 'f8'),
+])
+
+# Column names used by the Trade Details sheet and the CSV export
+EXPORT_COLUMNS = {
+    'date': 'Date', 'time': 'Time', 'action': 'Action', 'entry': 'Entry Price',
+    'stop_loss': 'Stop Loss', 'target': 'Target', 'range_high': 'Range High',
+    'range_low': 'Range Low', 'position_size': 'Position Size', 'exit_price': 'Exit Price',
+    'exit_time': 'Exit Time', 'status': 'Status', 'pnl': 'P&L',
+}
+
+
+def trades_path(base_path):
+    return f"{base_path}.trades.npy"
+
+
+def monthly_path(base_path):
+    return f"{base_path}.monthly.npy"
+
+
+def rollup_path(base_path):
+    return f"{base_path}.rollup.npz"
+
+
+def parse_times(values):
+    # Broker timestamps carry a +05:30 suffix; keep the IST wall-clock part
+    return np.array([v[:19] if v else 'NaT' for v in values], dtype='M8[s]')
+
+
+def trades_to_array(trade_results, cost_model=DEFAULT_COST_MODEL):
+    trades = np.zeros(len(trade_results), dtype=TRADE_DTYPE)
+    if not trade_results:
+        return trades
+
+    trades['date'] = np.array([t['date'] for t in trade_results], dtype='M8[D]')
+    # Trades from the candle store carry integer minute-of-session offsets;
+    # the timestamp strings are only parsed for trades recorded without them
+    if all('entry_minute' in t for t in trade_results):
+        trades['time'] = minute_times(trades['date'], [t['entry_minute'] for t in trade_results])
+        trades['exit_time'] = minute_times(trades['date'], [t.get('exit_minute', -1) for t in trade_results])
+    else:
+        trades['time'] = parse_times([t['time'] for t in trade_results])
+        trades['exit_time'] = parse_times([t.get('exit_time', '') for t in trade_results])
+    trades['action'] = [ACTION_CODES[t['action']] for t in trade_results]
+    for field in ('entry', 'stop_loss', 'target', 'range_high', 'range_low', 'position_size'):
+        trades[field] = [t[field] for t in trade_results]
+    trades['risk_points'] = [t.get('risk_points', np.nan) for t in trade_results]
+    trades['exit_price'] = [t.get('exit_price', np.nan) for t in trade_results]
+    trades['status'] = [STATUS_CODES[t['status']] for t in trade_results]
+    trades['pnl'] = [t.get('pnl', 0) for t in trade_results]
+    return apply_costs(trades, cost_model)
+
+
+def monthly_aggregates(trades):
+    months, inverse = np.unique(trades['date'].astype('M8[M]'), return_inverse=True)
+    monthly = np.zeros(len(months), dtype=MONTHLY_DTYPE)
+    monthly['month'] = months
+    monthly['total_trades'] = np.bincount(inverse, minlength=len(months))
+    monthly['winning_trades'] = np.bincount(inverse, weights=trades['pnl'] > 0, minlength=len(months))
+    monthly['losing_trades'] = np.bincount(inverse, weights=trades['pnl'] < 0, minlength=len(months))
+    monthly['pnl'] = np.bincount(inverse, weights=trades['pnl'], minlength=len(months))
+    return monthly
+
+
+def save_array(path, array):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def write_ledger(trade_results, base_path=DEFAULT_LEDGER_PATH, cost_model=DEFAULT_COST_MODEL):
+    # Writes the trade table and the monthly table; accepts trade dicts or
+    # an array that already has TRADE_DTYPE
+    trades = trade_results if isinstance(trade_results, np.ndarray) \
+        else trades_to_array(trade_results, cost_model)
+    save_array(trades_path(base_path), trades)
+    save_array(monthly_path(base_path), monthly_aggregates(trades))
+    RollupIndex.build(trades).save(rollup_path(base_path))
+    return trades
+
+
+def append_ledger(trade_results, base_path=DEFAULT_LEDGER_PATH, cost_model=DEFAULT_COST_MODEL):
+    # Appends rows to the .npy trade table in place by growing the shape in
+    # its header (numpy pads headers for exactly this); the small monthly
+    # table is rebuilt from the months touched
+    new_trades = trade_results if isinstance(trade_results, np.ndarray) \
+        else trades_to_array(trade_results, cost_model)
+    path = trades_path(base_path)
+    if not os.path.exists(path):
+        return write_ledger(new_trades, base_path)
+
+    with open(path, 'r+b') as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        data_offset = f.tell()
+        if dtype != TRADE_DTYPE:
+            raise ValueError(f"{path} was written with a different trade layout")
+
+        # The grown header is built in memory first and only written over
+        # the old one when it is exactly the same length
+        header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False,
+                  'shape': (shape[0] + len(new_trades),)}
+        grown = io.BytesIO()
+        if version == (1, 0):
+            np.lib.format.write_array_header_1_0(grown, header)
+        else:
+            np.lib.format.write_array_header_2_0(grown, header)
+
+        if grown.tell() != data_offset:
+            # Header no longer fits; fall back to a full rewrite
+            f.close()
+            existing = np.load(path)
+            return write_ledger(np.concatenate([existing, new_trades]), base_path)
+
+        f.seek(0)
+        f.write(grown.getvalue())
+        f.seek(data_offset + shape[0] * dtype.itemsize)
+        f.write(new_trades.tobytes())
+        f.truncate()
+
+    # Merge the new months into the monthly table
+    monthly = np.load(monthly_path(base_path)) if os.path.exists(monthly_path(base_path)) \
+        else np.zeros(0, dtype=MONTHLY_DTYPE)
+    added = monthly_aggregates(new_trades)
+    merged = np.concatenate([monthly, added])
+    months, inverse = np.unique(merged['month'], return_inverse=True)
+    combined = np.zeros(len(months), dtype=MONTHLY_DTYPE)
+    combined['month'] = months
+    for field in ('total_trades', 'winning_trades', 'losing_trades', 'pnl'):
+        combined[field] = np.bincount(inverse, weights=merged[field], minlength=len(months))
+    save_array(monthly_path(base_path), combined)
+
+    # Roll the new trades into the period index without touching old rows
+    if os.path.exists(rollup_path(base_path)):
+        rollup = RollupIndex.load(rollup_path(base_path))
+        if rollup.ledger_rows == shape[0]:
+            rollup.append(new_trades).save(rollup_path(base_path))
+            return new_trades
+    open_rollup(base_path)
+    return new_trades
+
+
+def open_ledger(base_path=DEFAULT_LEDGER_PATH):
+    # Memory-mapped, no parsing: (trades, monthly)
+    trades = np.load(trades_path(base_path), mmap_mode='r')
+    monthly = np.load(monthly_path(base_path), mmap_mode='r')
+    return trades, monthly
+
+
+def open_rollup(base_path=DEFAULT_LEDGER_PATH):
+    # Daily/monthly/yearly rollup of the ledger, rebuilt only if it is
+    # missing or was built from a different number of ledger rows
+    path = rollup_path(base_path)
+    rollup = RollupIndex.load(path) if os.path.exists(path) else None
+
+    trades = np.load(trades_path(base_path), mmap_mode='r')
+    if rollup is None or rollup.ledger_rows != len(trades):
+        # Built in chunks so a large ledger is never read whole
+        rollup = RollupIndex()
+        for chunk in iter_chunks(trades):
+            rollup.append(chunk)
+        rollup.save(path)
+    return rollup
+
+
+def load_rollup(base_path=DEFAULT_LEDGER_PATH):
+    # Rollup for the reports: from the columnar ledger when present,
+    # otherwise built once from the legacy CSV export
+    if os.path.exists(trades_path(base_path)):
+        return open_rollup(base_path)
+    df = load_trades_frame(base_path)
+    return RollupIndex.build({'date': df['Date'].values.astype('M8[D]'), 'pnl': df['P&L'].values})
+
+
+def format_time(values):
+    text = np.datetime_as_string(values, unit='s')
+    return np.where(np.isnat(values), '', np.char.add(text, '+05:30'))
+
+
+def trades_frame(trades):
+    # Trade table as a DataFrame with the report column names
+    frame = pd.DataFrame({
+        'Date': pd.to_datetime(trades['date']),
+        'Time': format_time(trades['time']),
+        'Action': np.where(trades['action'] == ACTION_CODES['BUY'], 'BUY', 'SELL'),
+        'Entry Price': trades['entry'],
+        'Stop Loss': trades['stop_loss'],
+        'Target': trades['target'],
+        'Range High': trades['range_high'],
+        'Range Low': trades['range_low'],
+        'Position Size': trades['position_size'],
+        'Exit Price': trades['exit_price'],
+        'Exit Time': format_time(trades['exit_time']),
+        'Status': [STATUS_NAMES[code] for code in trades['status'].tolist()],
+        'P&L': trades['pnl'],
+    })
+    # Ledgers written before costs were tracked only have gross P&L
+    if 'net_pnl' in trades.dtype.names:
+        frame['Costs'] = trades['costs']
+        frame['Net P&L'] = trades['net_pnl']
+    return frame
+
+
+def load_trades_frame(base_path=DEFAULT_LEDGER_PATH):
+    # Columnar ledger when present, otherwise the legacy CSV export with its
+    # 'Monthly Total' rows filtered out
+    if os.path.exists(trades_path(base_path)):
+        trades, _ = open_ledger(base_path)
+        return trades_frame(trades)
+
+    df = pd.read_csv(f"{base_path}.csv")
+    df = df[~df['Date'].str.contains('Monthly Total', na=False)]
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
+
+
+def export_csv(base_path=DEFAULT_LEDGER_PATH, csv_path=None):
+    # Derived view: the 'Capvalis Exclusive.csv' layout with a
+    # 'Monthly Total' row after each month
+    trades, monthly = open_ledger(base_path)
+    frame = trades_frame(trades)
+    frame['Date'] = np.datetime_as_string(trades['date'], unit='D')
+
+    month_of_row = trades['date'].astype('M8[M]')
+    month_ends = np.searchsorted(month_of_row, monthly['month'], side='right')
+    parts = []
+    start = 0
+    for month, end, pnl in zip(monthly['month'], month_ends, monthly['pnl']):
+        parts.append(frame.iloc[start:end])
+        parts.append(pd.DataFrame({'Date': [f"Monthly Total ({month})"], 'P&L': [pnl]}))
+        start = end
+    out = pd.concat(parts, ignore_index=True) if parts else frame
+    out = out[list(EXPORT_COLUMNS.values())]
+    # The 'Monthly Total' rows leave Position Size empty; keep the others whole
+    out['Position Size'] = out['Position Size'].astype('Int64')
+    out.to_csv(csv_path or f"{base_path}.csv", index=False)
+    return csv_path or f"{base_path}.csv"
@@ -0,0 +1,204 @@
+import os
+import numpy as np
+import pandas as pd
+from capvalis_first_algorithm import (simulate_session, create_candle_store, session_cache_key, engine_version,
+                                      DEFAULT_PARAMS, BACKTEST_START, BACKTEST_END)
+from orb_kernel import simulate_session_bars
+from nse_calendar import trading_sessions
+from result_cache import ResultCache, MISS
+from indicators import IndicatorLibrary
+from ledger_store import trades_to_array, write_ledger
+from transaction_costs import DEFAULT_COST_MODEL
+from position_sizing import size_trades, daily_metrics_for, INITIAL_INVESTMENT, RISK_FREE_RATE, TRADING_DAYS
+
+# Runs several strategies side by side: every session's bars are loaded
+# once and handed to each registered strategy, and every strategy keeps its
+# own trades, ledger and metrics.
+
+
+class SessionData:
+    # One session's bars for all strategies of a pass. Views at each
+    # interval are built once and shared; the session is released from the
+    # candle store when the pass moves on.
+
+    def __init__(self, candle_store, date_str, fingerprint):
+        self.candle_store = candle_store
+        self.date_str = date_str
+        self.fingerprint = fingerprint
+        self._candles = {}
+
+    def bars(self, interval_minutes):
+        return self.candle_store.get_bars(self.date_str, interval_minutes)
+
+    def candles(self, interval_minutes):
+        if interval_minutes not in self._candles:
+            self._candles[interval_minutes] = self.candle_store.get_candles(self.date_str, interval_minutes)
+        return self._candles[interval_minutes]
+
+    def release(self):
+        self._candles.clear()
+        self.candle_store.release(self.date_str)
+
+
+class ORBStrategy:
+    # One variant of the opening range breakout: its own params, session
+    # engine, cost model and optional position sizing
+
+    def __init__(self, name, params=None, engine='loop', cost_model=DEFAULT_COST_MODEL, sizing=None):
+        self.name = name
+        self.params = dict(DEFAULT_PARAMS, **(params or {}))
+        self.engine = engine
+        self.cost_model = cost_model
+        self.sizing = sizing
+        engine_version(engine)  # fails early on an unknown engine
+
+    @property
+    def interval_minutes(self):
+        return self.params['interval_minutes']
+
+    def cache_key(self, session):
+        return session_cache_key(session.date_str, session.fingerprint, self.params, self.engine)
+
+    def simulate(self, session):
+        if self.engine == 'kernel':
+            return simulate_session_bars(session.date_str, session.bars(self.interval_minutes), self.params)
+        return simulate_session(session.date_str, session.candles(self.interval_minutes), self.params)
+
+    def finish(self, trade_results, daily_metrics):
+        # Sizing and costs are applied after the pass, as in capvalis_first_algorithm
+        if self.sizing is not None:
+            trade_results = size_trades(trade_results, dict({'risk_per_trade': self.params['risk_per_trade']},
+                                                            **self.sizing), self.cost_model)
+            daily_metrics = daily_metrics_for(trade_results)
+        return trade_results, daily_metrics, trades_to_array(trade_results, self.cost_model)
+
+
+def strategy_metrics(ledger):
+    # Headline numbers for comparing strategies from one ledger array.
+    # Everything but total_pnl (gross, before total_costs) is on P&L net of
+    # costs; Sharpe and CAGR follow the dashboards (per-trade returns on
+    # INITIAL_INVESTMENT).
+    pnl = ledger['pnl']
+    net_pnl = ledger['net_pnl']
+    equity = np.cumsum(net_pnl)
+    peak = np.maximum.accumulate(np.r_[0.0, equity])[1:]
+    wins = net_pnl[net_pnl > 0]
+    losses = net_pnl[net_pnl < 0]
+
+    returns = net_pnl / INITIAL_INVESTMENT
+    annual_return = returns.mean() * TRADING_DAYS if len(pnl) else 0
+    annual_volatility = returns.std(ddof=1) * np.sqrt(TRADING_DAYS) if len(pnl) > 1 else 0
+    years = (ledger['date'].max() - ledger['date'].min()).astype(np.int64) / 365.25 if len(pnl) else 0
+    final_value = INITIAL_INVESTMENT + net_pnl.sum()
+    cagr = 0
+    if years > 0:
+        # An account wiped out is a 100% loss
+        cagr = (final_value / INITIAL_INVESTMENT) ** (1 / years) - 1 if final_value > 0 else -1.0
+    return {
+        'total_trades': len(pnl),
+        'win_rate': len(wins) / len(pnl) if len(pnl) else 0,
+        'total_pnl': pnl.sum(),
+        'total_costs': ledger['costs'].sum(),
+        'net_pnl': net_pnl.sum(),
+        'profit_factor': abs(wins.sum() / losses.sum()) if len(losses) else float('inf'),
+        'avg_trade': net_pnl.mean() if len(pnl) else 0,
+        'max_drawdown': (equity - peak).min() if len(pnl) else 0,
+        'sharpe': (annual_return - RISK_FREE_RATE) / annual_volatility if annual_volatility > 0 else 0,
+        'cagr': cagr,
+    }
+
+
+class MultiStrategyRunner:
+    # Register strategies, then run() them over a date range in one scan of
+    # the data. Per strategy the results hold 'trades', 'daily_metrics',
+    # 'ledger' (TRADE_DTYPE array) and 'metrics'.
+
+    def __init__(self, candle_store=None, result_cache=None, use_result_cache=True):
+        self.candle_store = candle_store
+        self.result_cache = result_cache
+        self.use_result_cache = use_result_cache
+        self.strategies = []
+
+    def register(self, strategy):
+        if any(existing.name == strategy.name for existing in self.strategies):
+            raise ValueError(f"A strategy named '{strategy.name}' is already registered")
+        self.strategies.append(strategy)
+        return strategy
+
+    def run(self, start_date=None, end_date=None, ledger_dir=None):
+        if self.candle_store is None:
+            self.candle_store = create_candle_store()
+        if self.use_result_cache and self.result_cache is None:
+            self.result_cache = ResultCache()
+        cache = self.result_cache if self.use_result_cache else None
+
+        start_date = start_date or BACKTEST_START
+        end_date = end_date or BACKTEST_END
+        sessions = trading_sessions(start_date, end_date)
+        print(f"\nRunning {len(self.strategies)} strategies from {start_date.strftime('%Y-%m-%d')} "
+              f"to {end_date.strftime('%Y-%m-%d')} ({len(sessions)} sessions)")
+
+        # Strategies with session filters share one indicator library
+        allowed = {}
+        if any(strategy.params['filters'] for strategy in self.strategies):
+            library = IndicatorLibrary(self.candle_store, sessions, cache)
+            for strategy in self.strategies:
+                if strategy.params['filters']:
+                    allowed[strategy.name] = library.allowed_sessions(strategy.params['filters'])
+
+        collected = {strategy.name: ([], []) for strategy in self.strategies}
+        for day in sessions:
+            date_str = str(day)
+            fingerprint = self.candle_store.fingerprint(date_str)
+            # Skip if no data is available (holiday or non-trading day)
+            if fingerprint is None:
+                print(f"No data available for {date_str} - skipping")
+                continue
+
+            print(f"Processing date: {date_str}")
+            session = SessionData(self.candle_store, date_str, fingerprint)
+            for strategy in self.strategies:
+                if strategy.name in allowed and date_str not in allowed[strategy.name]:
+                    continue
+                key = strategy.cache_key(session) if cache is not None else None
+                result = cache.get(key) if key is not None else MISS
+                if result is MISS:
+                    result = strategy.simulate(session)
+                    if key is not None:
+                        cache.put(key, result)
+
+                daily_trades, daily_metric = result
+                collected[strategy.name][0].extend(daily_trades)
+                if daily_metric is not None:
+                    collected[strategy.name][1].append(daily_metric)
+            session.release()
+
+        results = {}
+        for strategy in self.strategies:
+            trade_results, daily_metrics, ledger = strategy.finish(*collected[strategy.name])
+            if ledger_dir:
+                os.makedirs(ledger_dir, exist_ok=True)
+                write_ledger(ledger, os.path.join(ledger_dir, strategy.name))
+            results[strategy.name] = {
+                'trades': trade_results,
+                'daily_metrics': daily_metrics,
+                'ledger': ledger,
+                'metrics': strategy_metrics(ledger),
+            }
+        return results
+
+
+def comparison_table(results):
+    # One row of metrics per strategy, best net P&L first
+    table = pd.DataFrame({name: result['metrics'] for name, result in results.items()}).T
+    return table.sort_values('net_pnl', ascending=False)
+
+
+if __name__ == "__main__":
+    runner = MultiStrategyRunner()
+    for interval in (5, 15, 30):
+        for min_range in (20, 40):
+            runner.register(ORBStrategy(f"orb_{interval}m_range{min_range}",
+                                        {'interval_minutes': interval, 'min_range_size': min_range},
+                                        engine='kernel'))
+    print(comparison_table(runner.run(ledger_dir='strategy_ledgers')).to_string())
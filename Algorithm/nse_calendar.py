@@ -0,0 +1,116 @@
+from datetime import datetime, date
+import numpy as np
+
+# NSE equity / F&O trading holidays (weekday closures only)
+NSE_HOLIDAYS = {
+    2022: ['2022-01-26', '2022-03-01', '2022-03-18', '2022-04-14', '2022-04-15',
+           '2022-05-03', '2022-08-09', '2022-08-15', '2022-08-31', '2022-10-05',
+           '2022-10-24', '2022-10-26', '2022-11-08'],
+    2023: ['2023-01-26', '2023-03-07', '2023-03-30', '2023-04-04', '2023-04-07',
+           '2023-04-14', '2023-05-01', '2023-06-28', '2023-08-15', '2023-09-19',
+           '2023-10-02', '2023-10-24', '2023-11-14', '2023-11-27', '2023-12-25'],
+    2024: ['2024-01-22', '2024-01-26', '2024-03-08', '2024-03-25', '2024-03-29',
+           '2024-04-11', '2024-04-17', '2024-05-01', '2024-05-20', '2024-06-17',
+           '2024-07-17', '2024-08-15', '2024-10-02', '2024-11-01', '2024-11-15',
+           '2024-11-20', '2024-12-25'],
+    2025: ['2025-02-26', '2025-03-14', '2025-03-31', '2025-04-10', '2025-04-14',
+           '2025-04-18', '2025-05-01', '2025-08-15', '2025-08-27', '2025-10-02',
+           '2025-10-21', '2025-10-22', '2025-11-05', '2025-12-25'],
+}
+
+# Years the holiday table is complete for. Outside these years every weekday
+# is treated as a session and missing data is still skipped by the backtest.
+COVERED_YEARS = frozenset(NSE_HOLIDAYS)
+
+# Weekend sessions announced by the exchange, with their trading hours
+SPECIAL_SESSIONS = {
+    '2024-01-20': ('09:15', '15:30'),  # Full Saturday session
+    '2024-03-02': ('09:15', '12:30'),  # Live session from the DR site
+    '2024-05-18': ('09:15', '12:30'),  # Live session from the DR site
+    '2025-02-01': ('09:15', '15:30'),  # Union Budget
+}
+
+# One-hour Diwali muhurat trading sessions
+MUHURAT_SESSIONS = {
+    '2022-10-24': ('18:15', '19:15'),
+    '2023-11-12': ('18:15', '19:15'),
+    '2024-11-01': ('18:00', '19:00'),
+    '2025-10-21': ('13:45', '14:45'),
+}
+
+REGULAR_HOURS = ('09:15', '15:30')
+
+SESSION_REGULAR = 0
+SESSION_SPECIAL = 1
+SESSION_MUHURAT = 2
+
+HOLIDAYS = np.array(sorted(d for days in NSE_HOLIDAYS.values() for d in days), dtype='datetime64[D]')
+SPECIAL_DAYS = np.array(sorted(SPECIAL_SESSIONS), dtype='datetime64[D]')
+MUHURAT_DAYS = np.array(sorted(MUHURAT_SESSIONS), dtype='datetime64[D]')
+
+# Special sessions with regular hours. The shorter ones (e.g. the DR-site
+# drills ending at 12:30) have no 14:45 square-off bar, so ORB trades could
+# never close; like the muhurat hour they are left out of the session lists.
+FULL_SPECIAL_DAYS = np.array(
+    sorted(d for d, hours in SPECIAL_SESSIONS.items() if hours == REGULAR_HOURS),
+    dtype='datetime64[D]')
+
+
+def to_day(value):
+    if isinstance(value, np.datetime64):
+        return value.astype('datetime64[D]')
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return np.datetime64(value, 'D')
+    return np.datetime64(value, 'D')
+
+
+def trading_sessions(start_date, end_date, include_special=True, include_muhurat=False):
+    # Every session between start_date and end_date (inclusive) as a sorted
+    # datetime64[D] array, built without any broker calls
+    start = to_day(start_date)
+    end = to_day(end_date)
+    if end < start:
+        return np.empty(0, dtype='datetime64[D]')
+
+    days = np.arange(start, end + 1, dtype='datetime64[D]')
+    sessions = days[np.is_busday(days, holidays=HOLIDAYS)]
+
+    extra = []
+    if include_special:
+        extra.append(FULL_SPECIAL_DAYS)
+    if include_muhurat:
+        extra.append(MUHURAT_DAYS)
+    for special in extra:
+        in_range = special[(special >= start) & (special <= end)]
+        if len(in_range):
+            sessions = np.union1d(sessions, in_range)
+
+    return sessions
+
+
+def session_type(day):
+    day_str = str(to_day(day))
+    if day_str in MUHURAT_SESSIONS and not np.is_busday(to_day(day), holidays=HOLIDAYS):
+        return SESSION_MUHURAT
+    if day_str in SPECIAL_SESSIONS:
+        return SESSION_SPECIAL
+    return SESSION_REGULAR
+
+
+def session_hours(day):
+    day_str = str(to_day(day))
+    if session_type(day) == SESSION_MUHURAT:
+        return MUHURAT_SESSIONS[day_str]
+    return SPECIAL_SESSIONS.get(day_str, REGULAR_HOURS)
+
+
+def is_trading_session(day):
+    day = to_day(day)
+    return bool(np.is_busday(day, holidays=HOLIDAYS)) or day in FULL_SPECIAL_DAYS
+
+
+def previous_session(day):
+    # Last regular session strictly before `day`
+    return np.busday_offset(to_day(day), -1, roll='forward', holidays=HOLIDAYS)
@@ -0,0 +1,295 @@
+import os
+from collections import OrderedDict
+import numpy as np
+from candle_aggregation import BAR_FIELDS, SESSION_OPEN_MINUTE, resample_bars, format_timestamp
+from nse_calendar import HOLIDAYS
+from transaction_costs import NIFTY_OPTIONS
+from ledger_store import write_ledger
+from position_sizing import daily_metrics_for
+
+# Minute-of-session offset of the 2:45 PM square-off (as in the ORB script)
+MARKET_CLOSE_EXIT_MINUTE = 14 * 60 + 45 - SESSION_OPEN_MINUTE
+
+OPTION_TYPES = ('CE', 'PE')
+
+# Weekly Nifty expiry weekday as a dated schedule of (effective from,
+# weekday); an expiry that falls on a holiday moves to the previous session
+EXPIRY_WEEKDAYS = [('2000-01-01', 'Thu'), ('2025-09-01', 'Tue')]
+
+DEFAULT_OPTION_PARAMS = {
+    'strike_step': 50,
+    # Strikes away from ATM: positive is out of the money, negative in the money
+    'strike_offset': 0,
+    # Sessions with fewer days left than this trade the next weekly expiry
+    'min_days_to_expiry': 0,
+    # Index stop / target distances are carried over to the premium at this delta
+    'delta': 0.5,
+}
+
+# Option bars are stored per contract across sessions, so they carry the day
+CONTRACT_FIELDS = ('day',) + BAR_FIELDS
+
+
+def atm_strike(spot, strike_step=50):
+    return (np.rint(np.asarray(spot, dtype=np.float64) / strike_step) * strike_step).astype(np.int64)
+
+
+def select_strikes(spot, actions, option_params=DEFAULT_OPTION_PARAMS):
+    # BUY signals buy calls, SELL signals buy puts; the offset moves calls up
+    # and puts down from the ATM strike
+    actions = np.asarray(actions)
+    step = option_params['strike_step']
+    is_call = actions == 'BUY'
+    offset = option_params['strike_offset'] * step
+    strikes = atm_strike(spot, step) + np.where(is_call, offset, -offset)
+    option_types = np.where(is_call, 'CE', 'PE')
+    return strikes, option_types
+
+
+def weekly_expiry(dates, min_days_to_expiry=0):
+    # Expiry of the weekly contract traded on each date, as datetime64[D]
+    dates = np.atleast_1d(np.asarray(dates, dtype='M8[D]')) + np.timedelta64(min_days_to_expiry, 'D')
+    starts = np.array([start for start, _ in EXPIRY_WEEKDAYS] + ['9999-12-31'], dtype='M8[D]')
+    earliest = dates
+
+    for _ in range(2):
+        # Next expiry weekday of each schedule entry; keep the ones that fall
+        # inside their entry's period and take the nearest
+        expiry = np.full(len(dates), np.datetime64('NaT'), dtype='M8[D]')
+        for (_, weekday), start, end in zip(EXPIRY_WEEKDAYS, starts[:-1], starts[1:]):
+            candidate = np.busday_offset(earliest, 0, roll='forward', weekmask=weekday)
+            valid = (candidate >= start) & (candidate < end)
+            expiry = np.where(valid & (np.isnat(expiry) | (candidate < expiry)), candidate, expiry)
+
+        # Holiday expiries move back to the previous session; if that is
+        # already behind the trade date, roll on to the following week
+        expiry = np.busday_offset(expiry, 0, roll='backward', holidays=HOLIDAYS)
+        expired = expiry < dates
+        if not expired.any():
+            break
+        earliest = np.where(expired, earliest + np.timedelta64(7, 'D'), earliest)
+    return expiry
+
+
+def contract_key(expiry, strike, option_type):
+    # One sortable int64 per contract: (expiry day, strike, CE/PE)
+    days = np.asarray(expiry, dtype='M8[D]').astype(np.int64)
+    is_put = np.asarray(option_type) == 'PE'
+    return (days << 32) | (np.asarray(strike, dtype=np.int64) << 1) | is_put
+
+
+def contract_name(expiry, strike, option_type):
+    return f"{expiry}_{int(strike)}{option_type}"
+
+
+class OptionCandleStore:
+    # 1-minute option bars on disk, one .npz per contract holding every
+    # session of that contract. Contracts are found through a sorted
+    # (expiry, strike, type) key index and sessions inside a contract through
+    # its sorted day column, so every lookup is a searchsorted.
+    # `fetcher(expiry, strike, option_type)` is only called for contracts
+    # that are not on disk yet and returns bars with a 'day' field.
+
+    def __init__(self, cache_dir='option_cache', underlying='NIFTY', fetcher=None, max_contracts=512):
+        self.cache_dir = os.path.join(cache_dir, underlying)
+        self.fetcher = fetcher
+        self.max_contracts = max_contracts
+        self._contracts = OrderedDict()
+        self._keys = None
+
+    def path_for(self, expiry, strike, option_type):
+        return os.path.join(self.cache_dir, f"{contract_name(expiry, strike, option_type)}.npz")
+
+    def index(self):
+        # Sorted contract keys of everything on disk, built once per store
+        if self._keys is None:
+            names = os.listdir(self.cache_dir) if os.path.isdir(self.cache_dir) else []
+            parsed = [name[:-4].split('_') for name in names if name.endswith('.npz') and '.tmp' not in name]
+            expiries = [expiry for expiry, _ in parsed]
+            strikes = [contract[:-2] for _, contract in parsed]
+            option_types = [contract[-2:] for _, contract in parsed]
+            self._keys = np.sort(contract_key(np.array(expiries, dtype='M8[D]'),
+                                              np.array(strikes, dtype=np.int64), np.array(option_types)))
+        return self._keys
+
+    def has_contracts(self, expiries, strikes, option_types):
+        keys = self.index()
+        wanted = contract_key(expiries, strikes, option_types)
+        position = np.clip(np.searchsorted(keys, wanted), 0, max(len(keys) - 1, 0))
+        return (keys[position] == wanted) if len(keys) else np.zeros(len(wanted), dtype=bool)
+
+    def put_contract(self, expiry, strike, option_type, bars):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        order = np.lexsort((bars['minute'], bars['day']))
+        bars = {field: np.asarray(bars[field])[order] for field in CONTRACT_FIELDS}
+        path = self.path_for(expiry, strike, option_type)
+        tmp_path = path[:-4] + ".tmp.npz"
+        np.savez(tmp_path, **bars)
+        os.replace(tmp_path, path)
+
+        key = int(contract_key(np.datetime64(expiry, 'D'), strike, option_type))
+        self._contracts[key] = bars
+        if self._keys is not None and key not in self._keys:
+            self._keys = np.insert(self._keys, np.searchsorted(self._keys, key), key)
+
+    def get_contract(self, expiry, strike, option_type):
+        key = int(contract_key(np.datetime64(expiry, 'D'), strike, option_type))
+        bars = self._contracts.get(key)
+        if bars is not None:
+            self._contracts.move_to_end(key)
+            return bars
+
+        if self.has_contracts([expiry], [strike], [option_type])[0]:
+            with np.load(self.path_for(expiry, strike, option_type)) as stored:
+                bars = {field: stored[field] for field in CONTRACT_FIELDS}
+        elif self.fetcher is not None:
+            bars = self.fetcher(expiry, strike, option_type)
+            if bars is None or len(bars['minute']) == 0:
+                return None
+            self.put_contract(expiry, strike, option_type, bars)
+            bars = self._contracts[key]
+        else:
+            return None
+
+        self._contracts[key] = bars
+        if len(self._contracts) > self.max_contracts:
+            self._contracts.popitem(last=False)
+        return bars
+
+    def get_session_bars(self, expiry, strike, option_type, day, interval_minutes=1):
+        # One session of a contract, sliced out of its sorted day column
+        bars = self.get_contract(expiry, strike, option_type)
+        if bars is None:
+            return None
+        day = np.datetime64(day, 'D')
+        start, end = np.searchsorted(bars['day'], [day, day + np.timedelta64(1, 'D')])
+        if start == end:
+            return None
+        session = {field: bars[field][start:end] for field in BAR_FIELDS}
+        return resample_bars(session, interval_minutes)
+
+
+def signal_minutes(trade_results):
+    # Minute-of-session offset of each signal bar; the timestamp is only read
+    # for trades recorded without one
+    return np.array([t['entry_minute'] if 'entry_minute' in t
+                     else int(t['time'][11:13]) * 60 + int(t['time'][14:16]) - SESSION_OPEN_MINUTE
+                     for t in trade_results], dtype=np.int64)
+
+
+def simulate_premium(bars, entry_index, stop_points, target_points, exit_minute):
+    # The ORB exit rules on a long premium position filled at the signal
+    # bar's close: the stop trails to entry once the high reaches 2/3 of the
+    # target, target beats stop on the same bar, and anything still open is
+    # closed on the 2:45 PM bar. Only the close check sees the entry bar;
+    # its high and low may print before the fill, so the target/stop scan
+    # starts on the next bar. Returns (entry, stop, target, exit_price,
+    # exit_index, status); exit_index is None while the trade stays open.
+    entry = float(bars['close'][entry_index])
+    stop_loss = entry - stop_points
+    target = entry + target_points
+    two_thirds_target = entry + target_points * 2 / 3
+
+    # Indexed from the entry bar, which never triggers the trail or an exit
+    high = np.r_[-np.inf, bars['high'][entry_index + 1:]]
+    low = np.r_[np.inf, bars['low'][entry_index + 1:]]
+    trailed = np.maximum.accumulate(high >= two_thirds_target)
+    stops = np.where(trailed, entry, stop_loss)
+    target_hit = high >= target
+    stop_hit = low <= stops
+    hit = target_hit | stop_hit
+
+    close_bars = np.flatnonzero(bars['minute'][entry_index:] == exit_minute)
+    close_at = close_bars[0] if len(close_bars) else len(high)
+
+    first = int(np.argmax(hit)) if hit.any() else len(high)
+    # Like the trade dict in the ORB loop, the stop reported is the one in
+    # force when the trade ends
+    last = min(first, close_at, len(high) - 1)
+    stop_loss = float(stops[last])
+    if first <= close_at and first < len(high):
+        if target_hit[first]:
+            return entry, stop_loss, target, target, entry_index + first, 'TARGET_HIT'
+        return entry, stop_loss, target, stop_loss, entry_index + first, 'STOP_LOSS_HIT'
+    if close_at < len(high):
+        return entry, stop_loss, target, float(bars['close'][entry_index + close_at]), \
+            entry_index + close_at, 'MARKET_CLOSE'
+    return entry, stop_loss, target, None, None, 'OPEN'
+
+
+def option_trades(trade_results, store, interval_minutes=15, option_params=None):
+    # Maps index ORB trades onto the chosen weekly option contract and
+    # re-runs their exits on its premium. Signals are grouped by contract so
+    # each contract is loaded once. Returns (option trades, signals without
+    # option data).
+    option_params = dict(DEFAULT_OPTION_PARAMS, **(option_params or {}))
+    if not trade_results:
+        return [], []
+
+    dates = np.array([t['date'] for t in trade_results], dtype='M8[D]')
+    spots = np.array([t['entry'] for t in trade_results], dtype=np.float64)
+    strikes, option_types = select_strikes(spots, [t['action'] for t in trade_results], option_params)
+    expiries = weekly_expiry(dates, option_params['min_days_to_expiry'])
+    minutes = signal_minutes(trade_results) // interval_minutes * interval_minutes
+    exit_minute = MARKET_CLOSE_EXIT_MINUTE // interval_minutes * interval_minutes
+    delta = option_params['delta']
+
+    keys = contract_key(expiries, strikes, option_types)
+    order = np.argsort(keys, kind='stable')
+    results = [None] * len(trade_results)
+    missing = []
+    for i in order.tolist():
+        trade = trade_results[i]
+        expiry = str(expiries[i])
+        bars = store.get_session_bars(expiry, strikes[i], option_types[i], dates[i], interval_minutes)
+        entry_index = np.searchsorted(bars['minute'], minutes[i]) if bars is not None else 0
+        if bars is None or entry_index == len(bars['minute']) or bars['minute'][entry_index] != minutes[i]:
+            missing.append(trade)
+            continue
+
+        stop_points = delta * trade['risk_points']
+        target_points = delta * abs(trade['target'] - trade['entry'])
+        entry, stop_loss, target, exit_price, exit_index, status = simulate_premium(
+            bars, entry_index, stop_points, target_points, exit_minute)
+
+        option_trade = {
+            'date': trade['date'],
+            'time': trade['time'],
+            'entry_minute': int(minutes[i]),
+            # The option is always bought; the signal direction picks CE/PE
+            'action': 'BUY',
+            'signal': trade['action'],
+            'expiry': expiry,
+            'strike': int(strikes[i]),
+            'option_type': str(option_types[i]),
+            'underlying_entry': trade['entry'],
+            'entry': entry,
+            'stop_loss': stop_loss,
+            'target': target,
+            'range_high': trade['range_high'],
+            'range_low': trade['range_low'],
+            'position_size': trade['position_size'],
+            'risk_points': stop_points,
+            'status': status,
+        }
+        if exit_index is not None:
+            option_trade['exit_price'] = exit_price
+            option_trade['exit_time'] = format_timestamp(trade['date'], bars['minute'][exit_index])
+            option_trade['exit_minute'] = int(bars['minute'][exit_index])
+            option_trade['pnl'] = (exit_price - entry) * trade['position_size']
+        results[i] = option_trade
+
+    return [trade for trade in results if trade is not None], missing
+
+
+def run_option_backtest(trade_results, store=None, interval_minutes=15, option_params=None,
+                        ledger_path='Capvalis Options', cost_model=NIFTY_OPTIONS):
+    # Option-leg version of a capvalis_first_algorithm run: same return
+    # shape, with the ledger priced on the options cost model
+    store = store or OptionCandleStore()
+    trades, missing = option_trades(trade_results, store, interval_minutes, option_params)
+    if missing:
+        print(f"No option data for {len(missing)} of {len(trade_results)} signals - skipped")
+    if ledger_path:
+        write_ledger(trades, ledger_path, cost_model)
+    return trades, daily_metrics_for(trades), missing
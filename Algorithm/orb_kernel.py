@@ -0,0 +1,265 @@
+import os
+import hashlib
+import numpy as np
+from candle_aggregation import SESSION_OPEN_MINUTE, format_timestamp, minute_times
+from ledger_store import TRADE_DTYPE, ACTION_CODES, STATUS_CODES, STATUS_NAMES
+from transaction_costs import DEFAULT_COST_MODEL, apply_costs
+
+# The ORB entry/exit state machine of simulate_session written over plain
+# arrays, so it can be compiled with numba. Without numba the same function
+# runs as ordinary Python and gives identical results, only slower.
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Opening range and square-off time (as in the ORB script)
+OPENING_RANGE_MINUTES = 30
+MARKET_CLOSE_EXIT_MINUTE = 14 * 60 + 45 - SESSION_OPEN_MINUTE
+
+BUY = ACTION_CODES['BUY']
+SELL = ACTION_CODES['SELL']
+OPEN = STATUS_CODES['OPEN']
+TARGET_HIT = STATUS_CODES['TARGET_HIT']
+STOP_LOSS_HIT = STATUS_CODES['STOP_LOSS_HIT']
+MARKET_CLOSE = STATUS_CODES['MARKET_CLOSE']
+
+# Cached session results are only reused while this file is unchanged
+with open(os.path.abspath(__file__), 'rb') as _source:
+    KERNEL_VERSION = hashlib.sha1(_source.read()).hexdigest()
+
+
+@njit(cache=True)
+def stop_target_points(price, bands, default_stop, default_target):
+    # get_stop_loss_target over a (bands, 4) array of (low, high, stop, target)
+    for j in range(bands.shape[0]):
+        if bands[j, 0] <= price <= bands[j, 1]:
+            return bands[j, 2], bands[j, 3]
+    return default_stop, default_target
+
+
+@njit(cache=True)
+def orb_kernel(starts, ends, minute, high, low, close, range_bar_count, min_range_size,
+               max_trades, exit_minute, bands, default_stop, default_target):
+    # Runs every session [starts[s], ends[s]) of the bar arrays and returns
+    # one row per trade: (session, action, entry_bar, entry, stop_loss,
+    # target, risk_points, range_high, range_low, exit_bar, exit_price,
+    # status, trailed). Rules as in simulate_session: entries are checked
+    # before exits on each bar, the stop moves to entry once price reaches
+    # 2/3 of the target, target beats stop on the same bar and open trades
+    # are closed on the 2:45 PM bar; later entries stay open.
+    capacity = 2 * len(starts)
+    t_session = np.empty(capacity, dtype=np.int64)
+    t_action = np.empty(capacity, dtype=np.int8)
+    t_entry_bar = np.empty(capacity, dtype=np.int64)
+    t_entry = np.empty(capacity, dtype=np.float64)
+    t_stop = np.empty(capacity, dtype=np.float64)
+    t_target = np.empty(capacity, dtype=np.float64)
+    t_risk = np.empty(capacity, dtype=np.float64)
+    t_range_high = np.empty(capacity, dtype=np.float64)
+    t_range_low = np.empty(capacity, dtype=np.float64)
+    t_exit_bar = np.full(capacity, -1, dtype=np.int64)
+    t_exit_price = np.full(capacity, np.nan)
+    t_status = np.zeros(capacity, dtype=np.int8)
+    t_trailed = np.zeros(capacity, dtype=np.bool_)
+    n = 0
+
+    for s in range(len(starts)):
+        a = starts[s]
+        b = ends[s]
+        if b - a < range_bar_count:
+            continue
+        range_high = high[a]
+        range_low = low[a]
+        for i in range(a + 1, a + range_bar_count):
+            range_high = max(range_high, high[i])
+            range_low = min(range_low, low[i])
+        if range_high - range_low < min_range_size:
+            continue
+
+        first = n
+        taken = 0
+        has_buy = False
+        has_sell = False
+        for i in range(a + range_bar_count, b):
+            close_price = close[i]
+            if taken < max_trades:
+                opened = False
+                if close_price > range_high and not has_buy:
+                    stop_points, target_points = stop_target_points(close_price, bands, default_stop, default_target)
+                    t_action[n] = BUY
+                    t_entry[n] = range_high
+                    t_stop[n] = range_high - stop_points
+                    t_target[n] = range_high + target_points
+                    t_risk[n] = range_high - t_stop[n]
+                    has_buy = True
+                    opened = True
+                elif close_price < range_low and not has_sell:
+                    stop_points, target_points = stop_target_points(close_price, bands, default_stop, default_target)
+                    t_action[n] = SELL
+                    t_entry[n] = range_low
+                    t_stop[n] = range_low + stop_points
+                    t_target[n] = range_low - target_points
+                    t_risk[n] = t_stop[n] - range_low
+                    has_sell = True
+                    opened = True
+                if opened:
+                    t_session[n] = s
+                    t_entry_bar[n] = i
+                    t_range_high[n] = range_high
+                    t_range_low[n] = range_low
+                    taken += 1
+                    n += 1
+
+            for t in range(first, n):
+                if t_status[t] != OPEN:
+                    continue
+                entry = t_entry[t]
+                target = t_target[t]
+                if t_action[t] == BUY:
+                    two_thirds_target = entry + ((target - entry) * 2 / 3)
+                    if high[i] >= two_thirds_target and not t_trailed[t]:
+                        t_stop[t] = entry
+                        t_trailed[t] = True
+                    if high[i] >= target:
+                        t_exit_price[t] = target
+                        t_exit_bar[t] = i
+                        t_status[t] = TARGET_HIT
+                    elif low[i] <= t_stop[t]:
+                        t_exit_price[t] = t_stop[t]
+                        t_exit_bar[t] = i
+                        t_status[t] = STOP_LOSS_HIT
+                else:
+                    two_thirds_target = entry - ((entry - target) * 2 / 3)
+                    if low[i] <= two_thirds_target and not t_trailed[t]:
+                        t_stop[t] = entry
+                        t_trailed[t] = True
+                    if low[i] <= target:
+                        t_exit_price[t] = target
+                        t_exit_bar[t] = i
+                        t_status[t] = TARGET_HIT
+                    elif high[i] >= t_stop[t]:
+                        t_exit_price[t] = t_stop[t]
+                        t_exit_bar[t] = i
+                        t_status[t] = STOP_LOSS_HIT
+
+            if minute[i] == exit_minute:
+                for t in range(first, n):
+                    if t_status[t] == OPEN:
+                        t_exit_price[t] = close[i]
+                        t_exit_bar[t] = i
+                        t_status[t] = MARKET_CLOSE
+
+    return (t_session[:n], t_action[:n], t_entry_bar[:n], t_entry[:n], t_stop[:n], t_target[:n],
+            t_risk[:n], t_range_high[:n], t_range_low[:n], t_exit_bar[:n], t_exit_price[:n],
+            t_status[:n], t_trailed[:n])
+
+
+def kernel_arguments(params):
+    # Scalar settings and the band table for orb_kernel from strategy params
+    interval_minutes = params['interval_minutes']
+    bands = np.array([band for band in params['stop_target_bands']], dtype=np.float64).reshape(-1, 4)
+    default_stop, default_target = params['default_stop_target']
+    return (max(1, -(-OPENING_RANGE_MINUTES // interval_minutes)), float(params['min_range_size']),
+            int(params['max_trades_per_day']), MARKET_CLOSE_EXIT_MINUTE // interval_minutes * interval_minutes,
+            bands, float(default_stop), float(default_target))
+
+
+def run_kernel(starts, ends, bars, params):
+    # orb_kernel over bar arrays ('minute', 'high', 'low', 'close') holding
+    # the sessions [starts, ends); returns the trade columns as a dict
+    names = ('session', 'action', 'entry_bar', 'entry', 'stop_loss', 'target', 'risk_points',
+             'range_high', 'range_low', 'exit_bar', 'exit_price', 'status', 'trailed')
+    columns = orb_kernel(np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64),
+                         np.asarray(bars['minute'], dtype=np.int64),
+                         np.asarray(bars['high'], dtype=np.float64), np.asarray(bars['low'], dtype=np.float64),
+                         np.asarray(bars['close'], dtype=np.float64), *kernel_arguments(params))
+    return dict(zip(names, columns))
+
+
+def simulate_session_bars(date_str, bars, params):
+    # Drop-in for simulate_session that takes one session's bar arrays
+    # (CandleStore.get_bars at the params interval) and returns the same
+    # (daily_trades, daily_metric)
+    if bars is None:
+        return [], None
+    trades = run_kernel([0], [len(bars['minute'])], bars, params)
+    position_size = params['position_size']
+    minutes = bars['minute'].tolist()
+
+    daily_trades = []
+    for t in range(len(trades['action'])):
+        action = 'BUY' if trades['action'][t] == BUY else 'SELL'
+        entry_minute = minutes[trades['entry_bar'][t]]
+        trade = {
+            'date': date_str,
+            'time': format_timestamp(date_str, entry_minute),
+            'entry_minute': entry_minute,
+            'action': action,
+            'entry': float(trades['entry'][t]),
+            'stop_loss': float(trades['stop_loss'][t]),
+            'target': float(trades['target'][t]),
+            'range_high': float(trades['range_high'][t]),
+            'range_low': float(trades['range_low'][t]),
+            'position_size': position_size,
+            'risk_points': float(trades['risk_points'][t]),
+            'status': STATUS_NAMES[int(trades['status'][t])],
+        }
+        if trades['trailed'][t]:
+            trade['trailing_stop_updated'] = True
+        if trades['exit_bar'][t] >= 0:
+            exit_minute = minutes[trades['exit_bar'][t]]
+            trade['exit_price'] = float(trades['exit_price'][t])
+            trade['exit_time'] = format_timestamp(date_str, exit_minute)
+            trade['exit_minute'] = exit_minute
+            if action == 'BUY':
+                trade['pnl'] = (trade['exit_price'] - trade['entry']) * position_size
+            else:
+                trade['pnl'] = (trade['entry'] - trade['exit_price']) * position_size
+        daily_trades.append(trade)
+
+    if not daily_trades:
+        return daily_trades, None
+
+    winning_trades = len([t for t in daily_trades if t.get('pnl', 0) > 0])
+    losing_trades = len([t for t in daily_trades if t.get('pnl', 0) < 0])
+    daily_metric = {
+        'date': date_str,
+        'total_trades': len(daily_trades),
+        'winning_trades': winning_trades,
+        'losing_trades': losing_trades,
+        'win_rate': winning_trades / len(daily_trades),
+        'daily_pnl': sum(trade.get('pnl', 0) for trade in daily_trades)
+    }
+    return daily_trades, daily_metric
+
+
+def kernel_ledger(bar_index, params, cost_model=DEFAULT_COST_MODEL):
+    # Whole-history backtest straight into a ledger array: one kernel call
+    # over a BarIndex built at the params interval, no per-trade dicts
+    if bar_index.interval_minutes != params['interval_minutes']:
+        raise ValueError(f"BarIndex has {bar_index.interval_minutes}-minute bars, "
+                         f"params ask for {params['interval_minutes']}")
+    ends = np.r_[bar_index.starts[1:], len(bar_index.minute)]
+    bars = {field: getattr(bar_index, field) for field in ('minute', 'high', 'low', 'close')}
+    trades = run_kernel(bar_index.starts, ends, bars, params)
+
+    ledger = np.zeros(len(trades['action']), dtype=TRADE_DTYPE)
+    closed = trades['exit_bar'] >= 0
+    exit_bar = np.where(closed, trades['exit_bar'], 0)
+    ledger['date'] = bar_index.days[trades['session']]
+    ledger['time'] = minute_times(ledger['date'], bar_index.minute[trades['entry_bar']])
+    ledger['exit_time'] = minute_times(ledger['date'], np.where(closed, bar_index.minute[exit_bar], -1))
+    for field in ('action', 'entry', 'stop_loss', 'target', 'range_high', 'range_low',
+                  'risk_points', 'exit_price', 'status'):
+        ledger[field] = trades[field]
+    ledger['position_size'] = params['position_size']
+    ledger['pnl'] = np.where(closed, (ledger['exit_price'] - ledger['entry']) * ledger['action'], 0.0) \
+        * params['position_size']
+    return apply_costs(ledger, cost_model)
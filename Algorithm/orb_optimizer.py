@@ -0,0 +1,181 @@
+import os
+import math
+import numpy as np
+from datetime import datetime
+from capvalis_first_algorithm import create_candle_store, BACKTEST_START, BACKTEST_END
+from nse_calendar import trading_sessions
+from parameter_sweep import run_sweep, expand_grid, params_label, SWEEP_CHECKPOINT_DIR
+from result_cache import ResultCache
+from transaction_costs import DEFAULT_COST_MODEL
+
+# Adaptive search over ORB params (Hyperband). Each bracket samples
+# candidates, backtests them on the most recent few sessions, keeps the best
+# 1/eta and gives the survivors eta times more history, until the last rung
+# runs the full period. Budgets are trailing windows that end on end_date, so
+# every rung's sessions include the previous rung's and their results come
+# back from the result cache: a survivor only simulates the sessions it has
+# not seen yet. Rungs run through run_sweep, so they are checkpointed, spread
+# over `workers` processes and, with a SweepStore, recorded there.
+
+# Candidates kept per rung: 1 in ETA
+ETA = 3
+# Shortest backtest a candidate is judged on
+MIN_SESSIONS = 20
+# Neighbours averaged by the surrogate, and how many random candidates it
+# ranks for every one it proposes
+SURROGATE_NEIGHBOURS = 5
+SURROGATE_POOL = 10
+
+DEFAULT_SPACE = {
+    'interval_minutes': [5, 10, 15, 30],
+    'max_trades_per_day': [1, 2],
+    'min_range_size': [10, 20, 30, 40, 60, 80],
+}
+
+
+def session_window(sessions, count):
+    # (start, end) datetimes of the last `count` sessions
+    window = sessions[-count:]
+    return (window[0].astype('M8[ms]').astype(datetime), window[-1].astype('M8[ms]').astype(datetime))
+
+
+def score_of(record, metric):
+    # Ranking score of a sweep record; a set without trades, or without a
+    # usable metric, always ranks last
+    value = record['metrics'].get(metric)
+    if not record['metrics']['total_trades'] or value is None or math.isnan(value):
+        return -math.inf
+    return value
+
+
+class KNNSurrogate:
+    # Predicts a candidate's score from the best-budget scores of its nearest
+    # evaluated neighbours. Params are placed on [0, 1] by their position in
+    # the search space's choice lists, so any param (bands included) works.
+
+    def __init__(self, space, neighbours=SURROGATE_NEIGHBOURS):
+        self.space = space
+        self.neighbours = neighbours
+        self.observations = {}
+
+    def encode(self, params):
+        return np.array([self.space[name].index(params[name]) / max(len(self.space[name]) - 1, 1)
+                         for name in self.space])
+
+    def observe(self, params, budget, score):
+        # The longest backtest seen for a candidate is the one that counts
+        label = params_label(params)
+        if label not in self.observations or budget >= self.observations[label][1]:
+            self.observations[label] = (self.encode(params), budget, score)
+
+    def predict(self, candidates):
+        points = [(x, score) for x, _, score in self.observations.values() if np.isfinite(score)]
+        if not points:
+            return np.zeros(len(candidates))
+        known = np.array([x for x, _ in points])
+        scores = np.array([score for _, score in points])
+        k = min(self.neighbours, len(points))
+        predictions = []
+        for params in candidates:
+            distance = np.abs(known - self.encode(params)).sum(axis=1)
+            predictions.append(scores[np.argsort(distance, kind='stable')[:k]].mean())
+        return np.array(predictions)
+
+
+class ORBOptimizer:
+    # optimize() returns the full-period records of the last rung of every
+    # bracket, best first, each with a 'budget' (sessions backtested)
+
+    def __init__(self, space=None, metric='sharpe', eta=ETA, min_sessions=MIN_SESSIONS, surrogate=True,
+                 candle_store=None, result_cache=None, engine='kernel', cost_model=DEFAULT_COST_MODEL,
+                 store=None, workers=1, checkpoint_dir=os.path.join(SWEEP_CHECKPOINT_DIR, 'optimizer'), seed=0):
+        self.space = {name: list(choices) for name, choices in (space or DEFAULT_SPACE).items()}
+        self.metric = metric
+        self.eta = eta
+        self.min_sessions = min_sessions
+        self.surrogate = KNNSurrogate(self.space) if surrogate else None
+        self.candle_store = candle_store
+        self.result_cache = result_cache
+        self.engine = engine
+        self.cost_model = cost_model
+        self.store = store
+        self.workers = workers
+        self.checkpoint_dir = checkpoint_dir
+        self.rng = np.random.default_rng(seed)
+        self.sessions_run = 0
+        self.seen = set()
+
+    def sample(self, n):
+        # n parameter sets not tried yet: random, or with a surrogate the
+        # best predicted from a random pool once there are observations
+        remaining = [params for params in expand_grid(self.space) if params_label(params) not in self.seen]
+        pool_size = n * SURROGATE_POOL if self.surrogate is not None and self.surrogate.observations else n
+        order = self.rng.permutation(len(remaining))[:pool_size]
+        pool = [remaining[i] for i in order]
+        if len(pool) > n:
+            predicted = self.surrogate.predict(pool)
+            pool = [pool[i] for i in np.argsort(-predicted, kind='stable')[:n]]
+        self.seen.update(params_label(params) for params in pool)
+        return pool
+
+    def evaluate(self, candidates, sessions, budget):
+        start_date, end_date = session_window(sessions, budget)
+        records = run_sweep(candidates, start_date, end_date, candle_store=self.candle_store,
+                            result_cache=self.result_cache, engine=self.engine, cost_model=self.cost_model,
+                            checkpoint_dir=self.checkpoint_dir, store=self.store, workers=self.workers)
+        self.sessions_run += budget * len(candidates)
+        for record in records:
+            record['budget'] = budget
+            if self.surrogate is not None:
+                self.surrogate.observe(record['params'], budget, score_of(record, self.metric))
+        return records
+
+    def successive_halving(self, candidates, sessions, budget):
+        # Rungs of eta-times more sessions with 1/eta of the candidates,
+        # ending with the full period
+        while True:
+            records = self.evaluate(candidates, sessions, budget)
+            records.sort(key=lambda record: score_of(record, self.metric), reverse=True)
+            print(f"Rung of {budget} sessions: best {self.metric} {score_of(records[0], self.metric):.3f} "
+                  f"({records[0]['label']})")
+            if budget >= len(sessions):
+                return records
+            candidates = [record['params'] for record in records[:max(1, len(records) // self.eta)]]
+            budget = min(budget * self.eta, len(sessions))
+
+    def optimize(self, start_date=None, end_date=None):
+        start_date = start_date or BACKTEST_START
+        end_date = end_date or BACKTEST_END
+        sessions = trading_sessions(start_date, end_date)
+        if self.candle_store is None:
+            self.candle_store = create_candle_store()
+        if self.result_cache is None:
+            self.result_cache = ResultCache()
+        # Every rung works from the local candle cache
+        self.candle_store.prefetch(sessions)
+
+        # Brackets from many candidates on short windows to a few on the full period
+        max_rungs = max(0, int(math.log(len(sessions) / self.min_sessions, self.eta))) if len(sessions) else 0
+        results = []
+        for rungs in range(max_rungs, -1, -1):
+            n = math.ceil((max_rungs + 1) / (rungs + 1) * self.eta ** rungs)
+            candidates = self.sample(n)
+            if not candidates:
+                break
+            budget = max(1, math.ceil(len(sessions) / self.eta ** rungs))
+            print(f"\nBracket of {len(candidates)} candidates starting at {budget} sessions")
+            results.extend(self.successive_halving(candidates, sessions, budget))
+
+        results.sort(key=lambda record: score_of(record, self.metric), reverse=True)
+        full_grid = len(expand_grid(self.space)) * len(sessions)
+        print(f"\nBacktested {self.sessions_run} candidate-sessions "
+              f"({self.sessions_run / full_grid:.0%} of the full grid's {full_grid})")
+        return results
+
+
+if __name__ == "__main__":
+    optimizer = ORBOptimizer(workers=os.cpu_count())
+    best = optimizer.optimize()
+    for record in best[:5]:
+        print(f"{record['label']}: {optimizer.metric} {score_of(record, optimizer.metric):.3f}, "
+              f"net P&L {record['metrics']['net_pnl']:,.0f}")
@@ -0,0 +1,65 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Aim for a few chunks per worker: enough to balance uneven sessions,
+# few enough that pickling and scheduling stay cheap
+CHUNKS_PER_WORKER = 4
+
+
+def simulate_chunk(session_func, chunk, params):
+    results = []
+    for date_str, candles in chunk:
+        try:
+            results.append(session_func(date_str, candles, params))
+        except Exception as e:
+            # A failed session comes back as None; the caller reports it and
+            # never caches or checkpoints it, so a later run retries it
+            print(f"Session {date_str} failed: {type(e).__name__}: {e}")
+            results.append(None)
+    return results
+
+
+def chunk_sessions(session_candles, chunksize):
+    return [session_candles[i:i + chunksize] for i in range(0, len(session_candles), chunksize)]
+
+
+def simulate_sessions(session_func, session_candles, params, workers=None, executor='process', chunksize=None):
+    # Maps a pure per-session function such as simulate_session over
+    # [(date_str, candles), ...] and returns one (daily_trades, daily_metric)
+    # per session, in the input order, or None for a session that raised
+    # (the error is printed with its date).
+    # With a process pool, call this from under `if __name__ == "__main__":`
+    # on platforms that spawn workers (Windows, macOS).
+    session_candles = list(session_candles)
+    if not session_candles:
+        return []
+
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, -(-len(session_candles) // (workers * CHUNKS_PER_WORKER)))
+    chunks = chunk_sessions(session_candles, chunksize)
+
+    if workers == 1 or len(chunks) == 1:
+        chunk_results = [simulate_chunk(session_func, chunk, params) for chunk in chunks]
+    else:
+        pool_class = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+        with pool_class(max_workers=workers) as pool:
+            # map() yields in submission order, so the reduction is deterministic
+            chunk_results = list(pool.map(simulate_chunk, [session_func] * len(chunks), chunks,
+                                          [params] * len(chunks)))
+
+    return [result for results in chunk_results for result in results]
+
+
+def reduce_session_results(session_results):
+    # Concatenate per-session results into the ledger, in session order
+    trade_results = []
+    daily_metrics = []
+    for result in session_results:
+        if result is None:
+            continue
+        daily_trades, daily_metric = result
+        trade_results.extend(daily_trades)
+        if daily_metric is not None:
+            daily_metrics.append(daily_metric)
+    return trade_results, daily_metrics
@@ -0,0 +1,117 @@
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from capvalis_first_algorithm import create_candle_store, engine_version, BACKTEST_START, BACKTEST_END
+from candle_aggregation import CandleStore
+from nse_calendar import trading_sessions
+from multi_strategy import MultiStrategyRunner, ORBStrategy, comparison_table
+from result_cache import ResultCache
+from transaction_costs import DEFAULT_COST_MODEL
+from checkpoint import CheckpointLog, CHECKPOINT_DIR
+from sweep_store import SweepStore
+
+# Grid search over ORB params. Parameter sets are run in batches through a
+# MultiStrategyRunner (one scan of the data per batch) and every finished
+# batch is appended to the sweep's checkpoint log, so an interrupted sweep
+# started again only runs the parameter sets it had not finished. Sessions
+# already simulated for a parameter set come back from the result cache.
+# With workers > 1 the batches run in separate processes that read the same
+# on-disk candle and result caches, and each worker writes its batch to the
+# sweep store itself.
+
+SWEEP_CHECKPOINT_DIR = os.path.join(CHECKPOINT_DIR, 'sweeps')
+# Parameter sets run per pass over the data (and per checkpoint)
+SWEEP_BATCH_SIZE = 10
+
+
+def expand_grid(grid):
+    # {'param': [values, ...], ...} -> one params dict per combination, in
+    # grid order
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def params_label(params):
+    # Readable, unique name for a parameter set, e.g. "interval_minutes=15,min_range_size=20"
+    return ",".join(f"{name}={value}" for name, value in sorted(params.items()))
+
+
+def shared_candle_store(candle_store):
+    # A view of the same on-disk candles for pool workers: no broker
+    # fetcher (it holds a live session), so every session must already be
+    # cached by the parent
+    return CandleStore(os.path.dirname(candle_store.cache_dir), candle_store.symboltoken)
+
+
+def run_batch(batch, start_date, end_date, candle_store, result_cache, engine, cost_model,
+              store=None, sweep_key=None):
+    # One pass over the data for a batch of parameter sets
+    runner = MultiStrategyRunner(candle_store, result_cache)
+    for params in batch:
+        runner.register(ORBStrategy(params_label(params), params, engine, cost_model))
+    results = runner.run(start_date, end_date)
+
+    records = [{'label': params_label(params), 'params': params,
+                'metrics': results[params_label(params)]['metrics']} for params in batch]
+    if store is not None:
+        store.insert_many(records, sweep_key, start_date, end_date)
+    return records
+
+
+def run_sweep(grid, start_date=None, end_date=None, candle_store=None, result_cache=None, engine='kernel',
+              cost_model=DEFAULT_COST_MODEL, batch_size=SWEEP_BATCH_SIZE, checkpoint_dir=SWEEP_CHECKPOINT_DIR,
+              store=None, workers=1):
+    # Returns one {'label', 'params', 'metrics'} record per parameter set
+    # (metrics as in strategy_metrics), in grid order. `grid` may also be a
+    # list of params dicts to run as given. With a SweepStore every finished
+    # batch is also inserted there under the sweep's key.
+    start_date = start_date or BACKTEST_START
+    end_date = end_date or BACKTEST_END
+    param_sets = expand_grid(grid) if isinstance(grid, dict) else list(grid)
+
+    # Only a sweep of the same parameter sets, dates, costs and code resumes from this log
+    sweep_key = ResultCache.make_key('sweep', engine_version(engine), grid, start_date, end_date, cost_model)
+    log = CheckpointLog(os.path.join(checkpoint_dir, f"sweep_{sweep_key[:24]}.pkl"))
+    records = {record['label']: record for batch in log.load() for record in batch}
+    if records:
+        print(f"Resuming sweep: {len(records)} of {len(param_sets)} parameter sets already done")
+
+    todo = [params for params in param_sets if params_label(params) not in records]
+    batches = [todo[start:start + batch_size] for start in range(0, len(todo), batch_size)]
+    if batches:
+        candle_store = candle_store or create_candle_store()
+        result_cache = result_cache or ResultCache()
+
+    def finished(batch_records):
+        records.update((record['label'], record) for record in batch_records)
+        log.append(batch_records, done=len(records), total=len(param_sets))
+        print(f"Sweep progress: {len(records)} of {len(param_sets)} parameter sets")
+
+    if workers > 1 and len(batches) > 1:
+        candle_store.prefetch(trading_sessions(start_date, end_date))
+        shared = shared_candle_store(candle_store)
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = [pool.submit(run_batch, batch, start_date, end_date, shared, result_cache, engine,
+                                   cost_model, store, sweep_key) for batch in batches]
+            # Batches are checkpointed as they finish, in whatever order
+            for future in as_completed(futures):
+                finished(future.result())
+        finally:
+            pool.shutdown(cancel_futures=True)
+    else:
+        for batch in batches:
+            finished(run_batch(batch, start_date, end_date, candle_store, result_cache, engine,
+                               cost_model, store, sweep_key))
+
+    # The completed log is kept: running the same sweep again just reads it back
+    return [records[params_label(params)] for params in param_sets]
+
+
+if __name__ == "__main__":
+    store = SweepStore()
+    records = run_sweep({'interval_minutes': [5, 15, 30], 'max_trades_per_day': [1, 2],
+                         'min_range_size': [20, 30, 40, 60]}, store=store, workers=os.cpu_count())
+    print(comparison_table({record['label']: record for record in records}).to_string())
+    print("\nTop 5 by Sharpe with drawdown under 50,000:")
+    print(store.top(5, 'sharpe', max_drawdown=50000).to_string())
@@ -0,0 +1,168 @@
+import numpy as np
+from transaction_costs import DEFAULT_COST_MODEL, apply_costs
+from ledger_store import trades_to_array
+
+# NSE Nifty lot size
+NIFTY_LOT_SIZE = 75
+
+# Account conventions of the reports: Sharpe and CAGR are taken on per-trade
+# returns on INITIAL_INVESTMENT, annualised over TRADING_DAYS
+INITIAL_INVESTMENT = 100000
+RISK_FREE_RATE = 0.05
+TRADING_DAYS = 252
+
+SIZING_MODES = ('fixed_lots', 'fixed_fractional', 'volatility')
+
+DEFAULT_SIZING = {
+    # 'fixed_lots': always `lots` lots
+    # 'fixed_fractional': risk `risk_per_trade` of equity over the stop distance
+    # 'volatility': risk `risk_per_trade` of equity over
+    #               `volatility_multiplier` x the opening range width
+    'mode': 'fixed_lots',
+    'lot_size': NIFTY_LOT_SIZE,
+    'lots': 1,
+    'risk_per_trade': 0.02,
+    'volatility_multiplier': 1.0,
+    # Enough for the fractional modes to buy a Nifty lot at the widest
+    # default stop (2% of 5 lakh covers 60 points x 75)
+    'initial_capital': 500000,
+    # Optional cap: lots whose margin exceeds `max_margin_fraction` of equity are dropped
+    'margin_per_lot': None,
+    'max_margin_fraction': 1.0,
+    'max_lots': None,
+    # Size each session from equity at its start (True) or from initial capital
+    'compounding': True,
+}
+
+
+def lots_for(equity, risk_points, range_width, sizing=DEFAULT_SIZING):
+    # Whole lots for each trade; works on scalars or arrays alike. A trade
+    # that cannot afford one lot gets 0 lots (it is not taken).
+    equity = np.asarray(equity, dtype=np.float64)
+    risk_points = np.asarray(risk_points, dtype=np.float64)
+    range_width = np.asarray(range_width, dtype=np.float64)
+    mode = sizing['mode']
+    lot_size = sizing['lot_size']
+
+    if mode == 'fixed_lots':
+        lots = np.full(np.broadcast(equity, risk_points, range_width).shape, float(sizing['lots']))
+    elif mode in ('fixed_fractional', 'volatility'):
+        if mode == 'fixed_fractional':
+            risk_per_lot = risk_points * lot_size
+        else:
+            risk_per_lot = sizing['volatility_multiplier'] * range_width * lot_size
+        budget = equity * sizing['risk_per_trade']
+        valid = np.isfinite(risk_per_lot) & (risk_per_lot > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lots = np.where(valid, np.floor(budget / np.where(valid, risk_per_lot, 1.0)), 0.0)
+    else:
+        raise ValueError(f"Unknown sizing mode '{mode}' - choose from {', '.join(SIZING_MODES)}")
+
+    if sizing['margin_per_lot']:
+        affordable = np.floor(np.maximum(equity, 0) * sizing['max_margin_fraction'] / sizing['margin_per_lot'])
+        lots = np.minimum(lots, affordable)
+    if sizing['max_lots'] is not None:
+        lots = np.minimum(lots, sizing['max_lots'])
+    # A blown account takes no further trades
+    lots = np.where(equity > 0, np.maximum(lots, 0), 0)
+    return lots.astype(np.int64)
+
+
+class PositionSizer:
+    # Incremental sizing for loop-driven and live runs: call start_session()
+    # at each session, quantity() per signal and record() with realised P&L
+
+    def __init__(self, sizing=None):
+        self.sizing = dict(DEFAULT_SIZING, **(sizing or {}))
+        self.equity = float(self.sizing['initial_capital'])
+        self.session = None
+        self.session_equity = self.equity
+
+    def start_session(self, session):
+        # Every trade of a session is sized off the same equity
+        if session != self.session:
+            self.session = session
+            self.session_equity = self.equity if self.sizing['compounding'] \
+                else float(self.sizing['initial_capital'])
+
+    def lots(self, risk_points, range_width):
+        return lots_for(self.session_equity, risk_points, range_width, self.sizing)
+
+    def quantity(self, risk_points, range_width):
+        return self.lots(risk_points, range_width) * self.sizing['lot_size']
+
+    def record(self, pnl):
+        self.equity += float(np.sum(pnl))
+
+
+def size_ledger(ledger, sizing=None, cost_model=DEFAULT_COST_MODEL, keep_skipped=False):
+    # Re-sizes a ledger array (sorted by date) that was simulated at a fixed
+    # quantity: quantities, P&L, costs and net P&L are rescaled per trade.
+    # Without compounding this is one pass over the arrays; with it, sessions
+    # are walked in order and each session's trades are sized together.
+    # Signals sized to zero lots were not taken and are dropped, unless
+    # keep_skipped keeps them (at position_size 0) aligned with the input.
+    sizer = PositionSizer(sizing)
+    sized = ledger.copy()
+    if len(ledger) == 0:
+        return sized
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        unit_pnl = np.where(ledger['position_size'] > 0, ledger['pnl'] / ledger['position_size'], 0.0)
+    range_width = ledger['range_high'] - ledger['range_low']
+
+    if not sizer.sizing['compounding']:
+        sized['position_size'] = sizer.quantity(ledger['risk_points'], range_width)
+        sized['pnl'] = unit_pnl * sized['position_size']
+        apply_costs(sized, cost_model)
+    else:
+        dates = ledger['date']
+        starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+        ends = np.r_[starts[1:], len(ledger)]
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            sizer.start_session(dates[start])
+            session = sized[start:end]
+            session['position_size'] = sizer.quantity(ledger['risk_points'][start:end], range_width[start:end])
+            session['pnl'] = unit_pnl[start:end] * session['position_size']
+            apply_costs(session, cost_model)
+            sizer.record(session['net_pnl'])
+    return sized if keep_skipped else sized[sized['position_size'] > 0]
+
+
+def size_trades(trade_results, sizing=None, cost_model=DEFAULT_COST_MODEL):
+    # Same sizing for the broker-style trade dicts; returns sized copies of
+    # the trades that were taken
+    trade_results = sorted(trade_results, key=lambda x: x['date'])
+    sized = size_ledger(trades_to_array(trade_results, cost_model), sizing, cost_model, keep_skipped=True)
+    sized_trades = []
+    for trade, quantity, pnl in zip(trade_results, sized['position_size'].tolist(), sized['pnl'].tolist()):
+        if quantity <= 0:
+            continue
+        trade = dict(trade, position_size=quantity)
+        if 'pnl' in trade:
+            trade['pnl'] = pnl
+        sized_trades.append(trade)
+    return sized_trades
+
+
+def daily_metrics_for(trade_results):
+    # Daily metrics rebuilt from (re-sized) trades, as simulate_session builds
+    # them; any signal sized to zero lots was not taken and is left out
+    by_date = {}
+    for trade in trade_results:
+        if trade['position_size'] > 0:
+            by_date.setdefault(trade['date'], []).append(trade)
+
+    daily_metrics = []
+    for date_str, daily_trades in by_date.items():
+        winning_trades = len([t for t in daily_trades if t.get('pnl', 0) > 0])
+        losing_trades = len([t for t in daily_trades if t.get('pnl', 0) < 0])
+        daily_metrics.append({
+            'date': date_str,
+            'total_trades': len(daily_trades),
+            'winning_trades': winning_trades,
+            'losing_trades': losing_trades,
+            'win_rate': winning_trades / len(daily_trades) if daily_trades else 0,
+            'daily_pnl': sum(trade.get('pnl', 0) for trade in daily_trades)
+        })
+    return daily_metrics
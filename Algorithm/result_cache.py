@@ -0,0 +1,92 @@
+import os
+import json
+import pickle
+import hashlib
+
+# Returned by ResultCache.get when nothing is stored under a key, so that
+# None can still be cached as a real result
+MISS = object()
+
+
+class ResultCache:
+    # Pickled backtest results on disk, one file per key, evicted in least
+    # recently used order once the directory grows past max_bytes
+
+    def __init__(self, cache_dir='result_cache', max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._sizes = None
+
+    @staticmethod
+    def make_key(*parts):
+        # Stable hash of any JSON-like parts (params dicts, fingerprints, ...)
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _load_sizes(self):
+        if self._sizes is None:
+            self._sizes = {}
+            if os.path.isdir(self.cache_dir):
+                for name in os.listdir(self.cache_dir):
+                    if name.endswith('.pkl'):
+                        path = os.path.join(self.cache_dir, name)
+                        self._sizes[path] = os.path.getsize(path)
+        return self._sizes
+
+    def get(self, key):
+        path = self.path_for(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return MISS
+        # Touch the entry so eviction sees it as recently used
+        os.utime(path, None)
+        return value
+
+    def put(self, key, value):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path_for(key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        sizes = self._load_sizes()
+        sizes[path] = os.path.getsize(path)
+        self.evict()
+
+    def evict(self):
+        sizes = self._load_sizes()
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+
+        # Oldest access time first
+        by_age = []
+        for path in sizes:
+            try:
+                by_age.append((os.path.getmtime(path), path))
+            except OSError:
+                by_age.append((0, path))
+        by_age.sort()
+
+        for _, path in by_age:
+            if total <= self.max_bytes:
+                break
+            total -= sizes.pop(path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        for path in list(self._load_sizes()):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._sizes = {}
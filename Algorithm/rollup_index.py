@@ -0,0 +1,129 @@
+import os
+import numpy as np
+
+# Period levels of the rollup and the datetime64 unit each one is keyed by
+LEVELS = {'daily': 'D', 'monthly': 'M', 'yearly': 'Y'}
+ROLLUP_FIELDS = ('pnl', 'trades', 'wins')
+
+
+class RollupIndex:
+    # Dense per-day, per-month and per-year P&L, trade counts and win counts.
+    # Slot i of a level is period origin + i, so lookups are plain indexing
+    # and appending trades is an np.add.at into the right slots.
+
+    def __init__(self):
+        self.ledger_rows = 0
+        self.origins = {level: None for level in LEVELS}
+        self.arrays = {
+            level: {
+                'pnl': np.zeros(0, dtype=np.float64),
+                'trades': np.zeros(0, dtype=np.int64),
+                'wins': np.zeros(0, dtype=np.int64),
+            }
+            for level in LEVELS
+        }
+
+    @classmethod
+    def build(cls, trades):
+        rollup = cls()
+        rollup.append(trades)
+        return rollup
+
+    def _grow(self, level, keys):
+        # Make room for keys before the origin or past the end
+        unit = LEVELS[level]
+        arrays = self.arrays[level]
+        lo = keys.min()
+        hi = keys.max()
+        origin = self.origins[level]
+        if origin is None:
+            origin = lo
+        size = len(arrays['pnl'])
+
+        front = max(0, int((origin - lo).astype(np.int64)))
+        back = max(0, int((hi - origin).astype(np.int64)) + 1 - size)
+        if front or back:
+            for field in ROLLUP_FIELDS:
+                arrays[field] = np.pad(arrays[field], (front, back))
+        self.origins[level] = np.datetime64(origin - front, unit)
+
+    def append(self, trades):
+        # `trades` has the ledger's 'date' and 'pnl' columns
+        if len(trades['pnl']) == 0:
+            return self
+
+        pnl = np.asarray(trades['pnl'], dtype=np.float64)
+        wins = (pnl > 0).astype(np.int64)
+        dates = np.asarray(trades['date'], dtype='M8[D]')
+
+        for level, unit in LEVELS.items():
+            keys = dates.astype(f'M8[{unit}]')
+            self._grow(level, keys)
+            slots = (keys - self.origins[level]).astype(np.int64)
+            arrays = self.arrays[level]
+            np.add.at(arrays['pnl'], slots, pnl)
+            np.add.at(arrays['trades'], slots, 1)
+            np.add.at(arrays['wins'], slots, wins)
+
+        self.ledger_rows += len(pnl)
+        return self
+
+    def periods(self, level):
+        origin = self.origins[level]
+        if origin is None:
+            return np.zeros(0, dtype=f'M8[{LEVELS[level]}]')
+        return origin + np.arange(len(self.arrays[level]['pnl']))
+
+    def level(self, level, traded_only=True):
+        # (periods, pnl, trades, wins) for a level; by default only the
+        # periods that had at least one trade
+        periods = self.periods(level)
+        arrays = self.arrays[level]
+        if not traded_only:
+            return periods, arrays['pnl'], arrays['trades'], arrays['wins']
+        mask = arrays['trades'] > 0
+        return periods[mask], arrays['pnl'][mask], arrays['trades'][mask], arrays['wins'][mask]
+
+    def yearly(self):
+        years, pnl, trades, wins = self.level('yearly')
+        return years.astype(np.int64) + 1970, pnl, trades, wins
+
+    def monthly_matrix(self, fill=0.0):
+        # Year x month P&L grid for the heatmaps; months without trades get `fill`
+        months, pnl, trades, _ = self.level('monthly', traded_only=False)
+        if len(months) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, 12))
+        first_year = int(months[0].astype('M8[Y]').astype(np.int64)) + 1970
+        last_year = int(months[-1].astype('M8[Y]').astype(np.int64)) + 1970
+        years = np.arange(first_year, last_year + 1)
+
+        grid = np.full((len(years), 12), fill, dtype=np.float64)
+        month_numbers = months.astype(np.int64)
+        rows = month_numbers // 12 + 1970 - first_year
+        cols = month_numbers % 12
+        traded = trades > 0
+        grid[rows[traded], cols[traded]] = pnl[traded]
+        return years, grid
+
+    def save(self, path):
+        payload = {'ledger_rows': np.array(self.ledger_rows)}
+        for level in LEVELS:
+            if self.origins[level] is not None:
+                payload[f'{level}_origin'] = np.array(self.origins[level])
+            for field in ROLLUP_FIELDS:
+                payload[f'{level}_{field}'] = self.arrays[level][field]
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, **payload)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        rollup = cls()
+        with np.load(path) as stored:
+            rollup.ledger_rows = int(stored['ledger_rows'])
+            for level in LEVELS:
+                if f'{level}_origin' in stored:
+                    rollup.origins[level] = stored[f'{level}_origin'][()]
+                for field in ROLLUP_FIELDS:
+                    rollup.arrays[level][field] = stored[f'{level}_{field}']
+        return rollup
@@ -0,0 +1,145 @@
+import os
+import json
+import sqlite3
+import pandas as pd
+from capvalis_first_algorithm import DEFAULT_PARAMS
+
+# Sweep results in one SQLite table: a row per (sweep, parameter set) with a
+# column per strategy param and per metric. Params and headline metrics are
+# indexed, so "top 20 by Sharpe with drawdown above -50,000" is an index
+# scan rather than a pass over every row. The database runs in WAL mode:
+# sweep workers in other processes append batches while readers query.
+
+SWEEP_DB_PATH = 'sweep_results.db'
+
+# As returned by multi_strategy.strategy_metrics
+METRIC_COLUMNS = ('total_trades', 'win_rate', 'total_pnl', 'total_costs', 'net_pnl', 'profit_factor',
+                  'avg_trade', 'max_drawdown', 'sharpe', 'cagr')
+INDEXED_METRICS = ('sharpe', 'cagr', 'max_drawdown', 'profit_factor', 'net_pnl')
+# Params that are lists or dicts (stop/target bands, filters) are stored as JSON text
+PARAM_COLUMNS = tuple(DEFAULT_PARAMS)
+
+OPERATORS = ('=', '!=', '<', '<=', '>', '>=')
+
+
+def to_column(value):
+    # SQLite value of a param or metric: lists and dicts as JSON, numpy
+    # scalars as plain numbers
+    if isinstance(value, (list, tuple, dict)):
+        return json.dumps(value, sort_keys=True)
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+
+class SweepStore:
+    # Open one store per process; the connection is made on first use and
+    # is never shared, so the store can be handed to pool workers
+
+    def __init__(self, path=SWEEP_DB_PATH, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self._connection = None
+        self._pid = None
+
+    def __getstate__(self):
+        return {'path': self.path, 'timeout': self.timeout, '_connection': None, '_pid': None}
+
+    def connection(self):
+        if self._connection is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=self.timeout)
+            self._pid = os.getpid()
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self.create_schema()
+        return self._connection
+
+    def create_schema(self):
+        connection = self._connection
+        columns = ["sweep TEXT NOT NULL", "label TEXT NOT NULL", "start_date TEXT", "end_date TEXT"]
+        columns += [f"{name} {'TEXT' if isinstance(DEFAULT_PARAMS[name], (list, tuple, dict)) else 'NUMERIC'}"
+                    for name in PARAM_COLUMNS]
+        columns += [f"{name} REAL" for name in METRIC_COLUMNS]
+        with connection:
+            connection.execute(f"CREATE TABLE IF NOT EXISTS results ({', '.join(columns)}, "
+                               "PRIMARY KEY (sweep, label))")
+            # A database made before a param or metric was added gets the new column
+            existing = {row[1] for row in connection.execute("PRAGMA table_info(results)")}
+            for column in columns:
+                if column.split()[0] not in existing:
+                    connection.execute(f"ALTER TABLE results ADD COLUMN {column}")
+            for name in PARAM_COLUMNS + INDEXED_METRICS:
+                connection.execute(f"CREATE INDEX IF NOT EXISTS results_{name} ON results ({name})")
+
+    @property
+    def columns(self):
+        return ('sweep', 'label', 'start_date', 'end_date') + PARAM_COLUMNS + METRIC_COLUMNS
+
+    def insert_many(self, records, sweep, start_date=None, end_date=None):
+        # One transaction per batch of {'label', 'params', 'metrics'}
+        # records; a parameter set already stored for this sweep is replaced
+        rows = []
+        for record in records:
+            params = dict(DEFAULT_PARAMS, **record['params'])
+            metrics = record['metrics']
+            rows.append((sweep, record['label'], str(start_date), str(end_date))
+                        + tuple(to_column(params[name]) for name in PARAM_COLUMNS)
+                        + tuple(to_column(metrics.get(name)) for name in METRIC_COLUMNS))
+        connection = self.connection()
+        with connection:
+            connection.executemany(f"INSERT OR REPLACE INTO results ({', '.join(self.columns)}) "
+                                   f"VALUES ({', '.join('?' * len(self.columns))})", rows)
+        return len(rows)
+
+    def query(self, order_by='sharpe', descending=True, limit=None, where=(), sweep=None, **equals):
+        # Rows as a DataFrame. `where` is a list of (column, operator, value)
+        # conditions, e.g. [('max_drawdown', '>', -50000)]; keyword
+        # arguments match params exactly, e.g. interval_minutes=15.
+        conditions = list(where) + [(name, '=', value) for name, value in equals.items()]
+        if sweep is not None:
+            conditions.append(('sweep', '=', sweep))
+
+        clauses = []
+        values = []
+        for column, operator, value in conditions:
+            if column not in self.columns:
+                raise ValueError(f"Unknown column '{column}'")
+            if operator not in OPERATORS:
+                raise ValueError(f"Unknown operator '{operator}' - choose from {', '.join(OPERATORS)}")
+            clauses.append(f"{column} {operator} ?")
+            values.append(to_column(value))
+        if order_by not in self.columns:
+            raise ValueError(f"Unknown column '{order_by}'")
+
+        sql = "SELECT * FROM results"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order_by} {'DESC' if descending else 'ASC'}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            values.append(int(limit))
+        return pd.read_sql_query(sql, self.connection(), params=values)
+
+    def top(self, n=10, metric='sharpe', max_drawdown=None, min_trades=None, where=(), **kwargs):
+        # Best `n` parameter sets by `metric`; max_drawdown is the largest
+        # drawdown allowed, in rupees (e.g. 50000 keeps max_drawdown >= -50000)
+        where = list(where)
+        if max_drawdown is not None:
+            where.append(('max_drawdown', '>=', -abs(max_drawdown)))
+        if min_trades is not None:
+            where.append(('total_trades', '>=', min_trades))
+        return self.query(order_by=metric, descending=True, limit=n, where=where, **kwargs)
+
+    def count(self, sweep=None):
+        sql = "SELECT COUNT(*) FROM results"
+        values = ()
+        if sweep is not None:
+            sql += " WHERE sweep = ?"
+            values = (sweep,)
+        return self.connection().execute(sql, values).fetchone()[0]
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,103 @@
+import numpy as np
+from candle_aggregation import BarIndex, SESSION_OPEN_MINUTE
+from ledger_store import ACTION_CODES, STATUS_CODES, save_array, DEFAULT_LEDGER_PATH
+
+# How far each trade moved against (MAE) and for (MFE) its entry before it
+# closed, from the session bars between its entry and exit bar. All trades
+# are reduced at once: their bar ranges are laid end to end in one index
+# array and np.maximum/np.minimum.reduceat give every trade's extreme high
+# and low.
+
+# One row per ledger trade, in ledger order. Excursions are in index
+# points (never negative) and in multiples of the trade's risk_points.
+# Open trades are measured to the end of their session and have
+# bars_to_exit -1 and minutes_in_trade NaN.
+EXCURSION_DTYPE = np.dtype([
+    ('mae', 'f8'),
+    ('mfe', 'f8'),
+    ('mae_r', 'f8'),
+    ('mfe_r', 'f8'),
+    ('bars_to_exit', 'i4'),
+    ('minutes_in_trade', 'f8'),
+])
+
+
+def excursions_path(base_path):
+    return f"{base_path}.excursions.npy"
+
+
+def session_minutes(times):
+    # Minute-of-session offsets of ledger times, -1 for NaT
+    times = np.asarray(times, dtype='M8[s]')
+    missing = np.isnat(times)
+    days = times.astype('M8[D]').astype('M8[s]')
+    minutes = (times - days).astype(np.int64) // 60 - SESSION_OPEN_MINUTE
+    return np.where(missing, -1, minutes)
+
+
+def segment_rows(starts, ends):
+    # Rows of the inclusive ranges [starts[i], ends[i]] concatenated, and
+    # the offset of each range in the result (for reduceat)
+    lengths = ends - starts + 1
+    offsets = np.r_[0, np.cumsum(lengths)[:-1]].astype(np.int64)
+    rows = np.arange(lengths.sum(), dtype=np.int64) - np.repeat(offsets - starts, lengths)
+    return rows, offsets
+
+
+def trade_excursions(ledger, bar_index):
+    # EXCURSION_DTYPE array for a TRADE_DTYPE ledger. Use a BarIndex at the
+    # interval the backtest ran on, so the bars are the ones the strategy
+    # saw; trades on sessions missing from it get NaN excursions.
+    excursions = np.zeros(len(ledger), dtype=EXCURSION_DTYPE)
+    for field in ('mae', 'mfe', 'mae_r', 'mfe_r', 'minutes_in_trade'):
+        excursions[field] = np.nan
+    excursions['bars_to_exit'] = -1
+    if not len(ledger):
+        return excursions
+
+    entry_rows = bar_index.rows(ledger['date'], session_minutes(ledger['time']))
+    closed = ledger['status'] != STATUS_CODES['OPEN']
+    exit_rows = bar_index.rows(ledger['date'], session_minutes(ledger['exit_time']))
+    # Open trades run to the last bar of their session
+    sessions = bar_index.session_numbers(ledger['date'])
+    session_ends = np.r_[bar_index.starts[1:], len(bar_index.minute)] - 1
+    last_rows = np.where(sessions >= 0, session_ends[np.maximum(sessions, 0)], -1)
+    exit_rows = np.where(closed, exit_rows, last_rows)
+
+    valid = (entry_rows >= 0) & (exit_rows >= entry_rows)
+    if not valid.any():
+        return excursions
+    rows, offsets = segment_rows(entry_rows[valid], exit_rows[valid])
+    highest = np.maximum.reduceat(bar_index.high[rows], offsets)
+    lowest = np.minimum.reduceat(bar_index.low[rows], offsets)
+
+    entry = ledger['entry'][valid]
+    buy = ledger['action'][valid] == ACTION_CODES['BUY']
+    mae = np.maximum(np.where(buy, entry - lowest, highest - entry), 0.0)
+    mfe = np.maximum(np.where(buy, highest - entry, entry - lowest), 0.0)
+    risk = ledger['risk_points'][valid]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        excursions['mae_r'][valid] = np.where(risk > 0, mae / risk, np.nan)
+        excursions['mfe_r'][valid] = np.where(risk > 0, mfe / risk, np.nan)
+    excursions['mae'][valid] = mae
+    excursions['mfe'][valid] = mfe
+
+    done = valid & closed
+    excursions['bars_to_exit'][done] = (exit_rows - entry_rows)[done]
+    excursions['minutes_in_trade'][done] = \
+        (ledger['exit_time'][done] - ledger['time'][done]).astype('m8[s]').astype(np.int64) / 60
+    return excursions
+
+
+def write_excursions(ledger, candle_store, interval_minutes, base_path=DEFAULT_LEDGER_PATH):
+    # Excursions of a ledger, saved next to it as <base_path>.excursions.npy
+    bar_index = BarIndex.from_store(candle_store, np.unique(ledger['date']), interval_minutes)
+    excursions = trade_excursions(ledger, bar_index)
+    save_array(excursions_path(base_path), excursions)
+    return excursions
+
+
+def open_excursions(base_path=DEFAULT_LEDGER_PATH):
+    # Memory-mapped excursions, aligned row for row with open_ledger()
+    return np.load(excursions_path(base_path), mmap_mode='r')
+
@@ -0,0 +1,156 @@
+import itertools
+import numpy as np
+
+# Statutory charges for NSE F&O. Rates that changed over time are dated
+# schedules of (effective from, rate); the rate in force on the trade date
+# applies. Turnover-based rates are fractions of traded value.
+NIFTY_FUTURES = {
+    # Discount-broker brokerage: flat per order, capped at a % of order value
+    'brokerage_per_order': 20.0,
+    'brokerage_pct': 0.0003,
+    # STT on the sell leg
+    'stt_sell': [('2000-01-01', 0.000125), ('2024-10-01', 0.0002)],
+    # NSE transaction charges on turnover
+    'exchange': [('2000-01-01', 0.000019), ('2024-10-01', 0.0000173)],
+    # SEBI turnover fee (Rs 10 per crore)
+    'sebi': 0.000001,
+    # GST on brokerage + exchange + SEBI charges
+    'gst': 0.18,
+    # Stamp duty on the buy leg
+    'stamp_buy': 0.00002,
+    # Adverse fill per side: 'none', 'fixed' (index points), 'percent'
+    # (fraction of price) or 'range' (fraction of the opening range width)
+    'slippage': 'fixed',
+    'slippage_value': 0.5,
+    # Stop orders fill worse than limit exits
+    'stop_slippage_multiplier': 2.0,
+}
+
+# Index options: STT and stamp duty on premium, higher exchange charges
+NIFTY_OPTIONS = dict(
+    NIFTY_FUTURES,
+    brokerage_pct=None,
+    stt_sell=[('2000-01-01', 0.000625), ('2024-10-01', 0.001)],
+    exchange=[('2000-01-01', 0.0005), ('2024-10-01', 0.0003503)],
+    stamp_buy=0.00003,
+)
+
+# Costs switched off: net P&L equals gross P&L
+ZERO_COSTS = {
+    'brokerage_per_order': 0.0, 'brokerage_pct': None, 'stt_sell': 0.0, 'exchange': 0.0,
+    'sebi': 0.0, 'gst': 0.0, 'stamp_buy': 0.0, 'slippage': 'none', 'slippage_value': 0.0,
+    'stop_slippage_multiplier': 1.0,
+}
+
+DEFAULT_COST_MODEL = NIFTY_FUTURES
+
+COST_COMPONENTS = ('slippage', 'brokerage', 'stt', 'exchange', 'sebi', 'gst', 'stamp')
+
+# Ledger codes (see ledger_store); kept here to avoid a circular import
+BUY = 1
+STOP_LOSS_HIT = 2
+
+
+def rate_on(schedule, dates):
+    # A dated schedule evaluated per trade date, or a plain rate (scalar or
+    # an array that broadcasts against the trades, e.g. in a sweep)
+    if isinstance(schedule, (list, tuple)):
+        starts = np.array([start for start, _ in schedule], dtype='M8[D]')
+        rates = np.array([rate for _, rate in schedule], dtype=np.float64)
+        index = np.searchsorted(starts, np.asarray(dates, dtype='M8[D]'), side='right') - 1
+        return np.where(index >= 0, rates[np.clip(index, 0, None)], 0.0)
+    return np.asarray(schedule, dtype=np.float64)
+
+
+def slippage_points(model, entry, range_width):
+    kind = model['slippage']
+    value = np.asarray(model['slippage_value'], dtype=np.float64)
+    if kind == 'none':
+        return np.zeros_like(entry)
+    if kind == 'fixed':
+        return value + np.zeros_like(entry)
+    if kind == 'percent':
+        return value * entry
+    if kind == 'range':
+        return value * range_width
+    raise ValueError(f"Unknown slippage model '{kind}'")
+
+
+def trade_costs(ledger, model=DEFAULT_COST_MODEL):
+    # Cost breakdown for every closed trade of a ledger array, computed as
+    # whole-array operations. Model values may be arrays shaped (scenarios, 1)
+    # to price many cost scenarios at once; results then have shape
+    # (scenarios, trades). Open trades carry no costs, like their P&L, and
+    # neither do signals sized to zero lots.
+    model = dict(DEFAULT_COST_MODEL, **model)
+    closed = ~np.isnan(ledger['exit_price']) & (ledger['position_size'] > 0)
+    entry = ledger['entry']
+    exit_price = np.where(closed, ledger['exit_price'], entry)
+    quantity = ledger['position_size'].astype(np.float64)
+    is_buy = ledger['action'] == BUY
+
+    entry_slip = slippage_points(model, entry, ledger['range_high'] - ledger['range_low'])
+    exit_slip = entry_slip * np.where(ledger['status'] == STOP_LOSS_HIT,
+                                      np.asarray(model['stop_slippage_multiplier'], dtype=np.float64), 1.0)
+
+    # Fill prices move against the trade on both legs
+    entry_fill = np.where(is_buy, entry + entry_slip, entry - entry_slip)
+    exit_fill = np.where(is_buy, exit_price - exit_slip, exit_price + exit_slip)
+    buy_value = np.where(is_buy, entry_fill, exit_fill) * quantity
+    sell_value = np.where(is_buy, exit_fill, entry_fill) * quantity
+    turnover = buy_value + sell_value
+
+    per_order = np.asarray(model['brokerage_per_order'], dtype=np.float64)
+    if model['brokerage_pct'] is None:
+        brokerage = 2 * per_order + np.zeros_like(turnover)
+    else:
+        pct = np.asarray(model['brokerage_pct'], dtype=np.float64)
+        brokerage = np.minimum(per_order, pct * buy_value) + np.minimum(per_order, pct * sell_value)
+
+    dates = ledger['date']
+    costs = {
+        'slippage': (entry_slip + exit_slip) * quantity,
+        'brokerage': brokerage,
+        'stt': rate_on(model['stt_sell'], dates) * sell_value,
+        'exchange': rate_on(model['exchange'], dates) * turnover,
+        'sebi': rate_on(model['sebi'], dates) * turnover,
+        'stamp': rate_on(model['stamp_buy'], dates) * buy_value,
+    }
+    costs['gst'] = rate_on(model['gst'], dates) * (costs['brokerage'] + costs['exchange'] + costs['sebi'])
+
+    for component in COST_COMPONENTS:
+        costs[component] = np.where(closed, costs[component], 0.0)
+    costs['total'] = sum(costs[component] for component in COST_COMPONENTS)
+    return costs
+
+
+def apply_costs(ledger, model=DEFAULT_COST_MODEL):
+    # Fills the ledger's 'costs' and 'net_pnl' columns in place
+    ledger['costs'] = trade_costs(ledger, model)['total']
+    ledger['net_pnl'] = ledger['pnl'] - ledger['costs']
+    return ledger
+
+
+def cost_sensitivity(ledger, model=DEFAULT_COST_MODEL, batch_size=256, **grid):
+    # Net P&L over the full grid of the given model values, e.g.
+    # cost_sensitivity(ledger, slippage_value=np.linspace(0, 3, 31),
+    #                  brokerage_per_order=[0, 10, 20])
+    # Returns the scenario values per grid key plus 'total_costs' and
+    # 'net_pnl' per scenario. Scenarios are priced in batches as 2-D arrays.
+    names = list(grid)
+    combos = np.array(list(itertools.product(*[np.asarray(grid[name], dtype=np.float64) for name in names])))
+    if not names:
+        combos = np.zeros((1, 0))
+    gross = ledger['pnl'].sum()
+
+    total_costs = np.empty(len(combos))
+    for start in range(0, len(combos), batch_size):
+        batch = combos[start:start + batch_size]
+        overrides = {name: batch[:, i:i + 1] for i, name in enumerate(names)}
+        costs = trade_costs(ledger, dict(model, **overrides))['total']
+        total_costs[start:start + batch_size] = np.atleast_2d(costs).sum(axis=1)
+
+    results = {name: combos[:, i] for i, name in enumerate(names)}
+    results['total_costs'] = total_costs
+    results['net_pnl'] = gross - total_costs
+    return results
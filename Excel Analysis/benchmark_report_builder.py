@@ -0,0 +1,169 @@
+import os
+import time
+import argparse
+import tempfile
+from datetime import datetime
+import numpy as np
+from openpyxl import Workbook, LXML
+from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
+from openpyxl.utils import get_column_letter
+from ledger_store import trades_to_array
+from report_builder import ReportBuilder
+
+# Compares the original per-cell Trade Details sheet with ReportBuilder on
+# synthetic trades: python benchmark_report_builder.py --sizes 10000 100000 1000000
+
+STATUSES = ['TARGET_HIT', 'STOP_LOSS_HIT', 'MARKET_CLOSE']
+LEGACY_HEADERS = ['Date', 'Time', 'Action', 'Entry Price', 'Stop Loss', 'Target',
+                  'Range High', 'Range Low', 'Position Size', 'Exit Price',
+                  'Exit Time', 'Status', 'P&L']
+
+
+def synthetic_trades(count, seed=0):
+    # Up to two trades per session, like the ORB strategy
+    rng = np.random.default_rng(seed)
+    days = np.busday_offset('2000-01-03', np.arange(count) // 2, roll='forward')
+    entries = np.round(rng.uniform(15000, 25000, count), 2)
+    pnl = np.round(rng.normal(500, 8000, count), 2)
+    trade_results = []
+    for day, entry, profit, status in zip(days.astype(str).tolist(), entries.tolist(), pnl.tolist(),
+                                          rng.integers(0, len(STATUSES), count).tolist()):
+        trade_results.append({
+            'date': day,
+            'time': f"{day}T09:45:00+05:30",
+            'action': 'BUY' if profit > 0 else 'SELL',
+            'entry': entry,
+            'stop_loss': entry - 50,
+            'target': entry + 150,
+            'range_high': entry + 10,
+            'range_low': entry - 60,
+            'position_size': 75,
+            'exit_price': entry + profit / 75,
+            'exit_time': f"{day}T11:15:00+05:30",
+            'status': STATUSES[status],
+            'pnl': profit,
+        })
+    return trade_results
+
+
+def legacy_trade_details(trade_results, path):
+    # The Trade Details sheet as excel_analysis.py used to build it
+    wb = Workbook()
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_font = Font(color="FFFFFF", bold=True)
+    data_font = Font(name="Calibri")
+    border = Border(left=Side(style='thin'), right=Side(style='thin'),
+                   top=Side(style='thin'), bottom=Side(style='thin'))
+    alignment = Alignment(horizontal='center', vertical='center')
+
+    ws_trades = wb.active
+    ws_trades.title = "Trade Details"
+    for col, header in enumerate(LEGACY_HEADERS, 1):
+        cell = ws_trades.cell(row=1, column=col)
+        cell.value = header
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.border = border
+        cell.alignment = alignment
+
+    row = 2
+    trade_results.sort(key=lambda x: x['date'])
+    monthly_trades = {}
+    for trade in trade_results:
+        date = datetime.strptime(trade['date'], '%Y-%m-%d')
+        month_key = date.strftime('%Y-%m')
+        if month_key not in monthly_trades:
+            monthly_trades[month_key] = []
+        monthly_trades[month_key].append(trade)
+
+    for month_key, trades in monthly_trades.items():
+        month_pnl = 0
+        for trade in trades:
+            ws_trades.cell(row=row, column=1, value=trade['date'])
+            ws_trades.cell(row=row, column=2, value=trade['time'])
+            ws_trades.cell(row=row, column=3, value=trade['action'])
+            ws_trades.cell(row=row, column=4, value=trade['entry'])
+            ws_trades.cell(row=row, column=5, value=trade['stop_loss'])
+            ws_trades.cell(row=row, column=6, value=trade['target'])
+            ws_trades.cell(row=row, column=7, value=trade['range_high'])
+            ws_trades.cell(row=row, column=8, value=trade['range_low'])
+            ws_trades.cell(row=row, column=9, value=trade['position_size'])
+            ws_trades.cell(row=row, column=10, value=trade.get('exit_price', ''))
+            ws_trades.cell(row=row, column=11, value=trade.get('exit_time', ''))
+            ws_trades.cell(row=row, column=12, value=trade['status'])
+            ws_trades.cell(row=row, column=13, value=trade.get('pnl', 0))
+            for col in range(1, 14):
+                cell = ws_trades.cell(row=row, column=col)
+                cell.font = data_font
+                cell.border = border
+                cell.alignment = alignment
+            month_pnl += trade.get('pnl', 0)
+            row += 1
+
+        ws_trades.cell(row=row, column=1, value=f"Monthly Total ({month_key})")
+        ws_trades.cell(row=row, column=13, value=month_pnl)
+        for col in range(1, 14):
+            cell = ws_trades.cell(row=row, column=col)
+            cell.fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
+            cell.font = Font(bold=True)
+            cell.border = border
+            cell.alignment = alignment
+        row += 1
+
+    for column in ws_trades.columns:
+        max_length = 0
+        column = list(column)
+        for cell in column:
+            if len(str(cell.value)) > max_length:
+                max_length = len(str(cell.value))
+        ws_trades.column_dimensions[get_column_letter(column[0].column)].width = max_length + 2
+
+    wb.save(path)
+
+
+def builder_trade_details(trade_results, path):
+    trade_results.sort(key=lambda x: x['date'])
+    report = ReportBuilder()
+    report.add_trade_details(trades_to_array(trade_results))
+    report.save(path)
+
+
+def time_call(func, trade_results, path):
+    start = time.perf_counter()
+    func(trade_results, path)
+    return time.perf_counter() - start
+
+
+def run_benchmark(sizes, legacy_max=None, output_dir=None):
+    output_dir = output_dir or tempfile.mkdtemp(prefix="report_benchmark_")
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    # Serialising cells dominates both writers; openpyxl streams through
+    # lxml when it is installed and through pure-Python et_xmlfile otherwise
+    print(f"openpyxl XML writer: {'lxml' if LXML else 'et_xmlfile (install lxml for faster writes)'}")
+    print(f"{'Trades':>10} {'Legacy (s)':>12} {'Builder (s)':>12} {'Speedup':>9}")
+    for size in sizes:
+        trade_results = synthetic_trades(size)
+        builder_time = time_call(builder_trade_details, list(trade_results),
+                                 os.path.join(output_dir, f"builder_{size}.xlsx"))
+        legacy_time = None
+        if legacy_max is None or size <= legacy_max:
+            legacy_time = time_call(legacy_trade_details, list(trade_results),
+                                    os.path.join(output_dir, f"legacy_{size}.xlsx"))
+
+        speedup = f"{legacy_time / builder_time:8.1f}x" if legacy_time else f"{'-':>9}"
+        legacy_text = f"{legacy_time:12.2f}" if legacy_time else f"{'skipped':>12}"
+        print(f"{size:>10,} {legacy_text} {builder_time:12.2f} {speedup}")
+        results.append((size, legacy_time, builder_time))
+    print(f"Workbooks written to {output_dir}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Trade Details sheet writers")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--legacy-max', type=int, default=None,
+                        help="Skip the legacy writer above this many trades")
+    parser.add_argument('--output-dir', default=None)
+    args = parser.parse_args()
+    run_benchmark(args.sizes, args.legacy_max, args.output_dir)
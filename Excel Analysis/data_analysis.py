@@ -5,6 +5,7 @@ from datetime import datetime
 import numpy as np
 from matplotlib.ticker import FuncFormatter
 import matplotlib.dates as mdates
+from ledger_store import load_trades_frame, load_rollup
 
 # Set the style for all plots
 plt.style.use('seaborn-v0_8-darkgrid')
@@ -20,14 +21,11 @@ COLORS = {
     'background': '#F5F5F5'
 }
 
-# Read the CSV file
-df = pd.read_csv('Capvalis Exclusive.csv')
+# Load the trade ledger (memory-mapped columnar file, or the CSV export)
+df = load_trades_frame('Capvalis Exclusive')
 
-# Filter out monthly total rows
-df = df[~df['Date'].str.contains('Monthly Total', na=False)]
-
-# Convert date column to datetime
-df['Date'] = pd.to_datetime(df['Date'])
+# Daily/monthly/yearly P&L rollup, built once per ledger version
+rollup = load_rollup('Capvalis Exclusive')
 
 # Calculate cumulative P&L
 df['Cumulative_PnL'] = df['P&L'].cumsum()
@@ -71,8 +69,9 @@ def plot_equity_curve():
 
 # 2. Yearly Returns Bar Chart
 def plot_yearly_returns():
-    # Calculate yearly returns
-    yearly_returns = df.groupby(df['Date'].dt.year)['P&L'].sum()
+    # Yearly returns straight from the rollup index
+    years, yearly_pnl, _, _ = rollup.yearly()
+    yearly_returns = pd.Series(yearly_pnl, index=years)
     
     fig = plt.figure(figsize=(15, 8))
     fig.patch.set_facecolor(COLORS['background'])
@@ -177,17 +176,11 @@ def plot_win_rate_rr():
 
 # 5. Monthly PnL Heatmap
 def plot_monthly_heatmap():
-    # Create monthly PnL matrix
-    monthly_pnl = df.pivot_table(
-        values='P&L',
-        index=df['Date'].dt.year,
-        columns=df['Date'].dt.month,
-        aggfunc='sum'
-    )
-    
-    # Rename columns to month names
-    monthly_pnl.columns = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                          'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    # Monthly PnL matrix from the rollup index (blank where nothing traded)
+    years, grid = rollup.monthly_matrix(fill=np.nan)
+    monthly_pnl = pd.DataFrame(grid, index=years,
+                               columns=['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
+                                        'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
     
     fig = plt.figure(figsize=(15, 8))
     fig.patch.set_facecolor(COLORS['background'])
@@ -0,0 +1,170 @@
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, PatternFill, Font, Alignment, Border, Side
+from openpyxl.utils import get_column_letter
+from ledger_store import format_time, ACTION_CODES, STATUS_NAMES
+
+TRADE_HEADERS = ['Date', 'Time', 'Action', 'Entry Price', 'Stop Loss', 'Target',
+                 'Range High', 'Range Low', 'Position Size', 'Exit Price',
+                 'Exit Time', 'Status', 'P&L', 'Costs', 'Net P&L']
+DAILY_HEADERS = ['Date', 'Total Trades', 'Winning Trades', 'Losing Trades',
+                 'Win Rate', 'Daily P&L']
+METRIC_HEADERS = ['Metric', 'Value']
+
+
+def make_styles():
+    # Registered once per workbook; cells then only carry the style name
+    border = Border(left=Side(style='thin'), right=Side(style='thin'),
+                    top=Side(style='thin'), bottom=Side(style='thin'))
+    alignment = Alignment(horizontal='center', vertical='center')
+    return {
+        'header': NamedStyle(name='Capvalis Header', border=border, alignment=alignment,
+                             fill=PatternFill(start_color="366092", end_color="366092", fill_type="solid"),
+                             font=Font(color="FFFFFF", bold=True)),
+        'data': NamedStyle(name='Capvalis Data', border=border, alignment=alignment,
+                           font=Font(name="Calibri")),
+        'total': NamedStyle(name='Capvalis Monthly Total', border=border, alignment=alignment,
+                            fill=PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid"),
+                            font=Font(bold=True)),
+    }
+
+
+def month_keys(dates):
+    # Integer month key (months since 1970-01) from ISO dates or datetime64
+    return np.asarray(dates, dtype='M8[D]').astype('M8[M]').astype(np.int64)
+
+
+def month_label(key):
+    return str(np.datetime64(int(key), 'M'))
+
+
+def text_width(values):
+    # Longest str() of the values, as the old per-cell column width pass
+    values = np.asarray(values)
+    if len(values) == 0:
+        return 0
+    if values.dtype == object:
+        return max(len(str(v)) for v in values.tolist())
+    return int(np.char.str_len(values.astype(str)).max())
+
+
+def trade_detail_columns(ledger):
+    # Trade Details columns from a ledger array (ledger_store.TRADE_DTYPE),
+    # formatted like the broker trade dicts
+    exit_price = ledger['exit_price'].astype(object)
+    exit_price[np.isnan(ledger['exit_price'])] = ''
+    return [
+        np.datetime_as_string(ledger['date'], unit='D'),
+        format_time(ledger['time']),
+        np.where(ledger['action'] == ACTION_CODES['BUY'], 'BUY', 'SELL'),
+        ledger['entry'],
+        ledger['stop_loss'],
+        ledger['target'],
+        ledger['range_high'],
+        ledger['range_low'],
+        ledger['position_size'],
+        exit_price,
+        format_time(ledger['exit_time']),
+        np.array([STATUS_NAMES[code] for code in ledger['status'].tolist()]),
+        ledger['pnl'],
+        ledger['costs'],
+        ledger['net_pnl'],
+    ]
+
+
+def daily_summary_columns(daily_metrics):
+    fields = ('date', 'total_trades', 'winning_trades', 'losing_trades', 'win_rate', 'daily_pnl')
+    return [np.array([metric[field] for metric in daily_metrics]) for field in fields]
+
+
+class ReportBuilder:
+    # Streams sheets into a write-only workbook: whole rows are appended
+    # through reused, pre-styled cells, monthly groups come from an integer
+    # month key and column widths are known before the first row is written
+
+    def __init__(self):
+        self.wb = Workbook(write_only=True)
+        self.styles = make_styles()
+        for style in self.styles.values():
+            self.wb.add_named_style(style)
+
+    def row_template(self, ws, style, size):
+        cells = []
+        for _ in range(size):
+            cell = WriteOnlyCell(ws)
+            cell.style = self.styles[style].name
+            cells.append(cell)
+        return cells
+
+    def add_table(self, title, headers, columns, group_keys=None, total_columns=()):
+        # Writes one sheet. With `group_keys` (sorted, one per row) a
+        # 'Monthly Total (YYYY-MM)' row summing `total_columns` follows each group.
+        ws = self.wb.create_sheet(title)
+        size = len(columns[0]) if columns else 0
+
+        starts = ends = np.zeros(0, dtype=np.int64)
+        labels = []
+        totals = {}
+        if group_keys is not None and size:
+            group_keys = np.asarray(group_keys)
+            boundaries = np.flatnonzero(np.diff(group_keys)) + 1
+            starts = np.r_[0, boundaries]
+            ends = np.r_[boundaries, size]
+            labels = [f"Monthly Total ({month_label(key)})" for key in group_keys[starts].tolist()]
+            totals = {col: np.add.reduceat(np.asarray(columns[col], dtype=np.float64), starts).tolist()
+                      for col in total_columns}
+        elif size:
+            starts = np.array([0])
+            ends = np.array([size])
+
+        # Column widths go into the sheet header, so they are set up front
+        for col, (header, values) in enumerate(zip(headers, columns)):
+            width = max(len(str(header)), text_width(values))
+            if labels and col == 0:
+                width = max(width, max(len(label) for label in labels))
+            if col in totals:
+                width = max(width, max(len(str(total)) for total in totals[col]))
+            ws.column_dimensions[get_column_letter(col + 1)].width = width + 2
+
+        header_row = self.row_template(ws, 'header', len(headers))
+        for cell, header in zip(header_row, headers):
+            cell.value = header
+        ws.append(header_row)
+
+        data_row = self.row_template(ws, 'data', len(headers))
+        total_row = self.row_template(ws, 'total', len(headers))
+        values = [np.asarray(column).tolist() for column in columns]
+        for group, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+            for row in zip(*[column[start:end] for column in values]):
+                for cell, value in zip(data_row, row):
+                    cell.value = value
+                ws.append(data_row)
+
+            if labels:
+                total_row[0].value = labels[group]
+                for col, column_totals in totals.items():
+                    total_row[col].value = column_totals[group]
+                ws.append(total_row)
+        return ws
+
+    def add_trade_details(self, ledger):
+        # `ledger` sorted by date
+        return self.add_table("Trade Details", TRADE_HEADERS, trade_detail_columns(ledger),
+                              group_keys=month_keys(ledger['date']), total_columns=(12, 13, 14))
+
+    def add_daily_summary(self, daily_metrics):
+        # `daily_metrics` sorted by date
+        columns = daily_summary_columns(daily_metrics)
+        return self.add_table("Daily Summary", DAILY_HEADERS, columns,
+                              group_keys=month_keys(columns[0]) if daily_metrics else None,
+                              total_columns=(5,))
+
+    def add_metrics(self, metrics):
+        return self.add_table("Performance Metrics", METRIC_HEADERS,
+                              [np.array([m[0] for m in metrics], dtype=object),
+                               np.array([m[1] for m in metrics], dtype=object)])
+
+    def save(self, path):
+        self.wb.save(path)
+        return path
@@ -0,0 +1,127 @@
+import os
+import pandas as pd
+from ledger_store import trades_frame
+from ledger_aggregates import LedgerAggregate
+from report_builder import ReportBuilder, DAILY_HEADERS, METRIC_HEADERS
+
+# Where results go unless a run passes its own directory
+OUTPUT_DIR_ENV = 'CAPVALIS_OUTPUT_DIR'
+DEFAULT_OUTPUT_DIR = 'results'
+
+DAILY_FIELDS = ['date', 'total_trades', 'winning_trades', 'losing_trades', 'win_rate', 'daily_pnl']
+
+
+def resolve_output_dir(output_dir=None):
+    # Explicit directory, then $CAPVALIS_OUTPUT_DIR, then ./results
+    output_dir = output_dir or os.environ.get(OUTPUT_DIR_ENV) or DEFAULT_OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    return output_dir
+
+
+def summary_metrics(ledger, risk_per_trade, max_trades_per_day):
+    # [metric, value] rows of the Performance Metrics sheet from a ledger
+    # array, read in chunks so a memory-mapped ledger of any size fits
+    totals = LedgerAggregate.from_ledger(ledger)
+    total_pnl = totals.sum
+    total_costs = totals.costs
+    total_trades = totals.count
+    win_rate = totals.wins / total_trades if total_trades > 0 else 0
+
+    avg_win = totals.gross_profit / totals.wins if totals.wins else 0
+    avg_loss = totals.gross_loss / totals.losses if totals.losses else 0
+    profit_factor = abs(totals.gross_profit / totals.gross_loss) if totals.losses else float('inf')
+
+    return [
+        ['Total Trades', total_trades],
+        ['Winning Trades', totals.wins],
+        ['Losing Trades', totals.losses],
+        ['Win Rate', f"{win_rate:.2%}"],
+        ['Total P&L', f"₹{total_pnl:,.2f}"],
+        ['Total Costs', f"₹{total_costs:,.2f}"],
+        ['Net P&L', f"₹{total_pnl - total_costs:,.2f}"],
+        ['Average Win', f"₹{avg_win:,.2f}"],
+        ['Average Loss', f"₹{avg_loss:,.2f}"],
+        ['Profit Factor', f"{profit_factor:.2f}"],
+        ['Risk per Trade', f"{risk_per_trade:.1%}"],
+        ['Stop Loss & Target Points', 'Dynamic based on price range'],
+        ['Max Trades per Day', max_trades_per_day]
+    ]
+
+
+def daily_frame(daily_metrics):
+    frame = pd.DataFrame(daily_metrics, columns=DAILY_FIELDS)
+    frame.columns = DAILY_HEADERS
+    return frame
+
+
+def metrics_frame(metrics):
+    # Values are mixed numbers and display strings; keep them as text
+    return pd.DataFrame([[metric, str(value)] for metric, value in metrics], columns=METRIC_HEADERS)
+
+
+class ResultsWriter:
+    # Writes one backtest run (ledger array, daily metrics, metric rows)
+    # under `output_dir` and returns the paths written
+
+    name = None
+
+    def write(self, output_dir, run_name, ledger, daily_metrics, metrics):
+        raise NotImplementedError
+
+
+class CsvResultsWriter(ResultsWriter):
+    # Three plain CSV tables, no styling: cheapest output for sweeps and jobs
+    name = 'csv'
+
+    def write(self, output_dir, run_name, ledger, daily_metrics, metrics):
+        base = os.path.join(output_dir, run_name)
+        paths = [f"{base}_trades.csv", f"{base}_daily.csv", f"{base}_metrics.csv"]
+        trades_frame(ledger).to_csv(paths[0], index=False)
+        daily_frame(daily_metrics).to_csv(paths[1], index=False)
+        metrics_frame(metrics).to_csv(paths[2], index=False)
+        return paths
+
+
+class ParquetResultsWriter(ResultsWriter):
+    # Typed columnar tables; needs pyarrow or fastparquet installed
+    name = 'parquet'
+
+    def write(self, output_dir, run_name, ledger, daily_metrics, metrics):
+        base = os.path.join(output_dir, run_name)
+        paths = [f"{base}_trades.parquet", f"{base}_daily.parquet", f"{base}_metrics.parquet"]
+        trades_frame(ledger).to_parquet(paths[0], index=False)
+        daily_frame(daily_metrics).to_parquet(paths[1], index=False)
+        metrics_frame(metrics).to_parquet(paths[2], index=False)
+        return paths
+
+
+class XlsxResultsWriter(ResultsWriter):
+    # The formatted workbook (Trade Details, Daily Summary, Performance Metrics)
+    name = 'xlsx'
+
+    def write(self, output_dir, run_name, ledger, daily_metrics, metrics):
+        report = ReportBuilder()
+        report.add_trade_details(ledger)
+        report.add_daily_summary(daily_metrics)
+        report.add_metrics(metrics)
+        return [report.save(os.path.join(output_dir, f"{run_name}.xlsx"))]
+
+
+WRITERS = {writer.name: writer for writer in (CsvResultsWriter, ParquetResultsWriter, XlsxResultsWriter)}
+
+
+def get_writer(name):
+    if name not in WRITERS:
+        raise ValueError(f"Unknown output format '{name}' - choose from {', '.join(WRITERS)}")
+    return WRITERS[name]()
+
+
+def write_results(formats, ledger, daily_metrics, metrics, output_dir=None, run_name='Trading_Analysis'):
+    # Runs every selected writer over the same results; `ledger` and
+    # `daily_metrics` sorted by date
+    writers = [get_writer(name) for name in formats]
+    output_dir = resolve_output_dir(output_dir)
+    paths = []
+    for writer in writers:
+        paths.extend(writer.write(output_dir, run_name, ledger, daily_metrics, metrics))
+    return paths
@@ -8,6 +8,8 @@ from datetime import datetime
 import seaborn as sns
 from matplotlib.colors import LinearSegmentedColormap
 import time
+from ledger_store import load_trades_frame, load_rollup
+from rolling_analytics import expanding_metrics
 
 # Set the style for all plots
 plt.style.use('seaborn-v0_8-darkgrid')
@@ -24,14 +26,11 @@ COLORS = {
 }
 
 print("Loading data...")
-# Read the CSV file
-df = pd.read_csv('Capvalis Exclusive.csv')
+# Load the trade ledger (memory-mapped columnar file, or the CSV export)
+df = load_trades_frame('Capvalis Exclusive')
 
-# Filter out monthly total rows
-df = df[~df['Date'].str.contains('Monthly Total', na=False)]
-
-# Convert date column to datetime
-df['Date'] = pd.to_datetime(df['Date'])
+# Daily/monthly/yearly P&L rollup, built once per ledger version
+rollup = load_rollup('Capvalis Exclusive')
 
 # Calculate cumulative P&L
 df['Cumulative_PnL'] = df['P&L'].cumsum()
@@ -191,18 +190,11 @@ def create_monthly_heatmap_animation():
     print("Creating animated monthly heatmap...")
     start_time = time.time()
     
-    # Create monthly PnL matrix
-    monthly_pnl = df.pivot_table(
-        values='P&L',
-        index=df['Date'].dt.year,
-        columns=df['Date'].dt.month,
-        aggfunc='sum',
-        fill_value=0
-    )
-    
-    # Rename columns to month names
-    monthly_pnl.columns = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                          'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    # Monthly PnL matrix from the rollup index
+    years, grid = rollup.monthly_matrix(fill=0)
+    monthly_pnl = pd.DataFrame(grid, index=years,
+                               columns=['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
+                                        'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
     
     # Create figure
     fig, ax = plt.subplots(figsize=(12, 8))
@@ -286,17 +278,11 @@ def create_win_rate_animation():
     print("Creating animated win rate chart...")
     start_time = time.time()
     
-    # Calculate metrics over time
-    df['Win'] = df['P&L'] > 0
-    df['Cumulative_Wins'] = df['Win'].cumsum()
+    # Expanding win rate and R:R ratio per trade in one O(n) pass
+    expanding = expanding_metrics(df['P&L'].values)
     df['Total_Trades'] = range(1, len(df) + 1)
-    df['Win_Rate'] = df['Cumulative_Wins'] / df['Total_Trades'] * 100
-    
-    # Calculate average win and loss
-    df['Cumulative_Win_Amount'] = df.apply(lambda x: x['P&L'] if x['P&L'] > 0 else 0, axis=1).cumsum()
-    df['Cumulative_Loss_Amount'] = df.apply(lambda x: abs(x['P&L']) if x['P&L'] < 0 else 0, axis=1).cumsum()
-    df['Winning_Trades'] = df['Win'].cumsum()
-    df['Losing_Trades'] = (df['Win'] == False).cumsum()
+    df['Win_Rate'] = expanding['win_rate'] * 100
+    df['RR_Ratio'] = expanding['risk_reward']
     
     # Create figure with two subplots
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
@@ -340,10 +326,9 @@ def create_win_rate_animation():
         line1.set_data(data['Total_Trades'], data['Win_Rate'])
         ax1.set_xlim(0, len(df))
         
-        # Update risk-reward ratio line
-        if len(data) > 0 and data['Losing_Trades'].iloc[-1] > 0:
-            rr_ratio = (data['Cumulative_Win_Amount'].iloc[-1] / data['Winning_Trades'].iloc[-1]) / \
-                      (data['Cumulative_Loss_Amount'].iloc[-1] / data['Losing_Trades'].iloc[-1])
+        # Update risk-reward ratio line (NaN until there is a win and a loss)
+        rr_ratio = data['RR_Ratio'].iloc[-1] if len(data) > 0 else np.nan
+        if np.isfinite(rr_ratio):
             line2.set_data(data['Total_Trades'], [rr_ratio] * len(data))
             ax2.set_xlim(0, len(df))
             ax2.set_ylim(0, max(3, rr_ratio * 1.2))
@@ -351,9 +336,7 @@ def create_win_rate_animation():
         # Update text
         if frame < len(df):
             text1.set_text(f'Win Rate: {data["Win_Rate"].iloc[-1]:.2f}%')
-            if data['Losing_Trades'].iloc[-1] > 0:
-                rr_ratio = (data['Cumulative_Win_Amount'].iloc[-1] / data['Winning_Trades'].iloc[-1]) / \
-                          (data['Cumulative_Loss_Amount'].iloc[-1] / data['Losing_Trades'].iloc[-1])
+            if np.isfinite(rr_ratio):
                 text2.set_text(f'R:R Ratio: {rr_ratio:.2f}')
             else:
                 text2.set_text('R:R Ratio: N/A')
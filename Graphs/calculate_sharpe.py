@@ -1,15 +1,10 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from ledger_store import load_trades_frame
 
-# Read the CSV file
-df = pd.read_csv('Capvalis Exclusive.csv')
-
-# Filter out monthly total rows
-df = df[~df['Date'].str.contains('Monthly Total', na=False)]
-
-# Convert date column to datetime
-df['Date'] = pd.to_datetime(df['Date'])
+# Load the trade ledger (memory-mapped columnar file, or the CSV export)
+df = load_trades_frame('Capvalis Exclusive')
 
 # Calculate daily returns
 df['Daily_Return'] = df['P&L'] / 100000  # Using 100,000 as the initial investment
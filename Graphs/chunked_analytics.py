@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+from ledger_store import open_ledger, open_rollup, trades_frame, DEFAULT_LEDGER_PATH
+from ledger_aggregates import LedgerAggregate, iter_chunks, CHUNK_ROWS
+from performance_metrics import INITIAL_INVESTMENT, RISK_FREE_RATE, TRADING_DAYS, performance_summary, summary_rows
+from html_dashboard import MAX_POINTS, MIN_BUCKETS, MONTH_NAMES, lod_levels, write_dashboard
+
+# The report metrics and dashboard data of performance_metrics and
+# html_dashboard, computed in chunks straight from the memory-mapped ledger
+# instead of a DataFrame of every trade. Memory is bounded by the chunk
+# size and the dashboard's point budget, not the ledger length. Counts,
+# dates, equity, drawdowns, chart series and rollups come out exactly as in
+# memory. Sums, means and the volatility are merged from per-chunk numpy
+# results (compensated sums, Chan's variance merge), so they match the
+# in-memory numbers exactly for a single chunk and otherwise to within a
+# few dozen ulps (tests/test_chunked_analytics.py).
+
+
+def chunked_performance_summary(trades, initial_investment=INITIAL_INVESTMENT, risk_free_rate=RISK_FREE_RATE,
+                                chunk_rows=CHUNK_ROWS):
+    # performance_summary() of the ledger, from one pass of partial aggregates
+    if not len(trades):
+        return performance_summary(trades_frame(trades[:0]), initial_investment, risk_free_rate)
+    totals = LedgerAggregate.from_ledger(trades, 'pnl', initial_investment, chunk_rows)
+
+    total_trades = totals.count
+    win_rate = totals.wins / total_trades * 100
+    avg_win = totals.gross_profit / totals.wins if totals.wins > 0 else 0
+    avg_loss = abs(totals.gross_loss / totals.losses) if totals.losses else 0
+    rr_ratio = avg_win / avg_loss if avg_loss > 0 else 0
+
+    start_date = pd.Timestamp(totals.first_date)
+    end_date = pd.Timestamp(totals.last_date)
+    years = (end_date - start_date).days / 365.25
+    final_value = initial_investment + totals.equity
+    cagr = (final_value / initial_investment) ** (1 / years) - 1 if years > 0 else 0
+
+    annual_return = totals.mean * TRADING_DAYS
+    annual_volatility = np.sqrt(totals.variance()) * np.sqrt(TRADING_DAYS) if total_trades > 1 else 0
+    sharpe_ratio = (annual_return - risk_free_rate) / annual_volatility if annual_volatility > 0 else 0
+
+    summary = {
+        'total_trades': total_trades,
+        'winning_trades': totals.wins,
+        'win_rate': win_rate,
+        'avg_win': avg_win,
+        'avg_loss': avg_loss,
+        'rr_ratio': rr_ratio,
+        'max_drawdown': totals.max_drawdown_pct,
+        'start_date': start_date,
+        'end_date': end_date,
+        'years': years,
+        'cagr': cagr,
+        'annual_return': annual_return,
+        'annual_volatility': annual_volatility,
+        'sharpe_ratio': sharpe_ratio,
+        'initial_investment': initial_investment,
+        'final_value': final_value,
+        'total_return': (final_value / initial_investment) - 1,
+    }
+    if 'net_pnl' in trades.dtype.names:
+        summary['total_costs'] = totals.costs
+        summary['net_pnl'] = totals.net_pnl
+    return summary
+
+
+class MinMaxDecimator:
+    # html_dashboard.minmax_decimate over a series that arrives in chunks.
+    # The number of finite points must be known up front (it fixes the
+    # buckets); per bucket only the first minimum and maximum are kept.
+
+    def __init__(self, n, buckets):
+        self.n = n
+        self.buckets = buckets
+        self.decimate = n > 2 * buckets
+        self.seen = 0
+        self.points = []
+        if self.decimate:
+            self.starts = np.linspace(0, n, buckets + 1).astype(np.int64)[:-1]
+            self.low = np.full(buckets, np.inf)
+            self.high = np.full(buckets, -np.inf)
+            self.low_at = np.zeros(buckets, dtype=np.int64)
+            self.high_at = np.zeros(buckets, dtype=np.int64)
+            self.low_x = np.zeros(buckets, dtype=np.int64)
+            self.high_x = np.zeros(buckets, dtype=np.int64)
+
+    def update(self, x, y):
+        finite = np.isfinite(y)
+        x, y = x[finite], y[finite]
+        index = self.seen + np.arange(len(y))
+        if not len(y):
+            return
+        if not self.decimate:
+            self.points.append((x, y))
+        else:
+            if self.seen == 0 or index[-1] == self.n - 1:
+                # First and last point are always kept
+                ends = [0] if self.seen == 0 else []
+                ends += [len(y) - 1] if index[-1] == self.n - 1 else []
+                self.points.append((x[ends], y[ends], index[ends]))
+
+            # Per-bucket extremes of this chunk (buckets are contiguous runs)
+            bucket = np.searchsorted(self.starts, index, side='right') - 1
+            runs = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+            run_of = np.repeat(np.arange(len(runs)), np.diff(np.r_[runs, len(y)]))
+            buckets = bucket[runs]
+            position = np.arange(len(y))
+            lows = np.minimum.reduceat(y, runs)
+            highs = np.maximum.reduceat(y, runs)
+            first_low = np.minimum.reduceat(np.where(y == lows[run_of], position, len(y)), runs)
+            first_high = np.minimum.reduceat(np.where(y == highs[run_of], position, len(y)), runs)
+
+            # A strictly better extreme replaces the earlier one; ties keep
+            # it. The stored value is the point's own (0.0 and -0.0 tie).
+            better = lows < self.low[buckets]
+            self.low[buckets[better]] = y[first_low[better]]
+            self.low_at[buckets[better]] = index[first_low[better]]
+            self.low_x[buckets[better]] = x[first_low[better]]
+            better = highs > self.high[buckets]
+            self.high[buckets[better]] = y[first_high[better]]
+            self.high_at[buckets[better]] = index[first_high[better]]
+            self.high_x[buckets[better]] = x[first_high[better]]
+        self.seen += len(y)
+
+    def result(self):
+        if not self.decimate:
+            if not self.points:
+                return np.zeros(0, dtype=np.int64), np.zeros(0)
+            return np.concatenate([x for x, _ in self.points]), np.concatenate([y for _, y in self.points])
+        index = np.concatenate([self.low_at, self.high_at] + [i for _, _, i in self.points])
+        x = np.concatenate([self.low_x, self.high_x] + [x for x, _, _ in self.points])
+        y = np.concatenate([self.low, self.high] + [y for _, y, _ in self.points])
+        index, keep = np.unique(index, return_index=True)
+        return x[keep], y[keep]
+
+
+def chunked_series(trades, max_points=MAX_POINTS, min_buckets=MIN_BUCKETS, chunk_rows=CHUNK_ROWS):
+    # Equity and drawdown level-of-detail pyramids of html_dashboard, in two
+    # passes: the first counts the finite points of each series, the second
+    # decimates them as they are produced
+    buckets = max(min_buckets, max_points // 2)
+    series = {'equity': 0, 'drawdown': 0}
+
+    def passes():
+        totals = LedgerAggregate('pnl')
+        for chunk in iter_chunks(trades, chunk_rows):
+            pnl = np.asarray(chunk['pnl'], dtype=np.float64)
+            cumulative, peaks = totals.equity_chunk(pnl)
+            totals.update(chunk)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                drawdown = (cumulative - peaks) / peaks * 100
+            dates = np.asarray(chunk['date']).astype('M8[ms]').astype(np.int64)
+            yield dates, {'equity': cumulative, 'drawdown': drawdown}
+
+    for _, values in passes():
+        for name in series:
+            series[name] += int(np.isfinite(values[name]).sum())
+
+    decimators = {name: MinMaxDecimator(n, buckets) for name, n in series.items()}
+    for dates, values in passes():
+        for name, decimator in decimators.items():
+            decimator.update(dates, values[name])
+    return {name: lod_levels(*decimator.result(), buckets, min_buckets) for name, decimator in decimators.items()}
+
+
+def chunked_dashboard_payload(trades, rollup=None, max_points=MAX_POINTS, chunk_rows=CHUNK_ROWS):
+    # html_dashboard.dashboard_payload() from the ledger array
+    summary = chunked_performance_summary(trades, chunk_rows=chunk_rows)
+    payload = {
+        'metrics': summary_rows(summary),
+        'win_rate': summary['win_rate'],
+        'avg_win': float(summary['avg_win']),
+        'avg_loss': float(summary['avg_loss']),
+        'series': chunked_series(trades, max_points, chunk_rows=chunk_rows),
+        'monthly': None,
+    }
+    if rollup is not None:
+        years, grid = rollup.monthly_matrix(fill=np.nan)
+        payload['monthly'] = {
+            'years': years.tolist(),
+            'months': MONTH_NAMES,
+            'pnl': [[None if np.isnan(v) else round(float(v), 2) for v in row] for row in grid],
+        }
+    return payload
+
+
+if __name__ == "__main__":
+    trades, _ = open_ledger(DEFAULT_LEDGER_PATH)
+    print(f"Summarising {len(trades):,} trades in chunks of {CHUNK_ROWS:,}...")
+    for label, value in summary_rows(chunked_performance_summary(trades)):
+        print(f"{label}: {value}")
+    path = write_dashboard(chunked_dashboard_payload(trades, open_rollup(DEFAULT_LEDGER_PATH)))
+    print(f"Performance dashboard saved as '{path}'")
@@ -0,0 +1,138 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from ledger_store import open_ledger, STATUS_CODES, DEFAULT_LEDGER_PATH
+from trade_excursions import open_excursions
+
+# MAE/MFE reports for tuning the stop/target bands, from the ledger and its
+# excursions file (see trade_excursions). Everything is drawn from binned
+# counts, so the charts cost the same for a thousand trades or a million.
+
+plt.style.use('seaborn-v0_8-darkgrid')
+
+COLORS = {
+    'TARGET_HIT': '#4CAF50',
+    'STOP_LOSS_HIT': '#F44336',
+    'MARKET_CLOSE': '#2196F3',
+    'OPEN': '#9E9E9E',
+    'background': '#F5F5F5'
+}
+
+# Bins per axis for histograms and density plots
+BINS = 60
+# Stop distances (in R) checked by stop_survival
+STOP_LEVELS = np.round(np.arange(0.1, 1.01, 0.1), 2)
+
+
+def load_excursions(base_path=DEFAULT_LEDGER_PATH):
+    # (ledger, excursions), both memory-mapped and aligned row for row
+    ledger, _ = open_ledger(base_path)
+    excursions = open_excursions(base_path)
+    if len(excursions) != len(ledger):
+        raise ValueError(f"{base_path} excursions are out of date - run the backtest with excursions=True")
+    return ledger, excursions
+
+
+def excursion_summary(ledger, excursions):
+    # Per exit status: trade count, median MAE/MFE in R and mean minutes in trade
+    summary = {}
+    for status, code in STATUS_CODES.items():
+        mask = np.asarray(ledger['status'] == code)
+        if not mask.any():
+            continue
+        summary[status] = {
+            'trades': int(mask.sum()),
+            'median_mae_r': float(np.nanmedian(excursions['mae_r'][mask])),
+            'median_mfe_r': float(np.nanmedian(excursions['mfe_r'][mask])),
+            'mean_minutes': float(np.nanmean(excursions['minutes_in_trade'][mask]))
+            if status != 'OPEN' else float('nan'),
+        }
+    return summary
+
+
+def stop_survival(ledger, excursions, levels=STOP_LEVELS):
+    # Share of target hits whose MAE stayed under each stop level (in R):
+    # the winners a stop that tight would have kept
+    mae_r = np.sort(excursions['mae_r'][np.asarray(ledger['status'] == STATUS_CODES['TARGET_HIT'])])
+    mae_r = mae_r[~np.isnan(mae_r)]
+    if not len(mae_r):
+        return np.full(len(levels), np.nan)
+    return np.searchsorted(mae_r, levels, side='left') / len(mae_r)
+
+
+def excursion_density(ax, x, y, title, xlabel):
+    # 2D histogram of excursion vs P&L
+    finite = np.isfinite(x) & np.isfinite(y)
+    counts, xedges, yedges = np.histogram2d(x[finite], y[finite], bins=BINS)
+    mesh = ax.pcolormesh(xedges, yedges, np.ma.masked_equal(counts.T, 0), cmap='viridis')
+    plt.colorbar(mesh, ax=ax, label='Trades')
+    ax.axhline(0, color='black', linewidth=0.8)
+    ax.set_title(title, fontsize=12, fontweight='bold')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel('Net P&L (₹)')
+
+
+def status_histograms(ax, values, status, title, xlabel):
+    # One outline histogram per exit status over shared bins
+    finite = np.isfinite(values)
+    if not finite.any():
+        return
+    edges = np.histogram_bin_edges(values[finite], bins=BINS)
+    for name, code in STATUS_CODES.items():
+        mask = finite & (status == code)
+        if mask.any():
+            counts, _ = np.histogram(values[mask], bins=edges)
+            ax.stairs(counts, edges, color=COLORS[name], linewidth=1.5, label=name.replace('_', ' ').title())
+    ax.set_title(title, fontsize=12, fontweight='bold')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel('Trades')
+    ax.legend(fontsize=9)
+
+
+def create_excursion_scatter(ledger, excursions, filename='excursion_scatter.png'):
+    print("Creating MAE/MFE scatter...")
+    net_pnl = np.asarray(ledger['net_pnl'])
+    fig, axes = plt.subplots(1, 2, figsize=(14, 6))
+    fig.patch.set_facecolor(COLORS['background'])
+    excursion_density(axes[0], np.asarray(excursions['mae_r']), net_pnl,
+                      'Maximum Adverse Excursion vs P&L', 'MAE (multiples of initial risk)')
+    axes[0].axvline(1, color=COLORS['STOP_LOSS_HIT'], linestyle='--', linewidth=1, label='Initial stop')
+    axes[0].legend(fontsize=9)
+    excursion_density(axes[1], np.asarray(excursions['mfe_r']), net_pnl,
+                      'Maximum Favourable Excursion vs P&L', 'MFE (multiples of initial risk)')
+    plt.tight_layout()
+    plt.savefig(filename, dpi=300, bbox_inches='tight')
+    plt.close()
+    print(f"MAE/MFE scatter saved as '{filename}'")
+
+
+def create_excursion_histograms(ledger, excursions, filename='excursion_histograms.png'):
+    print("Creating excursion histograms...")
+    status = np.asarray(ledger['status'])
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+    fig.patch.set_facecolor(COLORS['background'])
+    status_histograms(axes[0, 0], np.asarray(excursions['mae_r']), status, 'MAE by Exit', 'MAE (R)')
+    status_histograms(axes[0, 1], np.asarray(excursions['mfe_r']), status, 'MFE by Exit', 'MFE (R)')
+    status_histograms(axes[1, 0], np.asarray(excursions['minutes_in_trade']), status,
+                      'Time in Trade', 'Minutes from entry to exit')
+
+    # Winners kept by tighter stops
+    survival = stop_survival(ledger, excursions)
+    axes[1, 1].plot(STOP_LEVELS, survival * 100, marker='o', color=COLORS['TARGET_HIT'])
+    axes[1, 1].set_title('Target Hits Surviving a Tighter Stop', fontsize=12, fontweight='bold')
+    axes[1, 1].set_xlabel('Stop distance (R)')
+    axes[1, 1].set_ylabel('Target hits kept (%)')
+    axes[1, 1].set_ylim(0, 105)
+
+    plt.tight_layout()
+    plt.savefig(filename, dpi=300, bbox_inches='tight')
+    plt.close()
+    print(f"Excursion histograms saved as '{filename}'")
+
+
+if __name__ == "__main__":
+    ledger, excursions = load_excursions()
+    for status, row in excursion_summary(ledger, excursions).items():
+        print(f"{status:>14}: {row['trades']:>7} trades, median MAE {row['median_mae_r']:.2f}R, "
+              f"median MFE {row['median_mfe_r']:.2f}R, {row['mean_minutes']:.0f} min in trade")
+    create_excursion_scatter(ledger, excursions)
+    create_excursion_histograms(ledger, excursions)
@@ -0,0 +1,361 @@
+import json
+import numpy as np
+from performance_metrics import equity_curve, drawdown_pct, performance_summary, summary_rows
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# Finest level embedded for a series, and the coarsest level it is reduced to.
+# Each level keeps the min and max of every bucket, so it is at most
+# 2 * buckets points and never hides a spike.
+MAX_POINTS = 100000
+MIN_BUCKETS = 500
+
+
+def minmax_decimate(x, y, buckets):
+    # Keeps the first/last point and, per bucket, the min and max points in
+    # their original order
+    n = len(y)
+    if n <= 2 * buckets:
+        return x, y
+    starts = np.linspace(0, n, buckets + 1).astype(np.int64)[:-1]
+    sizes = np.diff(np.r_[starts, n])
+    bucket_of = np.repeat(np.arange(buckets), sizes)
+    index = np.arange(n)
+
+    lows = np.minimum.reduceat(y, starts)
+    highs = np.maximum.reduceat(y, starts)
+    first_low = np.minimum.reduceat(np.where(y == lows[bucket_of], index, n), starts)
+    first_high = np.minimum.reduceat(np.where(y == highs[bucket_of], index, n), starts)
+
+    keep = np.unique(np.r_[0, first_low, first_high, n - 1])
+    return x[keep], y[keep]
+
+
+def lod_pyramid(x, y, max_points=MAX_POINTS, min_buckets=MIN_BUCKETS):
+    # Levels from finest to coarsest; each is decimated from the previous
+    # one (min/max of min/max is exact), so building all of them is O(n)
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    finite = np.isfinite(y)
+    x, y = x[finite], y[finite]
+
+    buckets = max(min_buckets, max_points // 2)
+    x, y = minmax_decimate(x, y, buckets)
+    return lod_levels(x, y, buckets, min_buckets)
+
+
+def lod_levels(x, y, buckets, min_buckets=MIN_BUCKETS):
+    # The pyramid from its finest level, already decimated to `buckets`
+    levels = [(x, y)]
+    while buckets > min_buckets and len(y) > 2 * min_buckets:
+        buckets = max(min_buckets, buckets // 2)
+        x, y = minmax_decimate(x, y, buckets)
+        levels.append((x, y))
+    return [{'x': lx.tolist(), 'y': np.round(ly, 2).tolist()} for lx, ly in levels]
+
+
+def dashboard_payload(df, rollup=None, max_points=MAX_POINTS):
+    # Everything the page needs, as plain JSON
+    dates = df['Date'].values.astype('M8[ms]').astype(np.int64)
+    cumulative = equity_curve(df['P&L'].values)
+    drawdown = drawdown_pct(cumulative)
+    summary = performance_summary(df)
+
+    payload = {
+        'metrics': summary_rows(summary),
+        'win_rate': summary['win_rate'],
+        'avg_win': float(summary['avg_win']),
+        'avg_loss': float(summary['avg_loss']),
+        'series': {
+            'equity': lod_pyramid(dates, cumulative, max_points),
+            'drawdown': lod_pyramid(dates, drawdown, max_points),
+        },
+        'monthly': None,
+    }
+    if rollup is not None:
+        years, grid = rollup.monthly_matrix(fill=np.nan)
+        payload['monthly'] = {
+            'years': years.tolist(),
+            'months': MONTH_NAMES,
+            'pnl': [[None if np.isnan(v) else round(float(v), 2) for v in row] for row in grid],
+        }
+    return payload
+
+
+def build_dashboard(df, rollup=None, output_path='performance_dashboard.html', max_points=MAX_POINTS):
+    return write_dashboard(dashboard_payload(df, rollup, max_points), output_path)
+
+
+def write_dashboard(payload, output_path='performance_dashboard.html'):
+    payload = json.dumps(payload, separators=(',', ':'))
+    # Keep the JSON from closing the <script> block it is embedded in
+    payload = payload.replace('</', '<\\/')
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(HTML_TEMPLATE.replace('__DASHBOARD_DATA__', payload))
+    return output_path
+
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Capvalis Performance Dashboard</title>
+<style>
+  body { margin: 0; padding: 24px; background: #F5F5F5; font-family: Segoe UI, Helvetica, Arial, sans-serif; color: #222; }
+  h1 { font-size: 22px; margin: 0 0 16px; }
+  h2 { font-size: 16px; margin: 0 0 8px; }
+  .cards { display: grid; grid-template-columns: repeat(auto-fill, minmax(170px, 1fr)); gap: 12px; margin-bottom: 20px; }
+  .card { background: #fff; border-radius: 6px; padding: 12px; box-shadow: 0 1px 3px rgba(0,0,0,.12); }
+  .card .label { font-size: 12px; color: #666; }
+  .card .value { font-size: 20px; font-weight: 600; margin-top: 4px; }
+  .panel { background: #fff; border-radius: 6px; padding: 16px; margin-bottom: 20px; box-shadow: 0 1px 3px rgba(0,0,0,.12); }
+  .row { display: grid; grid-template-columns: 1fr 1fr; gap: 20px; }
+  canvas { width: 100%; height: 320px; display: block; cursor: crosshair; }
+  .hint { font-size: 12px; color: #888; margin-top: 6px; }
+  table.heatmap { border-collapse: collapse; font-size: 12px; width: 100%; }
+  table.heatmap td, table.heatmap th { padding: 6px; text-align: right; border: 1px solid #eee; }
+</style>
+</head>
+<body>
+<h1>Capvalis Performance Dashboard</h1>
+<div class="cards" id="cards"></div>
+<div class="panel"><h2>Equity Curve</h2><canvas id="equity"></canvas>
+  <div class="hint">Scroll to zoom, drag to pan, double-click to reset</div></div>
+<div class="panel"><h2>Drawdown (%)</h2><canvas id="drawdown"></canvas></div>
+<div class="row">
+  <div class="panel"><h2>Win Rate</h2><canvas id="winrate"></canvas></div>
+  <div class="panel"><h2>Average Win / Loss</h2><canvas id="rr"></canvas></div>
+</div>
+<div class="panel" id="monthly-panel"><h2>Monthly P&amp;L</h2><div id="monthly"></div></div>
+<script id="dashboard-data" type="application/json">__DASHBOARD_DATA__</script>
+<script>
+(function () {
+  var DATA = JSON.parse(document.getElementById('dashboard-data').textContent);
+  var COLORS = { blue: '#2196F3', green: '#4CAF50', red: '#F44336', purple: '#9C27B0', grid: '#e0e0e0' };
+
+  function money(v) { return '\\u20b9' + Math.round(v).toLocaleString('en-IN'); }
+  function day(ms) { return new Date(ms).toISOString().slice(0, 10); }
+
+  // Metric cards
+  var cards = document.getElementById('cards');
+  DATA.metrics.forEach(function (m) {
+    var el = document.createElement('div');
+    el.className = 'card';
+    el.innerHTML = '<div class="label"></div><div class="value"></div>';
+    el.children[0].textContent = m[0];
+    el.children[1].textContent = m[1];
+    cards.appendChild(el);
+  });
+
+  function setupCanvas(canvas) {
+    var ratio = window.devicePixelRatio || 1;
+    var w = canvas.clientWidth, h = canvas.clientHeight;
+    canvas.width = w * ratio;
+    canvas.height = h * ratio;
+    var ctx = canvas.getContext('2d');
+    ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+    return { ctx: ctx, w: w, h: h };
+  }
+
+  // First index with x[i] >= value
+  function lowerBound(x, value) {
+    var lo = 0, hi = x.length;
+    while (lo < hi) {
+      var mid = (lo + hi) >> 1;
+      if (x[mid] < value) lo = mid + 1; else hi = mid;
+    }
+    return lo;
+  }
+
+  function TimeSeriesChart(canvas, levels, opts) {
+    this.canvas = canvas;
+    this.levels = levels;
+    this.opts = opts;
+    this.linked = [];
+    var finest = levels[0].x;
+    this.full = [finest[0], finest[finest.length - 1]];
+    if (this.full[0] === this.full[1]) this.full[1] += 86400000;
+    this.view = this.full.slice();
+    this.hover = null;
+    this.bind();
+    this.draw();
+  }
+
+  // Coarsest level that still has ~2 points per pixel in the visible range
+  TimeSeriesChart.prototype.pickLevel = function (width) {
+    for (var i = this.levels.length - 1; i >= 0; i--) {
+      var lv = this.levels[i];
+      var count = lowerBound(lv.x, this.view[1]) - lowerBound(lv.x, this.view[0]);
+      if (count >= 2 * width || i === 0) return lv;
+    }
+    return this.levels[0];
+  };
+
+  TimeSeriesChart.prototype.draw = function () {
+    var s = setupCanvas(this.canvas), ctx = s.ctx;
+    var pad = { l: 80, r: 16, t: 10, b: 28 };
+    var pw = s.w - pad.l - pad.r, ph = s.h - pad.t - pad.b;
+    var lv = this.pickLevel(pw);
+    var a = Math.max(0, lowerBound(lv.x, this.view[0]) - 1);
+    var b = Math.min(lv.x.length, lowerBound(lv.x, this.view[1]) + 1);
+    var ymin = Infinity, ymax = -Infinity;
+    for (var i = a; i < b; i++) { if (lv.y[i] < ymin) ymin = lv.y[i]; if (lv.y[i] > ymax) ymax = lv.y[i]; }
+    if (this.opts.fillToZero) { ymin = Math.min(ymin, 0); ymax = Math.max(ymax, 0); }
+    if (!isFinite(ymin)) { ymin = 0; ymax = 1; }
+    if (ymin === ymax) { ymin -= 1; ymax += 1; }
+    var view = this.view;
+    function px(x) { return pad.l + (x - view[0]) / (view[1] - view[0]) * pw; }
+    function py(y) { return pad.t + (ymax - y) / (ymax - ymin) * ph; }
+    this.px = px; this.pad = pad; this.pw = pw;
+
+    ctx.clearRect(0, 0, s.w, s.h);
+    ctx.font = '11px sans-serif';
+    ctx.strokeStyle = COLORS.grid;
+    ctx.fillStyle = '#555';
+    for (var k = 0; k <= 4; k++) {
+      var yv = ymin + (ymax - ymin) * k / 4, yy = py(yv);
+      ctx.beginPath(); ctx.moveTo(pad.l, yy); ctx.lineTo(pad.l + pw, yy); ctx.stroke();
+      ctx.textAlign = 'right';
+      ctx.fillText(this.opts.format(yv), pad.l - 6, yy + 4);
+    }
+    ctx.textAlign = 'center';
+    for (k = 0; k <= 5; k++) {
+      var xv = view[0] + (view[1] - view[0]) * k / 5;
+      ctx.fillText(day(xv), Math.min(Math.max(px(xv), pad.l + 30), pad.l + pw - 30), s.h - 8);
+    }
+
+    ctx.save();
+    ctx.beginPath(); ctx.rect(pad.l, pad.t, pw, ph); ctx.clip();
+    ctx.beginPath();
+    for (i = a; i < b; i++) {
+      if (i === a) ctx.moveTo(px(lv.x[i]), py(lv.y[i])); else ctx.lineTo(px(lv.x[i]), py(lv.y[i]));
+    }
+    ctx.strokeStyle = this.opts.color; ctx.lineWidth = 1.5; ctx.stroke();
+    if (this.opts.fillToZero && b > a) {
+      ctx.lineTo(px(lv.x[b - 1]), py(0)); ctx.lineTo(px(lv.x[a]), py(0)); ctx.closePath();
+      ctx.globalAlpha = 0.3; ctx.fillStyle = this.opts.color; ctx.fill(); ctx.globalAlpha = 1;
+    }
+    if (this.hover !== null) {
+      var j = Math.min(Math.max(lowerBound(lv.x, this.hover), a), b - 1);
+      if (j > a && this.hover - lv.x[j - 1] < lv.x[j] - this.hover) j -= 1;
+      if (j >= 0 && j < lv.x.length) {
+        var hx = px(lv.x[j]), hy = py(lv.y[j]);
+        ctx.beginPath(); ctx.arc(hx, hy, 4, 0, 2 * Math.PI); ctx.fillStyle = COLORS.red; ctx.fill();
+        var label = day(lv.x[j]) + '  ' + this.opts.format(lv.y[j]);
+        ctx.font = '12px sans-serif'; ctx.textAlign = hx > pad.l + pw / 2 ? 'right' : 'left';
+        ctx.fillStyle = '#222'; ctx.fillText(label, hx + (ctx.textAlign === 'right' ? -8 : 8), pad.t + 14);
+      }
+    }
+    ctx.restore();
+  };
+
+  TimeSeriesChart.prototype.setView = function (view, fromLink) {
+    var span = view[1] - view[0], full = this.full[1] - this.full[0];
+    if (span > full) { view = this.full.slice(); }
+    if (view[0] < this.full[0]) { view = [this.full[0], this.full[0] + span]; }
+    if (view[1] > this.full[1]) { view = [this.full[1] - span, this.full[1]]; }
+    this.view = view;
+    this.draw();
+    if (!fromLink) this.linked.forEach(function (c) { c.setView(view.slice(), true); });
+  };
+
+  TimeSeriesChart.prototype.toX = function (clientX) {
+    var rect = this.canvas.getBoundingClientRect();
+    var f = (clientX - rect.left - this.pad.l) / this.pw;
+    return this.view[0] + f * (this.view[1] - this.view[0]);
+  };
+
+  TimeSeriesChart.prototype.bind = function () {
+    var self = this, dragging = null;
+    this.canvas.addEventListener('wheel', function (e) {
+      e.preventDefault();
+      var at = self.toX(e.clientX), scale = e.deltaY < 0 ? 0.8 : 1.25;
+      var span = Math.max((self.view[1] - self.view[0]) * scale, 86400000);
+      var f = (at - self.view[0]) / (self.view[1] - self.view[0]);
+      self.setView([at - f * span, at - f * span + span]);
+    }, { passive: false });
+    this.canvas.addEventListener('mousedown', function (e) { dragging = { x: e.clientX, view: self.view.slice() }; });
+    window.addEventListener('mouseup', function () { dragging = null; });
+    this.canvas.addEventListener('mousemove', function (e) {
+      if (dragging) {
+        var dx = (e.clientX - dragging.x) / self.pw * (dragging.view[1] - dragging.view[0]);
+        self.setView([dragging.view[0] - dx, dragging.view[1] - dx]);
+      } else {
+        self.hover = self.toX(e.clientX);
+        self.draw();
+      }
+    });
+    this.canvas.addEventListener('mouseleave', function () { self.hover = null; self.draw(); });
+    this.canvas.addEventListener('dblclick', function () { self.setView(self.full.slice()); });
+  };
+
+  function barChart(canvas, labels, values, colors, format) {
+    var s = setupCanvas(canvas), ctx = s.ctx;
+    var top = Math.max.apply(null, values.concat([1])) * 1.15;
+    var slot = s.w / values.length;
+    ctx.font = '13px sans-serif'; ctx.textAlign = 'center';
+    values.forEach(function (v, i) {
+      var h = (s.h - 40) * v / top, x = slot * i + slot * 0.2;
+      ctx.fillStyle = colors[i];
+      ctx.fillRect(x, s.h - 24 - h, slot * 0.6, h);
+      ctx.fillStyle = '#222';
+      ctx.fillText(format(v), x + slot * 0.3, s.h - 30 - h);
+      ctx.fillText(labels[i], x + slot * 0.3, s.h - 6);
+    });
+  }
+
+  var equity = new TimeSeriesChart(document.getElementById('equity'), DATA.series.equity,
+                                   { color: COLORS.blue, format: money });
+  var drawdown = new TimeSeriesChart(document.getElementById('drawdown'), DATA.series.drawdown,
+                                     { color: COLORS.red, fillToZero: true,
+                                       format: function (v) { return v.toFixed(2) + '%'; } });
+  equity.linked.push(drawdown);
+  drawdown.linked.push(equity);
+
+  function drawBars() {
+    barChart(document.getElementById('winrate'), ['Win', 'Loss'], [DATA.win_rate, 100 - DATA.win_rate],
+             [COLORS.green, COLORS.red], function (v) { return v.toFixed(1) + '%'; });
+    barChart(document.getElementById('rr'), ['Average Win', 'Average Loss'], [DATA.avg_win, DATA.avg_loss],
+             [COLORS.green, COLORS.red], money);
+  }
+  drawBars();
+  window.addEventListener('resize', function () { equity.draw(); drawdown.draw(); drawBars(); });
+
+  // Monthly P&L heatmap table
+  if (DATA.monthly) {
+    var extent = 0;
+    DATA.monthly.pnl.forEach(function (row) { row.forEach(function (v) { if (v !== null) extent = Math.max(extent, Math.abs(v)); }); });
+    var html = '<table class="heatmap"><tr><th></th>' +
+      DATA.monthly.months.map(function (m) { return '<th>' + m + '</th>'; }).join('') + '</tr>';
+    DATA.monthly.years.forEach(function (year, r) {
+      html += '<tr><th>' + year + '</th>';
+      DATA.monthly.pnl[r].forEach(function (v) {
+        if (v === null) { html += '<td></td>'; return; }
+        var alpha = extent ? Math.abs(v) / extent * 0.8 : 0;
+        var rgb = v >= 0 ? '76,175,80' : '244,67,54';
+        html += '<td style="background: rgba(' + rgb + ',' + alpha.toFixed(2) + ')">' + money(v) + '</td>';
+      });
+      html += '</tr>';
+    });
+    document.getElementById('monthly').innerHTML = html + '</table>';
+  } else {
+    document.getElementById('monthly-panel').style.display = 'none';
+  }
+})();
+</script>
+</body>
+</html>
+"""
+
+
+if __name__ == "__main__":
+    from ledger_store import load_trades_frame, load_rollup
+
+    print("Loading data...")
+    # Load the trade ledger (memory-mapped columnar file, or the CSV export)
+    df = load_trades_frame('Capvalis Exclusive')
+    rollup = load_rollup('Capvalis Exclusive')
+
+    print("Creating HTML performance dashboard...")
+    path = build_dashboard(df, rollup)
+    print(f"Performance dashboard saved as '{path}'")
@@ -0,0 +1,90 @@
+import numpy as np
+# Account conventions shared by the charts, the HTML dashboard and the
+# calculate_* scripts (defined with the sizing config)
+from position_sizing import INITIAL_INVESTMENT, RISK_FREE_RATE, TRADING_DAYS
+
+
+def equity_curve(pnl):
+    return np.cumsum(np.asarray(pnl, dtype=np.float64))
+
+
+def drawdown_pct(cumulative):
+    # Drawdown from the running peak of cumulative P&L, in percent of that peak
+    cumulative = np.asarray(cumulative, dtype=np.float64)
+    rolling_max = np.maximum.accumulate(cumulative)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (cumulative - rolling_max) / rolling_max * 100
+
+
+def performance_summary(df, initial_investment=INITIAL_INVESTMENT, risk_free_rate=RISK_FREE_RATE):
+    # Headline metrics of the performance dashboards from a trades frame
+    # with 'Date' and 'P&L' columns
+    pnl = df['P&L'].to_numpy(dtype=np.float64)
+    cumulative = equity_curve(pnl)
+    drawdown = drawdown_pct(cumulative)
+
+    total_trades = len(pnl)
+    winning_trades = int((pnl > 0).sum())
+    win_rate = winning_trades / total_trades * 100 if total_trades else 0
+
+    # Calculate average win and loss
+    avg_win = pnl[pnl > 0].mean() if winning_trades > 0 else 0
+    avg_loss = abs(pnl[pnl < 0].mean()) if (pnl < 0).any() else 0
+    rr_ratio = avg_win / avg_loss if avg_loss > 0 else 0
+
+    # Calculate CAGR
+    start_date = df['Date'].min()
+    end_date = df['Date'].max()
+    years = (end_date - start_date).days / 365.25 if total_trades else 0
+    final_value = initial_investment + (cumulative[-1] if total_trades else 0)
+    cagr = (final_value / initial_investment) ** (1 / years) - 1 if years > 0 else 0
+
+    # Calculate Sharpe ratio
+    daily_returns = pnl / initial_investment
+    annual_return = daily_returns.mean() * TRADING_DAYS if total_trades else 0
+    annual_volatility = daily_returns.std(ddof=1) * np.sqrt(TRADING_DAYS) if total_trades > 1 else 0
+    sharpe_ratio = (annual_return - risk_free_rate) / annual_volatility if annual_volatility > 0 else 0
+
+    summary = {
+        'total_trades': total_trades,
+        'winning_trades': winning_trades,
+        'win_rate': win_rate,
+        'avg_win': avg_win,
+        'avg_loss': avg_loss,
+        'rr_ratio': rr_ratio,
+        'max_drawdown': np.nanmin(drawdown) if total_trades else 0,
+        'start_date': start_date,
+        'end_date': end_date,
+        'years': years,
+        'cagr': cagr,
+        'annual_return': annual_return,
+        'annual_volatility': annual_volatility,
+        'sharpe_ratio': sharpe_ratio,
+        'initial_investment': initial_investment,
+        'final_value': final_value,
+        'total_return': (final_value / initial_investment) - 1,
+    }
+    # Ledgers with a cost model also carry net P&L
+    if 'Net P&L' in df:
+        summary['total_costs'] = df['Costs'].sum()
+        summary['net_pnl'] = df['Net P&L'].sum()
+    return summary
+
+
+def summary_rows(summary):
+    # [label, value] rows of the Performance Metrics table
+    rows = [
+        ['Total Trades', f"{summary['total_trades']}"],
+        ['Win Rate', f"{summary['win_rate']:.2f}%"],
+        ['Risk-Reward Ratio', f"{summary['rr_ratio']:.2f}"],
+        ['Maximum Drawdown', f"{summary['max_drawdown']:.2f}%"],
+        ['CAGR', f"{summary['cagr']*100:.2f}%"],
+        ['Sharpe Ratio', f"{summary['sharpe_ratio']:.2f}"],
+        ['Initial Investment', f"₹{summary['initial_investment']:,.0f}"],
+        ['Final Value', f"₹{summary['final_value']:,.0f}"],
+        ['Total Return', f"{summary['total_return']*100:.2f}%"],
+    ]
+    if 'net_pnl' in summary:
+        rows.append(['Total Costs', f"₹{summary['total_costs']:,.0f}"])
+        rows.append(['Net P&L', f"₹{summary['net_pnl']:,.0f}"])
+    return rows
@@ -0,0 +1,134 @@
+import numpy as np
+from performance_metrics import INITIAL_INVESTMENT, RISK_FREE_RATE, TRADING_DAYS
+
+
+def window_sums(cumulative, window):
+    # Sum over the trailing `window` trades for every trade, NaN until filled.
+    # `cumulative` has a leading 0 so cumulative[i] is the sum of the first i values.
+    sums = np.full(len(cumulative) - 1, np.nan)
+    if window <= len(sums):
+        sums[window - 1:] = cumulative[window:] - cumulative[:-window]
+    return sums
+
+
+def block_aggregates(equity, span):
+    # Running (max, min, max drawdown) of the equity curve cut into blocks of
+    # `span` points: from each block's start up to every point (prefix) and
+    # from every point to its block's end (suffix). These are the back and
+    # front stacks of a two-stack max-drawdown queue, filled block by block
+    # with cumulative scans, so the cost is O(n) whatever the span.
+    n = len(equity)
+    blocks = np.r_[equity, np.full(-n % span, equity[-1])].reshape(-1, span)
+    prefix_max = np.maximum.accumulate(blocks, axis=1)
+    prefix_min = np.minimum.accumulate(blocks, axis=1)
+    prefix_drawdown = np.maximum.accumulate(prefix_max - blocks, axis=1)
+    reverse = blocks[:, ::-1]
+    suffix_max = np.maximum.accumulate(reverse, axis=1)[:, ::-1]
+    suffix_min = np.minimum.accumulate(reverse, axis=1)[:, ::-1]
+    # A drawdown starting at a point falls to the lowest point after it
+    suffix_drawdown = np.maximum.accumulate((blocks - suffix_min)[:, ::-1], axis=1)[:, ::-1]
+    prefix = tuple(values.ravel()[:n] for values in (prefix_max, prefix_min, prefix_drawdown))
+    suffix = tuple(values.ravel()[:n] for values in (suffix_max, suffix_drawdown))
+    return prefix, suffix
+
+
+def window_drawdowns(equity, window):
+    # Drawdown from the trailing peak and max drawdown within the last
+    # `window` trades, for every trade (NaN until filled), in O(n). A window
+    # of w trades spans w + 1 equity points (the level before its first
+    # trade). With blocks of w + 1 points every window is the suffix of the
+    # block it starts in joined with the prefix of the next block, combined
+    # as combine_extremes would; a window starting on a block boundary is
+    # that whole block.
+    n = len(equity) - 1
+    drawdown = np.full(n, np.nan)
+    max_drawdown = np.full(n, np.nan)
+    if window > n:
+        return drawdown, max_drawdown
+
+    span = window + 1
+    (prefix_max, prefix_min, prefix_drawdown), (suffix_max, suffix_drawdown) = block_aggregates(equity, span)
+    starts = np.arange(len(equity) - window)
+    ends = starts + window
+    whole_block = starts % span == 0
+    peak = np.where(whole_block, suffix_max[starts], np.maximum(suffix_max[starts], prefix_max[ends]))
+    deepest = np.maximum(suffix_drawdown[starts], prefix_drawdown[ends])
+    deepest = np.where(whole_block, suffix_drawdown[starts],
+                       np.maximum(deepest, suffix_max[starts] - prefix_min[ends]))
+    drawdown[window - 1:] = equity[ends] - peak
+    max_drawdown[window - 1:] = deepest
+    return drawdown, max_drawdown
+
+
+def metrics_from_sums(count, pnl_sum, pnl_sq_sum, wins, gross_profit, gross_loss, losses,
+                      capital, risk_free_rate, periods_per_year):
+    mean_pnl = pnl_sum / count
+    # Sample variance (ddof=1, as pandas .std()) from the running sums
+    variance = np.clip((pnl_sq_sum - pnl_sum * mean_pnl) / np.maximum(count - 1, 1), 0, None)
+    volatility = np.sqrt(variance) / capital * np.sqrt(periods_per_year)
+    annual_return = mean_pnl / capital * periods_per_year
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(volatility > 0, (annual_return - risk_free_rate) / volatility, np.nan)
+        profit_factor = gross_profit / gross_loss
+        avg_win = gross_profit / wins
+        avg_loss = gross_loss / losses
+        risk_reward = avg_win / avg_loss
+
+    return {
+        'sharpe': sharpe,
+        'win_rate': wins / count,
+        'profit_factor': profit_factor,
+        'expectancy': mean_pnl,
+        'risk_reward': risk_reward,
+    }
+
+
+def rolling_metrics(pnl, windows=(20, 50, 100), capital=INITIAL_INVESTMENT,
+                    risk_free_rate=RISK_FREE_RATE, periods_per_year=TRADING_DAYS):
+    # Rolling Sharpe, win rate, profit factor, expectancy, R:R and max
+    # drawdown over the last `window` trades, for every window length at once.
+    # Returns {window: {metric: array}, 'expanding': {metric: array}}, each
+    # array one value per trade (NaN until the window is full).
+    pnl = np.asarray(pnl, dtype=np.float64)
+    n = len(pnl)
+
+    # One set of prefix sums serves every window
+    prefix = {
+        'pnl': np.r_[0.0, np.cumsum(pnl)],
+        'pnl_sq': np.r_[0.0, np.cumsum(pnl * pnl)],
+        'wins': np.r_[0, np.cumsum(pnl > 0)],
+        'losses': np.r_[0, np.cumsum(pnl < 0)],
+        'gross_profit': np.r_[0.0, np.cumsum(np.where(pnl > 0, pnl, 0.0))],
+        'gross_loss': np.r_[0.0, np.cumsum(np.where(pnl < 0, -pnl, 0.0))],
+    }
+    equity = prefix['pnl']
+
+    results = {}
+    for window in windows:
+        sums = {name: window_sums(values, window) for name, values in prefix.items()}
+        results[window] = metrics_from_sums(
+            np.float64(window), sums['pnl'], sums['pnl_sq'], sums['wins'], sums['gross_profit'],
+            sums['gross_loss'], sums['losses'], capital, risk_free_rate, periods_per_year)
+
+    count = np.arange(1, n + 1, dtype=np.float64)
+    results['expanding'] = metrics_from_sums(
+        count, prefix['pnl'][1:], prefix['pnl_sq'][1:], prefix['wins'][1:], prefix['gross_profit'][1:],
+        prefix['gross_loss'][1:], prefix['losses'][1:], capital, risk_free_rate, periods_per_year)
+
+    # Expanding drawdown from the running peak of cumulative P&L
+    peak = np.maximum.accumulate(equity)
+    results['expanding']['drawdown'] = (equity - peak)[1:]
+    results['expanding']['max_drawdown'] = np.maximum.accumulate(peak - equity)[1:]
+
+    # Drawdowns over the trailing window of every window length, O(n) each
+    for window in windows:
+        results[window]['drawdown'], results[window]['max_drawdown'] = window_drawdowns(equity, window)
+
+    return results
+
+
+def expanding_metrics(pnl, capital=INITIAL_INVESTMENT, risk_free_rate=RISK_FREE_RATE,
+                      periods_per_year=TRADING_DAYS):
+    return rolling_metrics(pnl, windows=(), capital=capital, risk_free_rate=risk_free_rate,
+                           periods_per_year=periods_per_year)['expanding']
@@ -5,6 +5,9 @@ import seaborn as sns
 from matplotlib.ticker import FuncFormatter
 import matplotlib.dates as mdates
 from datetime import datetime
+from ledger_store import load_trades_frame, load_rollup
+from rolling_analytics import rolling_metrics
+from performance_metrics import drawdown_pct, performance_summary, summary_rows
 
 # Set the style for all plots
 plt.style.use('seaborn-v0_8-darkgrid')
@@ -21,21 +24,17 @@ COLORS = {
 }
 
 print("Loading data...")
-# Read the CSV file
-df = pd.read_csv('Capvalis Exclusive.csv')
+# Load the trade ledger (memory-mapped columnar file, or the CSV export)
+df = load_trades_frame('Capvalis Exclusive')
 
-# Filter out monthly total rows
-df = df[~df['Date'].str.contains('Monthly Total', na=False)]
-
-# Convert date column to datetime
-df['Date'] = pd.to_datetime(df['Date'])
+# Daily/monthly/yearly P&L rollup, built once per ledger version
+rollup = load_rollup('Capvalis Exclusive')
 
 # Calculate cumulative P&L
 df['Cumulative_PnL'] = df['P&L'].cumsum()
 
 # Calculate drawdown
-rolling_max = df['Cumulative_PnL'].expanding().max()
-df['Drawdown'] = (df['Cumulative_PnL'] - rolling_max) / rolling_max * 100
+df['Drawdown'] = drawdown_pct(df['Cumulative_PnL'].values)
 
 # Money formatter for y-axis
 def money_formatter(x, p):
@@ -59,6 +58,9 @@ def create_equity_curve():
     
     # Plot the equity curve
     ax.plot(df['Date'], df['Cumulative_PnL'], color=COLORS['blue'], linewidth=2, label='Cumulative P&L')
+    if 'Net P&L' in df:
+        ax.plot(df['Date'], df['Net P&L'].cumsum(), color=COLORS['orange'], linewidth=2,
+                label='Cumulative P&L after costs')
     
     # Add a point marker at the end
     ax.plot([df['Date'].iloc[-1]], [df['Cumulative_PnL'].iloc[-1]], 'o', color=COLORS['red'], markersize=8)
@@ -124,18 +126,11 @@ def create_drawdown_chart():
 # 3. Monthly Performance Heatmap
 def create_monthly_heatmap():
     print("Creating monthly performance heatmap...")
-    # Create monthly PnL matrix
-    monthly_pnl = df.pivot_table(
-        values='P&L',
-        index=df['Date'].dt.year,
-        columns=df['Date'].dt.month,
-        aggfunc='sum',
-        fill_value=0
-    )
-    
-    # Rename columns to month names
-    monthly_pnl.columns = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                          'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    # Monthly PnL matrix from the rollup index
+    years, grid = rollup.monthly_matrix(fill=0)
+    monthly_pnl = pd.DataFrame(grid, index=years,
+                               columns=['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
+                                        'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
     
     # Create figure
     fig, ax = plt.subplots(figsize=(12, 8))
@@ -240,33 +235,11 @@ def create_win_rate_chart():
 # 5. Performance Metrics Dashboard
 def create_performance_dashboard():
     print("Creating performance metrics dashboard...")
-    # Calculate metrics
-    total_trades = len(df)
-    winning_trades = len(df[df['P&L'] > 0])
-    win_rate = (winning_trades / total_trades) * 100
-    
-    # Calculate average win and loss
-    avg_win = df[df['P&L'] > 0]['P&L'].mean() if winning_trades > 0 else 0
-    avg_loss = abs(df[df['P&L'] < 0]['P&L'].mean()) if len(df[df['P&L'] < 0]) > 0 else 0
-    rr_ratio = avg_win / avg_loss if avg_loss > 0 else 0
-    
-    # Calculate drawdown
-    max_drawdown = df['Drawdown'].min()
-    
-    # Calculate CAGR
-    start_date = df['Date'].min()
-    end_date = df['Date'].max()
-    years = (end_date - start_date).days / 365.25
-    initial_investment = 100000
-    final_value = initial_investment + df['Cumulative_PnL'].iloc[-1]
-    cagr = (final_value / initial_investment) ** (1 / years) - 1
-    
-    # Calculate Sharpe ratio
-    daily_returns = df['P&L'] / initial_investment
-    annual_return = daily_returns.mean() * 252
-    annual_volatility = daily_returns.std() * np.sqrt(252)
-    risk_free_rate = 0.05
-    sharpe_ratio = (annual_return - risk_free_rate) / annual_volatility if annual_volatility > 0 else 0
+    # Same metrics as the HTML dashboard
+    summary = performance_summary(df)
+    win_rate = summary['win_rate']
+    avg_win = summary['avg_win']
+    avg_loss = summary['avg_loss']
     
     # Create figure
     fig = plt.figure(figsize=(15, 10))
@@ -320,17 +293,7 @@ def create_performance_dashboard():
     ax5.axis('off')
     
     # Create a table with performance metrics
-    metrics = [
-        ['Total Trades', f'{total_trades}'],
-        ['Win Rate', f'{win_rate:.2f}%'],
-        ['Risk-Reward Ratio', f'{rr_ratio:.2f}'],
-        ['Maximum Drawdown', f'{max_drawdown:.2f}%'],
-        ['CAGR', f'{cagr*100:.2f}%'],
-        ['Sharpe Ratio', f'{sharpe_ratio:.2f}'],
-        ['Initial Investment', f'₹{initial_investment:,.0f}'],
-        ['Final Value', f'₹{final_value:,.0f}'],
-        ['Total Return', f'{((final_value/initial_investment)-1)*100:.2f}%']
-    ]
+    metrics = summary_rows(summary)
     
     table = ax5.table(cellText=metrics, colLabels=['Metric', 'Value'], 
                      cellLoc='center', loc='center', colWidths=[0.4, 0.4])
@@ -344,6 +307,40 @@ def create_performance_dashboard():
     plt.close()
     print("Performance dashboard saved as 'performance_dashboard.png'")
 
+# 6. Rolling Metrics (strategy decay)
+def create_rolling_metrics_chart(windows=(20, 50, 100)):
+    print("Creating rolling metrics chart...")
+    # Every window length comes out of a single pass over the trades
+    rolling = rolling_metrics(df['P&L'].values, windows=windows)
+    window_colors = [COLORS['blue'], COLORS['purple'], COLORS['orange']]
+    
+    fig, axes = plt.subplots(2, 2, figsize=(15, 10))
+    fig.patch.set_facecolor(COLORS['background'])
+    panels = [
+        (axes[0, 0], 'sharpe', 'Rolling Sharpe Ratio', 'Sharpe Ratio', 1),
+        (axes[0, 1], 'win_rate', 'Rolling Win Rate', 'Win Rate (%)', 100),
+        (axes[1, 0], 'expectancy', 'Rolling Expectancy', 'Average P&L per Trade (₹)', 1),
+        (axes[1, 1], 'max_drawdown', 'Rolling Maximum Drawdown', 'Drawdown (₹)', -1),
+    ]
+    for ax, metric, title, ylabel, scale in panels:
+        ax.set_facecolor(COLORS['background'])
+        ax.set_title(title, pad=20, fontsize=14, fontweight='bold')
+        ax.set_xlabel('Date', fontsize=12)
+        ax.set_ylabel(ylabel, fontsize=12)
+        ax.grid(True, alpha=0.3)
+        ax.xaxis.set_major_locator(mdates.YearLocator())
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y'))
+        for window, color in zip(windows, window_colors * len(windows)):
+            ax.plot(df['Date'], rolling[window][metric] * scale, color=color, linewidth=1.5,
+                    label=f'{window} trades')
+        ax.legend(loc='upper left', fontsize=10)
+    
+    # Save the plot
+    plt.tight_layout()
+    plt.savefig('rolling_metrics.png', dpi=300, bbox_inches='tight')
+    plt.close()
+    print("Rolling metrics chart saved as 'rolling_metrics.png'")
+
 # Execute all visualization functions
 if __name__ == "__main__":
     try:
@@ -353,6 +350,7 @@ if __name__ == "__main__":
         create_monthly_heatmap()
         create_win_rate_chart()
         create_performance_dashboard()
+        create_rolling_metrics_chart()
         print("All static visualizations have been generated successfully!")
     except Exception as e:
         print(f"An error occurred: {str(e)}")
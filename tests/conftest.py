@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The modules are flat scripts imported by bare name from their folders
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ('Algorithm', 'Graphs', 'Excel Analysis'):
+    sys.path.insert(0, os.path.join(ROOT, folder))
@@ -0,0 +1,36 @@
+from datetime import datetime
+import numpy as np
+import pytest
+
+# The strategy module pulls in the broker client
+pytest.importorskip('SmartApi')
+pytest.importorskip('pyotp')
+
+from candle_aggregation import CandleStore, SESSION_MINUTES
+from indicators import IndicatorLibrary
+from nse_calendar import trading_sessions
+from backtest_pipeline import run_pipelined_backtest
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 3, 29)
+FILTERS = {'max_gap_pct': 0.1}
+
+
+def synthetic_bars(date_str):
+    rng = np.random.default_rng(int(date_str.replace('-', '')))
+    close = 21000 + rng.normal(0, 40) + np.cumsum(rng.normal(0, 8, SESSION_MINUTES))
+    return {'minute': np.arange(SESSION_MINUTES), 'open': close, 'high': close + 5, 'low': close - 5,
+            'close': close, 'volume': np.ones(SESSION_MINUTES)}
+
+
+def test_filtered_run_releases_every_session(tmp_path):
+    store = CandleStore(str(tmp_path / 'candles'), fetcher=synthetic_bars)
+    ledger, daily_metrics, _, _ = run_pipelined_backtest(
+        candle_store=store, params={'filters': FILTERS}, use_result_cache=False, start_date=START,
+        end_date=END, ledger_path=str(tmp_path / 'ledger'))
+    assert not store._base and not store._views
+
+    sessions = trading_sessions(START, END)
+    allowed = IndicatorLibrary(store, sessions).allowed_sessions(FILTERS)
+    assert 0 < len(allowed) < len(sessions)
+    assert {str(day) for day in ledger['date']} <= allowed
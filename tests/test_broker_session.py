@@ -0,0 +1,22 @@
+import pytest
+
+pytest.importorskip('SmartApi')
+pytest.importorskip('pyotp')
+pytest.importorskip('cryptography')
+
+import broker_session
+from broker_session import BrokerSessionManager, PASSPHRASE_ENV, cache_passphrase, derive_cache_key
+
+
+def test_missing_passphrase_fails_clearly(monkeypatch, tmp_path):
+    monkeypatch.delenv(PASSPHRASE_ENV, raising=False)
+    monkeypatch.setattr(broker_session, 'keyring', None)
+    manager = BrokerSessionManager('key', 'user', 'pwd', 'totp', cache_path=str(tmp_path / 'tokens.bin'))
+    with pytest.raises(RuntimeError, match=PASSPHRASE_ENV):
+        manager.tokens()
+
+
+def test_cache_key_comes_from_the_passphrase(monkeypatch):
+    monkeypatch.setenv(PASSPHRASE_ENV, 'correct horse')
+    assert cache_passphrase('user') == 'correct horse'
+    assert derive_cache_key('correct horse', 'user') != derive_cache_key('another', 'user')
@@ -0,0 +1,25 @@
+import numpy as np
+from candle_aggregation import CandleStore, SESSION_MINUTES
+
+SESSIONS = ['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05']
+
+
+def synthetic_bars(date_str):
+    rng = np.random.default_rng(int(date_str.replace('-', '')))
+    close = 21000 + np.cumsum(rng.normal(0, 8, SESSION_MINUTES))
+    return {'minute': np.arange(SESSION_MINUTES), 'open': close, 'high': close + 5, 'low': close - 5,
+            'close': close, 'volume': np.ones(SESSION_MINUTES)}
+
+
+def test_base_bars_are_bounded_like_views(tmp_path):
+    store = CandleStore(str(tmp_path), fetcher=synthetic_bars, max_views=3)
+    for date_str in SESSIONS:
+        store.get_bars(date_str, 15)
+    assert list(store._base) == SESSIONS[-3:]
+    assert len(store._views) == 3
+
+    # Evicted sessions are read back from disk
+    reread = CandleStore(str(tmp_path), max_views=3)
+    for date_str in SESSIONS:
+        np.testing.assert_array_equal(store.get_bars(date_str)['close'], reread.get_bars(date_str)['close'])
+    assert len(store._base) == 3
@@ -0,0 +1,57 @@
+from datetime import datetime
+import numpy as np
+import pytest
+
+# The strategy module pulls in the broker client
+pytest.importorskip('SmartApi')
+pytest.importorskip('pyotp')
+
+import capvalis_first_algorithm
+from candle_aggregation import CandleStore, SESSION_MINUTES
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 1, 10)
+BROKEN_DAY = '2024-01-04'
+
+
+def synthetic_bars(date_str):
+    rng = np.random.default_rng(int(date_str.replace('-', '')))
+    close = 21000 + np.cumsum(rng.normal(0, 8, SESSION_MINUTES))
+    return {'minute': np.arange(SESSION_MINUTES), 'open': close, 'high': close + 5, 'low': close - 5,
+            'close': close, 'volume': np.ones(SESSION_MINUTES)}
+
+
+def test_resume_after_failed_download_reuses_checkpoint(tmp_path, monkeypatch):
+    broker_down = {BROKEN_DAY}
+
+    def fetcher(date_str):
+        if date_str in broker_down:
+            raise ConnectionError('broker unavailable')
+        return synthetic_bars(date_str)
+
+    simulated = []
+    simulate_session = capvalis_first_algorithm.simulate_session
+
+    def counting_simulate(date_str, candles, params):
+        simulated.append(date_str)
+        return simulate_session(date_str, candles, params)
+
+    monkeypatch.setattr(capvalis_first_algorithm, 'simulate_session', counting_simulate)
+    options = dict(use_result_cache=False, start_date=START, end_date=END, ledger_path=None,
+                   checkpoint_dir=str(tmp_path / 'checkpoints'), checkpoint_every=3)
+
+    store = CandleStore(str(tmp_path / 'candles'), fetcher=fetcher)
+    capvalis_first_algorithm.capvalis_first_algorithm(candle_store=store, **options)
+    assert BROKEN_DAY not in simulated
+
+    # The retry has bars for the failed day; only that day is simulated
+    broker_down.clear()
+    simulated.clear()
+    store = CandleStore(str(tmp_path / 'candles'), fetcher=fetcher)
+    trades = capvalis_first_algorithm.capvalis_first_algorithm(candle_store=store, **options)[0]
+    assert simulated == [BROKEN_DAY]
+
+    reference = capvalis_first_algorithm.capvalis_first_algorithm(
+        candle_store=CandleStore(str(tmp_path / 'reference'), fetcher=synthetic_bars),
+        **dict(options, checkpoint_dir=None))[0]
+    assert trades == reference
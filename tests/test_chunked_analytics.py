@@ -0,0 +1,37 @@
+import numpy as np
+from ledger_store import TRADE_DTYPE, trades_frame
+from performance_metrics import performance_summary
+from chunked_analytics import chunked_performance_summary
+
+# Chunked sums and moments may differ from numpy's over the whole array by
+# rounding only; measured worst case is 64 ulps with 7-row chunks
+MAX_ULPS = 64
+
+
+def synthetic_ledger(n, seed=3):
+    rng = np.random.default_rng(seed)
+    trades = np.zeros(n, TRADE_DTYPE)
+    trades['date'] = np.datetime64('2020-01-01') + np.arange(n) // 3
+    trades['pnl'] = np.round(rng.normal(10, 800, n), 2)
+    trades['costs'] = np.round(rng.uniform(20, 90, n), 4)
+    trades['net_pnl'] = trades['pnl'] - trades['costs']
+    return trades
+
+
+def test_single_chunk_matches_in_memory_exactly():
+    trades = synthetic_ledger(5000)
+    assert chunked_performance_summary(trades, chunk_rows=len(trades)) == performance_summary(trades_frame(trades))
+
+
+def test_chunked_summary_within_ulps_of_in_memory():
+    trades = synthetic_ledger(100000)
+    expected = performance_summary(trades_frame(trades))
+    for chunk_rows in (7, 97, 4096, 30000):
+        summary = chunked_performance_summary(trades, chunk_rows=chunk_rows)
+        assert summary.keys() == expected.keys()
+        for name, value in expected.items():
+            if isinstance(value, float):
+                ulps = abs(summary[name] - value) / np.spacing(abs(value))
+                assert ulps <= MAX_ULPS, (name, chunk_rows, ulps)
+            else:
+                assert summary[name] == value, (name, chunk_rows)
@@ -0,0 +1,50 @@
+import json
+from datetime import datetime
+import numpy as np
+import pytest
+
+# The strategy module pulls in the broker client
+pytest.importorskip('SmartApi')
+pytest.importorskip('pyotp')
+
+from candle_aggregation import CandleStore, SESSION_MINUTES
+from incremental_backtest import run_incremental, load_ledger, load_state
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 1, 12)
+BROKEN_DAY = '2024-01-05'
+
+
+def synthetic_bars(date_str):
+    rng = np.random.default_rng(int(date_str.replace('-', '')))
+    close = 21000 + np.cumsum(rng.normal(0, 8, SESSION_MINUTES))
+    return {'minute': np.arange(SESSION_MINUTES), 'open': close, 'high': close + 5, 'low': close - 5,
+            'close': close, 'volume': np.ones(SESSION_MINUTES)}
+
+
+def test_failed_fetch_is_retried_next_run(tmp_path):
+    broker_down = {BROKEN_DAY}
+
+    def fetcher(date_str):
+        if date_str in broker_down:
+            raise ConnectionError('broker unavailable')
+        return synthetic_bars(date_str)
+
+    state_dir = str(tmp_path / 'state')
+    store = CandleStore(str(tmp_path / 'candles'), fetcher=fetcher)
+    run_incremental(state_dir, end_date=END, candle_store=store, start_date=START)
+    # The cursor stops before the failed day even though later days have data
+    assert load_state(state_dir)['last_session'] < BROKEN_DAY
+    assert all(trade['date'] < BROKEN_DAY for trade in load_ledger(state_dir)[0])
+
+    broker_down.clear()
+    run_incremental(state_dir, end_date=END, candle_store=store)
+    assert load_state(state_dir)['last_session'] == '2024-01-12'
+
+    # Same ledger as one run that never saw the failure
+    reference_dir = str(tmp_path / 'reference')
+    reference_store = CandleStore(str(tmp_path / 'reference_candles'), fetcher=synthetic_bars)
+    run_incremental(reference_dir, end_date=END, candle_store=reference_store, start_date=START)
+    trades = load_ledger(state_dir)[0]
+    assert json.dumps(trades) == json.dumps(load_ledger(reference_dir)[0])
+    assert BROKEN_DAY in {trade['date'] for trade in trades}
@@ -0,0 +1,18 @@
+from nse_calendar import trading_sessions, is_trading_session
+
+
+def sessions_between(start, end):
+    return [str(day) for day in trading_sessions(start, end)]
+
+
+def test_bakri_id_2023_is_observed_on_june_28():
+    assert sessions_between('2023-06-26', '2023-06-30') == ['2023-06-26', '2023-06-27', '2023-06-29', '2023-06-30']
+
+
+def test_short_special_sessions_are_not_orb_days():
+    # DR-site drills end at 12:30, before the 14:45 square-off
+    assert not is_trading_session('2024-03-02')
+    assert not is_trading_session('2024-05-18')
+    assert '2024-03-02' not in sessions_between('2024-03-01', '2024-03-04')
+    # Full-length weekend sessions are kept
+    assert '2024-01-20' in sessions_between('2024-01-19', '2024-01-22')
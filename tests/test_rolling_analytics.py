@@ -0,0 +1,25 @@
+import numpy as np
+from rolling_analytics import rolling_metrics
+
+
+def brute_force_drawdowns(pnl, window):
+    equity = np.r_[0.0, np.cumsum(pnl)]
+    drawdown = np.full(len(pnl), np.nan)
+    max_drawdown = np.full(len(pnl), np.nan)
+    for end in range(window, len(equity)):
+        span = equity[end - window:end + 1]
+        peaks = np.maximum.accumulate(span)
+        drawdown[end - 1] = span[-1] - peaks[-1]
+        max_drawdown[end - 1] = (peaks - span).max()
+    return drawdown, max_drawdown
+
+
+def test_window_drawdowns_match_brute_force():
+    rng = np.random.default_rng(7)
+    for n in (0, 1, 4, 5, 6, 11, 300):
+        pnl = np.round(rng.normal(5, 500, n), 2)
+        results = rolling_metrics(pnl, windows=(1, 2, 5, 10))
+        for window in (1, 2, 5, 10):
+            drawdown, max_drawdown = brute_force_drawdowns(pnl, window)
+            np.testing.assert_array_equal(results[window]['drawdown'], drawdown)
+            np.testing.assert_array_equal(results[window]['max_drawdown'], max_drawdown)